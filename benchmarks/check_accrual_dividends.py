@@ -0,0 +1,138 @@
+"""
+    Check of reward-per-token accrual of dividends (Farm accrual mode) against eager payouts to each investor.
+
+    Run from the root of the project:
+        python -m benchmarks.check_accrual_dividends
+        python -m benchmarks.check_accrual_dividends --investors 300 --months 6
+
+    The same seeded synthetic config is modelled in both modes month by month. After each month dividends of each
+    investor (Staking rewards tokens, dividends are paid with them, and dividends that were accrued by farms,
+    but not paid yet) and dividends of farms should be the same, at the end also tokens of farms and tokens
+    of investors by type and farm. Rewards of the same day are summed in a different order, so values are compared
+    up to rounding. The script exits with code 1 if any values differ.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from benchmarks.synthetic_configs import get_synthetic_config, get_synthetic_farms
+from modeling.simulation import Simulation
+from utilities.py_tools import log
+
+# Relative and absolute tolerance of the check
+RTOL = 1e-9
+ATOL = 1e-6
+
+
+def get_investors_dividends(simulation: Simulation) -> np.ndarray:
+    """
+    Returns dividends of each investor: Staking rewards tokens and dividends that were not paid yet (accrual mode)
+    """
+
+    investors = simulation.investors
+    n = investors.num_lots
+    mask = investors.lot_type[:n] == list(investors.token_types).index('Staking rewards')
+    dividends = np.bincount(investors.lot_investor[:n][mask], weights=investors.lot_num[:n][mask],
+                            minlength=len(investors))
+
+    for farm in simulation.farms:
+        dividends += investors.get_pending_dividends(farm)
+
+    return dividends
+
+
+def get_investors_tokens(investors) -> np.ndarray:
+    """
+    Returns tokens of each investor by type and farm, array (investor x type x farm), the last farm is NO_FARM
+    """
+
+    n = investors.num_lots
+    res = np.zeros((len(investors), len(investors.token_types), investors.num_farms + 1))
+    np.add.at(res, (investors.lot_investor[:n], investors.lot_type[:n], investors.lot_farm[:n]),
+              investors.lot_num[:n])
+    return res
+
+
+def compare_values(values: dict, expected: dict, title: str) -> bool:
+    """
+    Compares arrays with the same names up to rounding
+    :param values: dictionary with (name: array) of accrual mode
+    :param expected: dictionary with (name: array) of eager payouts
+    :param title: title of the compared values for the log
+    :return: True if all arrays are the same
+    """
+
+    is_same = True
+    for name, expected_values in expected.items():
+        if values[name].shape != expected_values.shape or \
+                not np.allclose(values[name], expected_values, rtol=RTOL, atol=ATOL):
+            is_same = False
+            diff = np.abs(values[name] - expected_values).max() if values[name].shape == expected_values.shape \
+                else 'different shapes'
+            log(f'{title}: {name} differ from eager payouts (max diff = {diff})')
+
+    return is_same
+
+
+def check_accrual_dividends(num_investors: int, num_months: int, num_farms=2, full_population=False, seed=0) -> bool:
+    """
+    Runs modelling on the synthetic config with accrual and eager payouts of dividends and compares results
+    :param num_investors: number of Seed investors
+    :param num_months: number of months
+    :param num_farms: number of farms (see get_synthetic_farms)
+    :param full_population: flag if all groups of investors are modelled
+    :param seed: seed of the random numbers generator
+    :return: True if results are the same up to rounding
+    """
+
+    simulations = {}
+    for accrual in [False, True]:
+        config = get_synthetic_config(num_months, num_investors, full_population=full_population,
+                                      farms=get_synthetic_farms(num_farms), accrual_dividends=accrual)
+        simulations[accrual] = Simulation(config, rng=np.random.default_rng(seed), verbose=False)
+
+    title = f'Accrual dividends ({num_farms} farms{", full population" if full_population else ""})'
+    is_same = True
+
+    # Dividends of investors and farms after each month
+    for num_month in range(num_months):
+        results = {}
+        for accrual, simulation in simulations.items():
+            simulation.run_month()
+            results[accrual] = {
+                'investors dividends': get_investors_dividends(simulation),
+                **{f'{farm.name} dividends': farm.dividends.select_dtypes('number').to_numpy()
+                   for farm in simulation.farms}
+            }
+        is_same &= compare_values(results[True], results[False], title=f'{title}, month {num_month}')
+
+    # Tokens of farms and investors at the end, accrued dividends are paid
+    results = {}
+    for accrual, simulation in simulations.items():
+        simulation.run()
+        results[accrual] = {
+            **{f'{farm.name} tokens': farm.tokens.select_dtypes('number').to_numpy() for farm in simulation.farms},
+            'investors tokens': get_investors_tokens(simulation.investors)
+        }
+    is_same &= compare_values(results[True], results[False], title=f'{title}, end')
+
+    log(f'{title}: results are {"the same" if is_same else "different"}')
+    return is_same
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Check of accrual of dividends against eager payouts')
+    parser.add_argument('--investors', type=int, default=100, help='number of Seed investors')
+    parser.add_argument('--months', type=int, default=4, help='number of months')
+    args = parser.parse_args()
+
+    checks = [check_accrual_dividends(args.investors, args.months),
+              check_accrual_dividends(args.investors, args.months, num_farms=3),
+              check_accrual_dividends(args.investors, args.months, full_population=True)]
+
+    if not all(checks):
+        log('Accrual dividends check failed')
+        sys.exit(1)
+    log('Accrual dividends check passed')
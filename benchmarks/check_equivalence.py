@@ -0,0 +1,44 @@
+"""
+    Equivalence checks of the vectorized modelling code against straightforward reference implementations.
+
+    Run from the root of the project:
+        python -m benchmarks.check_equivalence
+        python -m benchmarks.check_equivalence --cases 2000 --investors 300 --months 3
+
+    Checks:
+        - batched get_transfer_decisions against a loop, where investors choose farms one by one
+          (see benchmarks/check_transfer_decisions.py)
+        - modelling with reward-per-token accrual of dividends against eager payouts to each investor
+          (see benchmarks/check_accrual_dividends.py)
+        - modelling with skipped idle days against modelling day by day (see benchmarks/check_idle_days.py)
+
+    The script exits with code 1 if any check fails.
+"""
+
+import argparse
+import sys
+
+from benchmarks.check_accrual_dividends import check_accrual_dividends
+from benchmarks.check_idle_days import check_idle_days_configs
+from benchmarks.check_transfer_decisions import check_transfer_decisions
+from utilities.py_tools import log
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Equivalence checks of vectorized modelling code')
+    parser.add_argument('--cases', type=int, default=500, help='number of transfer decisions cases of each kind')
+    parser.add_argument('--investors', type=int, default=100, help='number of Seed investors of modelling checks')
+    parser.add_argument('--months', type=int, default=4, help='number of months of modelling checks')
+    args = parser.parse_args()
+
+    checks = [check_transfer_decisions(args.cases),
+              check_accrual_dividends(args.investors, args.months),
+              check_accrual_dividends(args.investors, args.months, num_farms=3),
+              check_accrual_dividends(args.investors, args.months, full_population=True),
+              check_idle_days_configs(args.investors, args.months)]
+
+    if not all(checks):
+        log('Equivalence checks failed')
+        sys.exit(1)
+    log('Equivalence checks passed')
@@ -0,0 +1,118 @@
+"""
+    Check of modelling with skipped idle days (Simulation with skip_idle_days) against modelling day by day.
+
+    Run from the root of the project:
+        python -m benchmarks.check_idle_days
+        python -m benchmarks.check_idle_days --investors 300 --months 6
+
+    The same seeded synthetic config is modelled in both modes. Days, on which only turnover dividends are added,
+    are modelled at once with skip_idle_days, so tokens and dividends of farms, all series of the metrics recorder
+    and tokens of investors should be exactly the same. Synthetic tokens are released every day, so configs
+    with idle days have months without released tokens (idle_months) and extra mint and dividends once a month.
+    The script exits with code 1 if any values differ or no days are skipped in idle months.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from benchmarks.check_accrual_dividends import get_investors_tokens
+from benchmarks.synthetic_configs import get_synthetic_config, get_synthetic_farms
+from modeling.simulation import Simulation
+from utilities.profiling import PhaseProfiler
+from utilities.py_tools import log
+
+# Parameters of configs with idle days: months without released tokens, extra mint and dividends once a month
+IDLE_PARAMS = {'idle_months': [1, 2], 'period_extra_mint': 30, 'period_dividends': 30, 'freeze_period': 60}
+
+# Configs of the check: (title, parameters of check_idle_days)
+IDLE_DAYS_CONFIGS = [
+    ('default', {}),
+    ('idle days', IDLE_PARAMS),
+    ('idle days, accrual dividends', {**IDLE_PARAMS, 'accrual_dividends': True}),
+    ('idle days, 3 farms', {**IDLE_PARAMS, 'farms': get_synthetic_farms(3)}),
+    ('idle days, 3 farms, accrual dividends', {**IDLE_PARAMS, 'farms': get_synthetic_farms(3),
+                                               'accrual_dividends': True}),
+    ('idle days, full population', {**IDLE_PARAMS, 'full_population': True})
+]
+
+
+def get_idle_days_results(simulation: Simulation) -> dict:
+    """
+    Returns dictionary with (name: array) of results that are compared
+    """
+
+    return {
+        **{f'{farm.name} tokens': farm.tokens.select_dtypes('number').to_numpy() for farm in simulation.farms},
+        **{f'{farm.name} dividends': farm.dividends.select_dtypes('number').to_numpy() for farm in simulation.farms},
+        'recorder': simulation.recorder.to_frame().to_numpy(dtype=np.float64),
+        'investors tokens': get_investors_tokens(simulation.investors)
+    }
+
+
+def check_idle_days(num_investors: int, num_months: int, title='default', idle_months=(), seed=0,
+                    **overrides) -> bool:
+    """
+    Runs modelling on the synthetic config with and without skipping of idle days and compares results
+    :param num_investors: number of Seed investors
+    :param num_months: number of months
+    :param title: title of the config for the log
+    :param idle_months: months without released tokens
+    :param seed: seed of the random numbers generator
+    :param overrides: parameters of get_synthetic_config (full_population and modelling parameters)
+    :return: True if results are the same
+    """
+
+    results = {}
+    for skip_idle_days in [False, True]:
+        config = get_synthetic_config(num_months, num_investors, **overrides)
+        months = [month for month in idle_months if month in config.df_mint_distr.columns]
+        config.df_mint_distr[months] = 0
+
+        profiler = PhaseProfiler()
+        simulation = Simulation(config, rng=np.random.default_rng(seed), verbose=False, skip_idle_days=skip_idle_days,
+                                profiler=profiler)
+        simulation.run()
+        results[skip_idle_days] = get_idle_days_results(simulation)
+
+    is_same = True
+    for name, expected in results[False].items():
+        values = results[True][name]
+        if values.shape != expected.shape or not np.array_equal(values, expected, equal_nan=True):
+            is_same = False
+            diff = np.nanmax(np.abs(values - expected)) if values.shape == expected.shape else 'different shapes'
+            log(f'Idle days ({title}): {name} differ from modelling day by day (max diff = {diff})')
+
+    # Days of idle months should be skipped, otherwise the check does not test skipping
+    num_skipped_days = profiler.counters.get('skipped_days', 0)
+    if months and num_skipped_days == 0:
+        is_same = False
+        log(f'Idle days ({title}): no days are skipped')
+
+    log(f'Idle days ({title}): {num_skipped_days} of {simulation.num_days} days are skipped, '
+        f'results are {"the same" if is_same else "different"}')
+    return is_same
+
+
+def check_idle_days_configs(num_investors: int, num_months: int, seed=0) -> bool:
+    """
+    Runs check_idle_days on all configs from IDLE_DAYS_CONFIGS
+    :return: True if results of all configs are the same
+    """
+
+    checks = [check_idle_days(num_investors, num_months, title=title, seed=seed, **overrides)
+              for title, overrides in IDLE_DAYS_CONFIGS]
+    return all(checks)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Check of modelling with skipped idle days against day by day')
+    parser.add_argument('--investors', type=int, default=100, help='number of Seed investors')
+    parser.add_argument('--months', type=int, default=4, help='number of months')
+    args = parser.parse_args()
+
+    if not check_idle_days_configs(args.investors, args.months):
+        log('Idle days check failed')
+        sys.exit(1)
+    log('Idle days check passed')
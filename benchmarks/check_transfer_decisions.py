@@ -0,0 +1,155 @@
+"""
+    Check of batched transfer decisions (get_transfer_decisions) against a straightforward loop,
+    where investors choose farms one by one.
+
+    Run from the root of the project:
+        python -m benchmarks.check_transfer_decisions
+        python -m benchmarks.check_transfer_decisions --cases 2000
+
+    Tokens and dividends are integers, so running totals are exact in both versions and decisions should be the same.
+    Random cases of each kind:
+        - random: random tokens, dividends and flags of farms that are chosen first if they are empty
+        - ties: all farms have the same yield, ties should go to the farm with the lowest id
+        - nan: some farms have no tokens and no dividends (yield 0 / 0 is not a number, such farm is not worse
+          than others)
+        - empty_first: as in modelling, all farms except SbPool (farm 0) are chosen first if they have no tokens
+
+    The script exits with code 1 if any decision differs.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from utilities.modelling_tools import get_transfer_decisions
+from utilities.py_tools import log
+
+# Kinds of random cases
+CASE_KINDS = ['random', 'ties', 'nan', 'empty_first']
+
+# Initial windows of get_transfer_decisions that are checked
+WINDOWS = [1, 3, 64]
+
+
+def get_reference_decisions(num_tokens: np.ndarray, dividends: np.ndarray, added: np.ndarray, removed: np.ndarray,
+                            empty_first: np.ndarray) -> np.ndarray:
+    """
+    Chooses the most profitable farm for each investor one by one (reference for get_transfer_decisions)
+    """
+
+    totals = np.array(num_tokens, dtype=np.float64)
+    num_farms = len(totals)
+    decisions = np.zeros(len(added), dtype=np.int64)
+
+    for index in range(len(added)):
+
+        # If we have no tokens in some farms (from empty_first), investor chooses the first of them
+        empty_farms = [farm_id for farm_id in range(num_farms) if totals[farm_id] == 0 and empty_first[farm_id]]
+        if empty_farms:
+            decision = empty_farms[0]
+
+        # Otherwise investor chooses the farm with the highest dividends per token (the first one of equal farms),
+        # farm without tokens is not worse than others
+        else:
+            decision, best_yield = 0, -np.inf
+            for farm_id in range(num_farms):
+                farm_yield = np.inf if totals[farm_id] == 0 else dividends[farm_id] / totals[farm_id]
+                if farm_yield > best_yield:
+                    decision, best_yield = farm_id, farm_yield
+
+        # Investor moves all tokens to the chosen farm
+        for farm_id in range(num_farms):
+            if farm_id == decision:
+                totals[farm_id] += added[index, farm_id]
+            else:
+                totals[farm_id] -= removed[index, farm_id]
+        decisions[index] = decision
+
+    return decisions
+
+
+def get_random_transfer_case(rng: np.random.Generator, kind='random') -> dict:
+    """
+    Generates random inputs of get_transfer_decisions with small integers (many ties and empty farms)
+    :param rng: random numbers generator
+    :param kind: kind of the case, one of CASE_KINDS
+    :return: dictionary with params of get_transfer_decisions
+    """
+
+    num_farms = int(rng.integers(1, 7))
+    num_investors = int(rng.integers(0, 400))
+
+    # Active tokens of each investor in each farm, most investors have tokens only in some farms
+    holdings = rng.integers(0, 4, size=(num_investors, num_farms)) * (rng.random((num_investors, num_farms)) < 0.4)
+    removed = holdings.astype(np.float64)
+    added = removed.sum(axis=1, keepdims=True) - removed
+
+    num_tokens = holdings.sum(axis=0) + rng.integers(0, 3, size=num_farms) * rng.integers(0, 2, size=num_farms)
+    dividends = rng.integers(0, 4, size=num_farms)
+    empty_first = rng.random(num_farms) < 0.5
+
+    if kind == 'ties':
+        num_tokens = holdings.sum(axis=0) + rng.integers(1, 3)
+        num_tokens = np.full(num_farms, num_tokens.max())
+        dividends = np.full(num_farms, rng.integers(0, 4))
+        empty_first = np.zeros(num_farms, dtype=bool)
+    elif kind == 'nan':
+        mask_empty = rng.random(num_farms) < 0.5
+        num_tokens[mask_empty] = 0
+        dividends[mask_empty & (rng.random(num_farms) < 0.7)] = 0
+        empty_first = np.zeros(num_farms, dtype=bool)
+    elif kind == 'empty_first':
+        num_tokens[rng.random(num_farms) < 0.5] = 0
+        empty_first = np.arange(num_farms) > 0
+
+    return {
+        'num_tokens': num_tokens.astype(np.float64),
+        'dividends': dividends.astype(np.float64),
+        'added': added,
+        'removed': removed,
+        'empty_first': empty_first
+    }
+
+
+def check_transfer_decisions(num_cases: int, seed=0) -> bool:
+    """
+    Compares batched and reference decisions on random cases of each kind with different windows
+    :param num_cases: number of random cases of each kind
+    :param seed: seed of the random numbers generator
+    :return: True if all decisions are the same
+    """
+
+    rng = np.random.default_rng(seed)
+    is_same = True
+
+    for kind in CASE_KINDS:
+        num_failed = 0
+        for num_case in range(num_cases):
+            case = get_random_transfer_case(rng, kind=kind)
+            expected = get_reference_decisions(**case)
+
+            for window in WINDOWS:
+                decisions = get_transfer_decisions(**case, window=window)
+                if not np.array_equal(decisions, expected):
+                    num_failed += 1
+                    index = np.flatnonzero(decisions != expected)[0]
+                    log(f'Case {num_case} of {kind} (window={window}): investor {index} chooses farm '
+                        f'{decisions[index]}, reference chooses {expected[index]}')
+                    break
+
+        log(f'Transfer decisions ({kind}): {num_cases - num_failed} of {num_cases} random cases are the same')
+        is_same = is_same and num_failed == 0
+
+    return is_same
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Check of batched transfer decisions against a loop')
+    parser.add_argument('--cases', type=int, default=500, help='number of random cases of each kind')
+    args = parser.parse_args()
+
+    if not check_transfer_decisions(args.cases):
+        log('Transfer decisions check failed')
+        sys.exit(1)
+    log('Transfer decisions check passed')
@@ -0,0 +1,129 @@
+"""
+    Full 48-month run in full population mode (all groups of investors sell, transfer tokens and get staking rewards,
+    see prepare_modelling_params) on the synthetic config, checked against the throughput target.
+
+    Run from the root of the project:
+        python -m benchmarks.full_population_benchmark
+        python -m benchmarks.full_population_benchmark --investors 300 --months 12 --compare
+
+    Budget: with the default size (1000 Seed investors, 1400 investors of all groups, 48 months) the run should finish
+    within RUNTIME_BUDGET seconds on one core, so the target is THROUGHPUT_TARGET = 1400 * 1440 / RUNTIME_BUDGET
+    investor-days per second (investors of all groups x modelled days / wall time). Throughput is checked for the whole
+    run and for the last month (lots are accumulated, so the last month is the slowest one).
+    The script exits with code 1 if the target is missed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from benchmarks.synthetic_configs import get_synthetic_config
+from modeling.simulation import Simulation
+from utilities.profiling import PhaseProfiler
+from utilities.py_tools import log
+
+# Default size of the benchmark: number of Seed investors (investors of other groups are 10% of them) and months
+NUM_INVESTORS = 1000
+NUM_MONTHS = 48
+
+# Investors of all groups with the default size: Seed and 4 other groups (Private sale, Public sale, Team, Community)
+NUM_ALL_INVESTORS = NUM_INVESTORS + 4 * max(NUM_INVESTORS // 10, 1)
+
+# Runtime budget of the full population run with the default size (seconds on one core)
+RUNTIME_BUDGET = 180
+
+# Target of full population mode: investor-days per second, that are needed to finish the default run within budget
+THROUGHPUT_TARGET = NUM_ALL_INVESTORS * NUM_MONTHS * 30 / RUNTIME_BUDGET
+
+
+def run_full_population(num_investors: int, num_months: int, full_population=True, seed=0) -> dict:
+    """
+    Models all months of the synthetic config
+    :param num_investors: number of Seed investors
+    :param num_months: number of months
+    :param full_population: flag if all groups of investors are modelled (False - default mode with Seed transfers)
+    :param seed: seed of the random numbers generator
+    :return: dictionary with time, throughput (whole run and each month), budget, profile and tokens of each group
+        in farms
+    """
+
+    config = get_synthetic_config(num_months, num_investors, full_population=full_population)
+    profiler = PhaseProfiler()
+
+    start_time = time.perf_counter()
+    simulation = Simulation(config, rng=np.random.default_rng(seed), verbose=False, profiler=profiler)
+
+    # Months are timed one by one
+    months_throughput = []
+    for _ in range(num_months):
+        num_days, month_start_time = simulation.num_day, time.perf_counter()
+        simulation.run_month()
+        months_throughput.append(len(simulation.investors) * (simulation.num_day - num_days) /
+                                 (time.perf_counter() - month_start_time))
+
+    simulation.run()
+    wall_time = time.perf_counter() - start_time
+
+    investors = simulation.investors
+    num_investor_days = len(investors) * simulation.num_days
+    report = profiler.get_report()
+
+    # Tokens of each group in farms at the end (all groups should take part in transfers in full population mode)
+    n = investors.num_lots
+    groups = investors.groups[investors.lot_investor[:n]]
+    mask_in_farm = investors.lot_farm[:n] >= 0
+    tokens_in_farms = {group: float(investors.lot_num[:n][mask_in_farm & (groups == code)].sum())
+                       for code, group in enumerate(investors.token_types) if group in investors}
+
+    return {
+        'num_investors': len(investors),
+        'num_months': num_months,
+        'full_population': full_population,
+        'transfer_groups': list(config.transfer_groups),
+        'wall_time': wall_time,
+        'investor_days_per_second': num_investor_days / wall_time,
+        'last_month_investor_days_per_second': months_throughput[-1],
+        'months_investor_days_per_second': months_throughput,
+        'budget': num_investor_days / THROUGHPUT_TARGET,
+        'num_lots': n,
+        'peak_rss_mb': report['peak_rss_mb'],
+        'tokens_in_farms': tokens_in_farms,
+        'phases': {name: stats['time'] for name, stats in report['phases'].items()}
+    }
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Full population run against the throughput target')
+    parser.add_argument('--investors', type=int, default=NUM_INVESTORS, help='number of Seed investors')
+    parser.add_argument('--months', type=int, default=NUM_MONTHS)
+    parser.add_argument('--compare', action='store_true', help='also run the default mode (Seed transfers only)')
+    parser.add_argument('--output', default='benchmarks/results/full_population.json', help='file for results')
+    args = parser.parse_args()
+
+    modes = [True, False] if args.compare else [True]
+    results = [run_full_population(args.investors, args.months, full_population=mode) for mode in modes]
+
+    for result in results:
+        log(f'{"Full population" if result["full_population"] else "Default mode"}: {result["num_investors"]} '
+            f'investors, {result["num_months"]} months in {result["wall_time"]:.1f} s '
+            f'({result["investor_days_per_second"]:,.0f} investor-days/s, '
+            f'last month {result["last_month_investor_days_per_second"]:,.0f} investor-days/s, '
+            f'budget {result["budget"]:.1f} s), '
+            f'lots = {result["num_lots"]:,}, peak RSS = {result["peak_rss_mb"]:.0f} MB')
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    log(f'Results are saved to {args.output}')
+
+    # Target is checked only for full population mode: for the whole run and for the last month
+    result = results[0]
+    if result['wall_time'] > result['budget'] or result['last_month_investor_days_per_second'] < THROUGHPUT_TARGET:
+        log(f'Throughput target of {THROUGHPUT_TARGET:,.0f} investor-days/s is missed')
+        sys.exit(1)
+    log(f'Throughput target of {THROUGHPUT_TARGET:,.0f} investor-days/s is met')
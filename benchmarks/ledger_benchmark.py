@@ -0,0 +1,168 @@
+"""
+    Throughput and memory of modelling with large populations of investors, lots of investors are kept in memory
+    or in memory-mapped files (see InvestorPool storage_path).
+
+    Run from the root of the project:
+        python -m benchmarks.ledger_benchmark --investors 10000 100000 --storage memory memmap
+        python -m benchmarks.ledger_benchmark --investors 1000000 --storage memmap --months 48
+
+    Each case is run in its own process, so peak RSS of the process is the peak of the case. Anonymous and file-backed
+    RSS (see /proc/self/status) are taken after each month: with memory-mapped lots only file-backed pages grow with
+    lots (OS could drop them), anonymous memory should stay bounded. The script exits with code 1 if anonymous RSS
+    of a memmap case grows by more than ANON_GROWTH_LIMIT of the size of lots.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from benchmarks.synthetic_configs import get_synthetic_config
+from models.investors import LOT_COLUMNS
+from modeling.simulation import Simulation
+from utilities.profiling import PhaseProfiler, get_peak_rss_mb
+from utilities.py_tools import log
+
+# Ways to keep lots of investors
+STORAGE_TYPES = ['memory', 'memmap']
+
+# Maximum growth of anonymous RSS of memmap cases from the first to the last month (share of the growth of lots)
+ANON_GROWTH_LIMIT = 0.1
+
+# Size of one lot in bytes
+LOT_BYTES = sum(np.dtype(dtype).itemsize for _, dtype, _ in LOT_COLUMNS)
+
+STATUS_PATH = '/proc/self/status'
+
+
+def get_folder_size_mb(folder_path: str) -> float:
+    """
+    Returns size of all files in the folder in MB
+    """
+
+    size = 0
+    for root, _, file_names in os.walk(folder_path):
+        size += sum(os.path.getsize(os.path.join(root, file_name)) for file_name in file_names)
+    return size / 2 ** 20
+
+
+def get_memory_status_mb() -> dict:
+    """
+    Returns current RSS of the process in MB: total, anonymous and file-backed (empty dictionary if it is not
+    available, /proc/self/status is read)
+    """
+
+    if not os.path.exists(STATUS_PATH):
+        return {}
+
+    names = {'VmRSS': 'rss_mb', 'RssAnon': 'rss_anon_mb', 'RssFile': 'rss_file_mb'}
+    status = {}
+    with open(STATUS_PATH) as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if name in names:
+                status[names[name]] = int(value.split()[0]) / 2 ** 10
+
+    return status
+
+
+def run_case(num_investors: int, storage: str, num_months: int, seed=0) -> dict:
+    """
+    Models months of the synthetic config
+    :param num_investors: number of Seed investors
+    :param storage: way to keep lots, one of STORAGE_TYPES
+    :param num_months: number of months
+    :return: dictionary with time, throughput, peak RSS (after creation of the simulation and at the end),
+        size of files and memory after each month
+    """
+
+    folder_path = tempfile.mkdtemp(prefix='ledger_benchmark_')
+    ledger_path = os.path.join(folder_path, 'ledger') if storage == 'memmap' else None
+    profiler = PhaseProfiler()
+
+    try:
+        start_time = time.perf_counter()
+        simulation = Simulation(get_synthetic_config(num_months, num_investors), rng=np.random.default_rng(seed),
+                                verbose=False, ledger_path=ledger_path, profiler=profiler)
+        time_init = time.perf_counter() - start_time
+        peak_rss_init = get_peak_rss_mb()
+
+        months = []
+        start_time = time.perf_counter()
+        with profiler.activate():
+            for num_month in range(num_months):
+                simulation.run_month()
+                num_lots = simulation.investors.num_lots
+                months.append({'month': num_month, 'num_lots': num_lots, 'lots_mb': num_lots * LOT_BYTES / 2 ** 20,
+                               'time': time.perf_counter() - start_time, **get_memory_status_mb()})
+        time_months = time.perf_counter() - start_time
+
+        size_ledger = get_folder_size_mb(ledger_path) if ledger_path is not None else 0.0
+
+    finally:
+        shutil.rmtree(folder_path, ignore_errors=True)
+
+    phases = profiler.get_report()['phases']
+    first, last = months[0], months[-1]
+    return {
+        'num_investors': num_investors,
+        'storage': storage,
+        'num_months': num_months,
+        'time_init': time_init,
+        'time_months': time_months,
+        'investor_days_per_second': len(simulation.investors) * simulation.num_days / time_months,
+        'lots_per_second': last['num_lots'] / time_months,
+        'num_lots': last['num_lots'],
+        'peak_rss_init_mb': peak_rss_init,
+        'peak_rss_mb': get_peak_rss_mb(),
+        'ledger_mb': size_ledger,
+        'lots_growth_mb': last['lots_mb'] - first['lots_mb'],
+        'rss_anon_growth_mb': last['rss_anon_mb'] - first['rss_anon_mb'] if 'rss_anon_mb' in last else None,
+        'months': months,
+        'phases': {name: stats['time'] for name, stats in phases.items()}
+    }
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Throughput and memory with large populations of investors')
+    parser.add_argument('--investors', type=int, nargs='*', default=[10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument('--storage', nargs='*', default=['memmap'], choices=STORAGE_TYPES)
+    parser.add_argument('--months', type=int, default=12, help='number of modelled months')
+    parser.add_argument('--output', default='benchmarks/results/ledger.json', help='file for results')
+    args = parser.parse_args()
+
+    results = []
+    for num_investors in args.investors:
+        for storage in args.storage:
+
+            # New process for each case, so peak RSS is not taken from the previous cases
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_case, num_investors, storage, args.months).result()
+
+            results.append(result)
+            anon_growth = 'n/a' if result['rss_anon_growth_mb'] is None else f'{result["rss_anon_growth_mb"]:.0f} MB'
+            log(f'{num_investors} investors ({storage}), {args.months} months: '
+                f'{result["investor_days_per_second"]:,.0f} investor-days/s, {result["lots_per_second"]:,.0f} lots/s, '
+                f'peak RSS = {result["peak_rss_mb"]:.0f} MB, anonymous RSS growth = {anon_growth} '
+                f'(lots growth = {result["lots_growth_mb"]:.0f} MB), lots = {result["num_lots"]:,}')
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    log(f'Results are saved to {args.output}')
+
+    # Anonymous memory of memmap cases should not grow with lots
+    failed = [result for result in results if result['storage'] == 'memmap' and result['rss_anon_growth_mb'] is not None
+              and result['rss_anon_growth_mb'] > ANON_GROWTH_LIMIT * result['lots_growth_mb']]
+    for result in failed:
+        log(f'Anonymous RSS of {result["num_investors"]} investors (memmap) grows with lots: '
+            f'{result["rss_anon_growth_mb"]:.0f} MB of {result["lots_growth_mb"]:.0f} MB')
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,283 @@
+"""
+    Benchmarks of farms, investors and full modelling runs on synthetic configs (see synthetic_configs.py).
+
+    Run from the root of the project:
+        python -m benchmarks.run_benchmarks --output benchmarks/results/current.json
+        python -m benchmarks.run_benchmarks --baseline benchmarks/results/baseline.json --threshold 0.25
+
+    Each case is timed several times (best time is used), results are saved to JSON with scaling exponents
+    (slope of log(time) by log(size) for each benchmark). With a baseline the script exits with code 1
+    if any case is slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from benchmarks.synthetic_configs import get_synthetic_config, get_synthetic_farms, register_synthetic_configs, \
+    TOKEN_TYPES
+from models.farms import Farm
+from modeling.simulation import Simulation, TURNOVER_DIVIDENDS_RATE
+from utilities.modelling_tools import create_investors, transfer_investors, pay_dividends
+from utilities.py_tools import log
+
+# Cases of each benchmark: parameters of the case (the first parameter is the size of scaling curve)
+SUITES = {
+    'default': {
+        'farm_add_tokens': [{'num_days': num_days} for num_days in [360, 1440, 5760]],
+        'farm_add_dividends': [{'num_days': num_days} for num_days in [360, 1440, 5760]],
+        'farm_update': [{'num_days': num_days} for num_days in [360, 1440, 5760]],
+        'create_investors': [{'num_investors': num} for num in [1000, 10000, 100000]],
+        'transfer_investors': [{'num_investors': num} for num in [100, 300, 1000]],
+        'transfer_farms': [{'num_farms': num, 'num_investors': 1000} for num in [2, 4, 8, 16]],
+        'pay_dividends': [{'num_investors': num} for num in [100, 300, 1000]],
+        'full_run_investors': [{'num_investors': num, 'num_months': 6} for num in [100, 300, 1000]],
+        'full_run_months': [{'num_months': num, 'num_investors': 300} for num in [3, 6, 12]]
+    },
+    'quick': {
+        'farm_add_tokens': [{'num_days': num_days} for num_days in [360, 1440]],
+        'farm_add_dividends': [{'num_days': num_days} for num_days in [360, 1440]],
+        'farm_update': [{'num_days': num_days} for num_days in [360, 1440]],
+        'create_investors': [{'num_investors': num} for num in [1000, 10000]],
+        'transfer_investors': [{'num_investors': num} for num in [100, 300]],
+        'transfer_farms': [{'num_farms': num, 'num_investors': 300} for num in [2, 4]],
+        'pay_dividends': [{'num_investors': num} for num in [100, 300]],
+        'full_run_investors': [{'num_investors': num, 'num_months': 2} for num in [100, 300]],
+        'full_run_months': [{'num_months': num, 'num_investors': 100} for num in [2, 4]]
+    }
+}
+
+# Number of months, after which state of investors is taken for transfer and dividends benchmarks
+NUM_MONTHS_STATE = 2
+
+
+def get_modelled_state(num_investors: int, num_farms=2) -> dict:
+    """
+    Models the first months of the synthetic config and adds dividends of the next day
+    :param num_investors: number of Seed investors
+    :param num_farms: number of farms (see get_synthetic_farms)
+    :return: dictionary with farms, investors and the next day
+    """
+
+    config = get_synthetic_config(NUM_MONTHS_STATE + 1, num_investors, farms=get_synthetic_farms(num_farms))
+    simulation = Simulation(config, rng=np.random.default_rng(0), verbose=False)
+    simulation.run(num_months=NUM_MONTHS_STATE)
+
+    day = simulation.num_day + 1
+    num_dividends = simulation.turnover_distribution[day - 1] * TURNOVER_DIVIDENDS_RATE
+    for farm in simulation.farms:
+        farm.add_dividends(day=day, num_tokens=num_dividends, type_dividends='Turnover', type_operation='smarty')
+
+    return {'farms': simulation.farms, 'investors': simulation.investors, 'day': day, 'num_dividends': num_dividends,
+            'freeze_period': simulation.config.freeze_period}
+
+
+def setup_farm(num_days: int, operation: str):
+    """
+    Creates SbPool and returns function that applies the operation for each day
+    """
+
+    farm = Farm(type='SbPool', params_tokens={'Seed': 1000, 'Community': 1000}, days_num=num_days, verbose=False)
+    farm.add_tokens(params_tokens={'Seed': 1000, 'Community': 1000}, day=1, currency_rate=0.001)
+    params_tokens = {token_type: 10.0 for token_type in TOKEN_TYPES[:3]}
+
+    def run():
+        for day in range(1, num_days + 1):
+            if operation == 'add_tokens':
+                farm.add_tokens(params_tokens=params_tokens, day=day)
+            elif operation == 'add_dividends':
+                farm.add_dividends(day=day, index_revenue=0.001, type_dividends='Minted',
+                                   type_operation='index_revenue')
+            else:
+                farm.update(day=day, clear_dividends=day % 10 == 0)
+
+    return run
+
+
+def setup_create_investors(num_investors: int):
+    params_investors = {'Seed': num_investors, 'Team': max(num_investors // 10, 1)}
+    params_modelling = {'num_months': 12, 'mu': 0.5, 'sigma': 0.1}
+    return lambda: create_investors(params_investors, params_modelling, rng=np.random.default_rng(0))
+
+
+def setup_transfer_investors(num_investors: int, states: dict, num_farms=2):
+
+    # State is modelled once for all repeats, each repeat works with its own copy
+    if (num_investors, num_farms) not in states:
+        states[(num_investors, num_farms)] = get_modelled_state(num_investors, num_farms=num_farms)
+    state = copy.deepcopy(states[(num_investors, num_farms)])
+
+    dividends = np.full(num_farms, state['num_dividends'])
+    return lambda: transfer_investors(farms=state['farms'], dict_investors=state['investors'], day=state['day'],
+                                      dividends=dividends, freeze_period=state['freeze_period'])
+
+
+def setup_pay_dividends(num_investors: int, states: dict):
+
+    if (num_investors, 2) not in states:
+        states[(num_investors, 2)] = get_modelled_state(num_investors)
+    state = copy.deepcopy(states[(num_investors, 2)])
+
+    def run():
+        for farm in list(state['farms'])[::-1]:
+            pay_dividends(dict_investors=state['investors'], farm=farm, day=state['day'])
+
+    return run
+
+
+def setup_full_run(num_investors: int, num_months: int):
+    config = get_synthetic_config(num_months, num_investors)
+    return lambda: Simulation(config, rng=np.random.default_rng(0), verbose=False).run()
+
+
+def get_case_function(name: str, params: dict, states: dict):
+    """
+    Prepares the case (not timed) and returns function that is timed
+    """
+
+    if name.startswith('farm_'):
+        return setup_farm(params['num_days'], operation=name[len('farm_'):])
+    elif name == 'create_investors':
+        return setup_create_investors(params['num_investors'])
+    elif name == 'transfer_investors':
+        return setup_transfer_investors(params['num_investors'], states=states)
+    elif name == 'transfer_farms':
+        return setup_transfer_investors(params['num_investors'], states=states, num_farms=params['num_farms'])
+    elif name == 'pay_dividends':
+        return setup_pay_dividends(params['num_investors'], states=states)
+    elif name.startswith('full_run'):
+        return setup_full_run(params['num_investors'], params['num_months'])
+
+    raise ValueError(f'Benchmark should be one of: {list(SUITES["default"].keys())}, got {name}')
+
+
+def get_case_key(name: str, params: dict) -> str:
+    """
+    Gets key of the case in results, e.g. 'full_run_months[num_months=6,num_investors=300]'
+    """
+    return name + '[' + ','.join(f'{key}={value}' for key, value in params.items()) + ']'
+
+
+def get_scaling_exponent(sizes, times) -> float:
+    """
+    Gets slope of log(time) by log(size), 1 - linear scaling
+    """
+
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+def run_benchmarks(suite='default', names=None, repeats=3) -> dict:
+    """
+    Times all cases of the suite
+    :param suite: name of the suite (see SUITES)
+    :param names: names of benchmarks to run, all benchmarks of the suite by default
+    :param repeats: number of repeats of each case (the best time is used)
+    :return: dictionary with metadata, time of each case and scaling exponents
+    """
+
+    benchmarks = SUITES[suite]
+    names = list(benchmarks.keys()) if names is None else names
+
+    # Farms and investors take token types from synthetic token params instead of config files
+    register_synthetic_configs()
+
+    # Modelled states are shared by transfer and dividends benchmarks
+    states = {}
+
+    cases, scaling = {}, {}
+    for name in names:
+        sizes, best_times = [], []
+        for params in benchmarks[name]:
+            times = []
+            for _ in range(repeats):
+                run = get_case_function(name, params, states=states)
+                start_time = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start_time)
+
+            key = get_case_key(name, params)
+            cases[key] = {'benchmark': name, 'params': params, 'time': min(times), 'times': times}
+            log(f'{key}: {min(times):.4f} s')
+
+            sizes.append(next(iter(params.values())))
+            best_times.append(min(times))
+
+        scaling[name] = {'size': next(iter(benchmarks[name][0].keys())), 'sizes': sizes, 'times': best_times,
+                         'exponent': get_scaling_exponent(sizes, best_times)}
+
+    metadata = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'suite': suite,
+        'repeats': repeats,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor()
+    }
+
+    return {'metadata': metadata, 'cases': cases, 'scaling': scaling}
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Finds cases that are slower than in the baseline
+    :param results: results of run_benchmarks
+    :param baseline: results that are used as a baseline
+    :param threshold: allowed relative slowdown, e.g. 0.25 - 25%
+    :return: list of (case key, baseline time, current time) for regressions
+    """
+
+    regressions = []
+    for key, case in results['cases'].items():
+        if key not in baseline['cases']:
+            continue
+
+        time_baseline = baseline['cases'][key]['time']
+        if case['time'] > time_baseline * (1 + threshold):
+            regressions.append((key, time_baseline, case['time']))
+
+    return regressions
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks on synthetic configs')
+    parser.add_argument('--suite', default='default', choices=list(SUITES.keys()))
+    parser.add_argument('--benchmarks', nargs='*', default=None, help='names of benchmarks (all by default)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='benchmarks/results/latest.json', help='file for results')
+    parser.add_argument('--baseline', default=None, help='file with baseline results')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    results = run_benchmarks(suite=args.suite, names=args.benchmarks, repeats=args.repeats)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    log(f'Results are saved to {args.output}')
+
+    for name, curve in results['scaling'].items():
+        if curve['exponent'] is not None:
+            log(f'{name}: time ~ {curve["size"]} ^ {curve["exponent"]:.2f}')
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = compare_with_baseline(results, baseline, threshold=args.threshold)
+        for key, time_baseline, time_current in regressions:
+            log(f'Regression in {key}: {time_baseline:.4f} s -> {time_current:.4f} s')
+
+        if regressions:
+            sys.exit(1)
+        log(f'No regressions over {args.threshold:.0%} compared with {args.baseline}')
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from preprocessing.prepare_config_files import register_sample
+from modeling.simulation import prepare_modelling_params, SimulationConfig
+
+# Token types of synthetic configs (the same as in the project configs) and their prices
+TOKEN_TYPES = ['Seed', 'Private sale', 'Public sale', 'Team', 'Community', 'Staking rewards']
+TOKEN_PRICES = [0.01, 0.02, 0.03, 0.0, 0.0, 0.0]
+
+# Number of tokens of each type that are released in the first month (released tokens grow by 1% each month),
+# Seed and Community tokens of the first month are enough for their tokens in SbPool
+MINT_FIRST_MONTH = [1_000_000, 500_000, 300_000, 200_000, 300_000, 50_000]
+
+
+def get_synthetic_token_params() -> pd.DataFrame:
+    """
+    Gets token params in the same format as config/tokens_params.xlsx
+    """
+    return pd.DataFrame({'Token_type': TOKEN_TYPES, 'Price': TOKEN_PRICES})
+
+
+def get_synthetic_mint_distr(num_months: int, scale=1.0) -> pd.DataFrame:
+    """
+    Gets mint distribution in the same format as config/token_mint_distr.xlsx
+    :param num_months: number of months
+    :param scale: multiplier of released tokens (e.g. number of investors / 1000 to keep tokens per investor)
+    :return: DataFrame with column 'Token_type' and one column per month
+    """
+
+    growth = 1.01 ** np.arange(num_months)
+    values = np.round(np.outer(MINT_FIRST_MONTH, growth) * scale).astype(np.int64)
+
+    df = pd.DataFrame(values, columns=range(num_months))
+    df.insert(0, 'Token_type', TOKEN_TYPES)
+    return df
+
+
+def get_synthetic_initial_params(num_months: int, num_investors: int, **kwargs) -> pd.DataFrame:
+    """
+    Gets constants in the same format as prepare_initial_params_sample (columns are already renamed)
+    :param num_months: number of months
+    :param num_investors: number of Seed investors (investors of other groups are 10% of them)
+    :param kwargs: values of other constants (see columns of the DataFrame)
+    :return: DataFrame with one row
+    """
+
+    num_others = max(num_investors // 10, 1)
+    constants = {
+        'months_num': num_months,
+        'risk_mu': 0.5,
+        'risk_std': 0.1,
+        'min_revenue_index': 0.001,
+        'turnover_rate': 0.2,
+        'turnover': 3_600_000,
+        'dividends_percent': 0.3,
+        'extra_mint_period': 7,
+        'dividends_period': 10,
+        'investors_seed_num': num_investors,
+        'investors_private_sale_num': num_others,
+        'investors_public_sale_num': num_others,
+        'investors_team_num': num_others,
+        'investors_community_num': num_others,
+        'tokens_seed_num_sb_pool': 500_000,
+        'tokens_community_num_sb_pool': 200_000,
+        'bnb_smarty_ratio': 0.001,
+        'dollar_bnb_ratio': 400
+    }
+    constants.update(kwargs)
+
+    return pd.DataFrame({name: [value] for name, value in constants.items()})
+
+
+def get_synthetic_farms(num_farms: int) -> list:
+    """
+    Gets farms for config of modelling: SbPool, DivFarm and extra farms of DivFarm type,
+    turnover dividends are split between farms equally
+    :param num_farms: number of farms (at least 2)
+    :return: list with params of farms (see FARMS in modeling/simulation.py)
+    """
+
+    if num_farms < 2:
+        raise ValueError(f'Number of farms should be at least 2, got {num_farms}')
+
+    dividends_rate = 1 / num_farms
+    farms = [{'name': 'SbPool', 'type': 'SbPool', 'dividends_rate': dividends_rate, 'key': 'sb_pool'},
+             {'name': 'DivFarm', 'type': 'DivFarm', 'dividends_rate': dividends_rate, 'key': 'div_farm'}]
+    farms += [{'name': f'DivFarm {index}', 'type': 'DivFarm', 'dividends_rate': dividends_rate}
+              for index in range(2, num_farms)]
+
+    return farms
+
+
+def register_synthetic_configs():
+    """
+    Puts synthetic token params in loaded config files, so farms and investors do not read config files
+    """
+    register_sample('config/tokens_params.xlsx', get_synthetic_token_params())
+
+
+def get_synthetic_config(num_months: int, num_investors: int, full_population=False, **overrides) -> SimulationConfig:
+    """
+    Creates config of modelling from synthetic constants and mint distribution.
+    Released tokens are proportional to the number of investors
+    :param num_months: number of months
+    :param num_investors: number of Seed investors
+    :param full_population: flag if all groups of investors are modelled (see prepare_modelling_params)
+    :param overrides: modelling parameters (see SimulationConfig)
+    :return: SimulationConfig object
+    """
+
+    register_synthetic_configs()
+
+    scale = num_investors / 1000
+    df_initial_params = get_synthetic_initial_params(num_months, num_investors,
+                                                     tokens_seed_num_sb_pool=max(int(500_000 * scale), 1),
+                                                     tokens_community_num_sb_pool=max(int(200_000 * scale), 1))
+
+    params = prepare_modelling_params(df_initial_params, full_population=full_population)
+    params.update(overrides)
+    return SimulationConfig(df_mint_distr=get_synthetic_mint_distr(num_months, scale=scale), **params)
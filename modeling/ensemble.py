@@ -0,0 +1,115 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from preprocessing.prepare_config_files import prepare_config_samples
+from modeling.simulation import prepare_modelling_params, run_simulation, SimulationConfig
+from utilities.py_tools import log
+from utilities.turnover_drivers import get_turnover_paths
+
+
+def get_ensemble_stats(farm_keys: list) -> list:
+    """
+    Gets names of statistics that are collected from each run (one value for each day):
+    currency rate, tokens and dividends of each farm
+    :param farm_keys: keys of farms in order of their ids (see SimulationConfig.get_farm_keys)
+    :return: list with names of statistics
+    """
+    return ['currency_rate', *[f'{key}_tokens' for key in farm_keys], *[f'{key}_dividends' for key in farm_keys]]
+
+
+def get_run_statistics(results: dict, num_days: int) -> dict:
+    """
+    Gets statistics of one run as arrays
+    :param results: results of run_simulation
+    :param num_days: number of modelled days
+    :return: dictionary with (name of statistic: array with value for each day)
+    """
+
+    farms, farm_keys, recorder = results['farms'], results['farm_keys'], results['recorder']
+    days = np.arange(1, num_days + 1)
+
+    stats = {'currency_rate': recorder.get_series('currency_rate', last_day=num_days).copy()}
+    for key in farm_keys:
+        stats[f'{key}_tokens'] = recorder.get_series(f'{key}_tokens', last_day=num_days).copy()
+    for key, farm in zip(farm_keys, farms):
+        stats[f'{key}_dividends'] = np.array([farm.get_current_dividends(day=day) for day in days], dtype=np.float64)
+
+    return stats
+
+
+def run_replication(params: dict, df_mint_distr: pd.DataFrame, seed_sequence: np.random.SeedSequence) -> dict:
+    """
+    Runs one replication of the ensemble with its own random numbers generator
+    :param params: dictionary with modelling parameters
+    :param df_mint_distr: DataFrame with mint distribution
+    :param seed_sequence: SeedSequence of the replication
+    :return: dictionary with statistics of the run
+    """
+
+    rng = np.random.default_rng(seed_sequence)
+    results = run_simulation(params=params, df_mint_distr=df_mint_distr, rng=rng, verbose=False)
+    return get_run_statistics(results, num_days=params['num_months'] * 30)
+
+
+def run_ensemble(params: dict, df_mint_distr: pd.DataFrame, num_runs: int, seed=None, num_workers=None) -> dict:
+    """
+    Runs independent replications of modelling on a process pool.
+    Each replication gets a Generator spawned from the master SeedSequence, so results do not depend
+    on the number of workers
+    :param params: dictionary with modelling parameters (with turnover_noise each run gets its own turnover path)
+    :param df_mint_distr: DataFrame with mint distribution
+    :param num_runs: number of replications
+    :param seed: master seed, random by default (entropy is returned to repeat the ensemble)
+    :param num_workers: number of processes, number of CPUs by default (1 - run in the current process)
+    :return: dictionary with (name of statistic: array num_runs x num_days) and master seed entropy
+    """
+
+    seed_sequence = np.random.SeedSequence(seed)
+    seed_turnover = seed_sequence.spawn(1)[0]
+    seeds_runs = seed_sequence.spawn(num_runs)
+    log(f'Ensemble of {num_runs} runs started, seed entropy = {seed_sequence.entropy}')
+
+    # Random turnover paths of all runs are generated at once, ensembles with the same seed get the same paths
+    # for any other parameters
+    if params.get('turnover_noise') is not None and params.get('turnover_path') is None:
+        paths = get_turnover_paths(turnover=params['turnover'], turnover_rate=params['turnover_rate'],
+                                   num_days=params['num_years'] * 360, growth_type=params['turnover_growth'],
+                                   noise=params['turnover_noise'], num_paths=num_runs,
+                                   rng=np.random.default_rng(seed_turnover), **params['turnover_params'])
+        params_runs = [dict(params, turnover_path=path) for path in paths]
+    else:
+        params_runs = [params] * num_runs
+
+    if num_workers == 1:
+        stats_runs = [run_replication(params_run, df_mint_distr, seed_run)
+                      for params_run, seed_run in zip(params_runs, seeds_runs)]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(run_replication, params_run, df_mint_distr, seed_run)
+                       for params_run, seed_run in zip(params_runs, seeds_runs)]
+            stats_runs = [future.result() for future in futures]
+
+    # Stack statistics of all runs
+    farm_keys = SimulationConfig(df_mint_distr=df_mint_distr, **params).get_farm_keys()
+    ensemble = {name: np.stack([stats[name] for stats in stats_runs]) for name in get_ensemble_stats(farm_keys)}
+    ensemble['entropy'] = seed_sequence.entropy
+
+    log(f'Ensemble of {num_runs} runs finished')
+    return ensemble
+
+
+if __name__ == '__main__':
+
+    PATH_CONSTANTS = 'config/constants.xlsx'
+    PATH_RESULTS = '../results/'
+    NUM_RUNS = 10
+
+    df_initial_params, df_mint_distr, _ = prepare_config_samples(path_constants=PATH_CONSTANTS)
+    params_modelling = prepare_modelling_params(df_initial_params)
+
+    ensemble_results = run_ensemble(params=params_modelling, df_mint_distr=df_mint_distr, num_runs=NUM_RUNS)
+
+    current_time = datetime.now().strftime("%Y%m%d-%H%M%S").replace('-', '_')
+    np.savez_compressed(PATH_RESULTS + f'ensemble_{current_time}.npz', **ensemble_results)
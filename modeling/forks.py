@@ -0,0 +1,95 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from preprocessing.prepare_config_files import prepare_config_samples
+from modeling.simulation import SimulationConfig, Simulation
+from modeling.ensemble import get_run_statistics
+from modeling.sweep import get_sweep_grid
+from utilities.py_tools import log
+
+
+def run_branch(folder_path: str, config: SimulationConfig) -> pd.DataFrame:
+    """
+    Continues modelling from the shared state with the config of the branch
+    :param folder_path: folder with the state (see Simulation.save_fork_state)
+    :param config: SimulationConfig of the branch
+    :return: DataFrame with statistics for each day after the fork
+    """
+
+    simulation = Simulation.load_checkpoint(folder_path, config=config, verbose=False, mmap_mode='c')
+    fork_day = simulation.num_day
+    results = simulation.run()
+
+    df = pd.DataFrame(get_run_statistics(results, num_days=simulation.num_days))
+    df.insert(0, 'Day', np.arange(1, simulation.num_days + 1))
+
+    return df[df['Day'] > fork_day].reset_index(drop=True)
+
+
+def run_forks(simulation: Simulation, overrides, num_workers=None) -> pd.DataFrame:
+    """
+    Runs branches of modelling from the current state of the simulation on a process pool.
+    All branches share the history of the simulation (see Simulation.fork) and get the same random numbers
+    :param simulation: Simulation object, which is modelled up to the day of the fork
+    :param overrides: list of dictionaries with (parameter name: value) or grid (see get_sweep_grid),
+        names are the modelling parameters (see SimulationConfig)
+    :param num_workers: number of processes, number of CPUs by default (1 - run in the current process)
+    :return: tidy DataFrame with columns [overridden parameters, 'Day', statistics] for days after the fork
+    """
+
+    if isinstance(overrides, dict):
+        overrides = get_sweep_grid(overrides)
+
+    # Check that all parameters exist in config
+    params = simulation.config.to_params()
+    for branch in overrides:
+        for name in branch.keys():
+            if name not in params:
+                raise ValueError(f'Parameter {name} should be one of: {list(params.keys())}')
+
+    folder_path = simulation.save_fork_state()
+    configs = [simulation.config.copy(**branch) for branch in overrides]
+    log(f'{len(overrides)} branches from day={simulation.num_day} started')
+
+    if num_workers == 1:
+        results = [run_branch(folder_path, config) for config in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(run_branch, folder_path, config) for config in configs]
+            results = [future.result() for future in futures]
+
+    # Join results of all branches in one table
+    for branch, df in zip(overrides, results):
+        for index, (name, value) in enumerate(branch.items()):
+            df.insert(index, name, value)
+
+    log('Branches finished')
+    return pd.concat(results, ignore_index=True)
+
+
+if __name__ == '__main__':
+
+    PATH_CONSTANTS = 'config/constants.xlsx'
+    PATH_RESULTS = '../results/'
+
+    # Month, from which parameters are changed
+    NUM_MONTH_FORK = 24
+
+    # Values of parameters to check after the fork
+    GRID = {
+        'period_dividends': [7, 10, 30],
+        'min_index_revenue': [0.001, 0.005]
+    }
+
+    df_initial_params, df_mint_distr, _ = prepare_config_samples(path_constants=PATH_CONSTANTS)
+    config = SimulationConfig.from_params_sample(df_initial_params, df_mint_distr)
+
+    # Model the shared months once
+    parent = Simulation(config=config, rng=np.random.default_rng(0), verbose=False)
+    parent.run(num_months=NUM_MONTH_FORK)
+
+    df_forks = run_forks(parent, overrides=GRID)
+    parent.close_forks()
+
+    df_forks.to_csv(PATH_RESULTS + f'forks_month_{NUM_MONTH_FORK}.csv', index=False)
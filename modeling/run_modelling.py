@@ -2,16 +2,14 @@
     0. Imports of modules
 """
 
-import pandas as pd
 import numpy as np
-from preprocessing.prepare_config_files import prepare_token_params_sample, prepare_initial_params_sample, prepare_mint_sample
-from utilities.py_tools import log, get_turnover_distribution
-from models.farms import Farm
-from utilities.modelling_tools import create_investors, sell_tokens, get_mint_distribution_by_month, \
-    distribute_tokens_by_days, get_tokens_distribution_by_day, transfer_investors, pay_dividends
+from preprocessing.prepare_config_files import prepare_config_samples
+from utilities.py_tools import log
+from modeling.simulation import SimulationConfig, Simulation
 
 from utilities.prepare_results import save_results
-from tqdm import tqdm
+from utilities.result_sinks import get_result_sink
+from utilities.profiling import PhaseProfiler
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -23,200 +21,77 @@ warnings.filterwarnings('ignore')
 # Path for a config file with Initial Params
 PATH_CONSTANTS = 'config/constants.xlsx'
 
-# Read DataFrame with initial Params
-df_initial_params = prepare_initial_params_sample(PATH_CONSTANTS)
-df_mint_distr = prepare_mint_sample()
+# Read DataFrames with initial Params and mint distribution (token params are loaded too)
+df_initial_params, df_mint_distr, _ = prepare_config_samples(path_constants=PATH_CONSTANTS)
 
-# Params for risk coefficient distribution
-MU, SIGMA = float(df_initial_params['risk_mu'].values[0]), float(df_initial_params['risk_std'].values[0])
+# Pay dividends with cumulative dividends per token index instead of paying each investor on payout day
+ACCRUAL_DIVIDENDS = False
 
-# Number of months and years to run modelling
-NUM_MONTHS = int(df_initial_params['months_num'].values[0])
-NUM_YEARS = NUM_MONTHS // 12 + 1
+# Flag if all groups of investors (with Community) get their tokens and transfer them between farms with staking
+# rewards, by default only Seed investors transfer tokens. Throughput target of this mode and its benchmark:
+# benchmarks/full_population_benchmark.py
+FULL_POPULATION = False
 
-# Modelling parameters dictionary
-PARAMS_MODELLING = {
-    'num_months': NUM_MONTHS,
-    'mu': MU,
-    'sigma': SIGMA
-}
-
-# Number of investors for different types
-NUM_INVESTORS_SEED = int(df_initial_params['investors_seed_num'].values[0])
-NUM_INVESTORS_PRIVATE_SALE = int(df_initial_params['investors_private_sale_num'].values[0])
-NUM_INVESTORS_PUBLIC_SALE = int(df_initial_params['investors_public_sale_num'].values[0])
-NUM_INVESTORS_TEAM = int(df_initial_params['investors_team_num'].values[0])
-NUM_INVESTORS_COMMUNITY = int(df_initial_params['investors_community_num'].values[0])
-
-MIN_INDEX_REVENUE = float(df_initial_params['min_revenue_index'].values[0])
-
-PARAMS_INVESTORS = {
-    'Seed': NUM_INVESTORS_SEED,
-    'Private sale': NUM_INVESTORS_PRIVATE_SALE,
-    'Public sale': NUM_INVESTORS_PUBLIC_SALE,
-    'Team': NUM_INVESTORS_TEAM,
-
-    # todo: Community investors are not included now
-    # 'Community': NUM_INVESTORS_COMMUNITY,
-}
-
-# Turnover parameters
-TURNOVER, TURNOVER_RATE = float(df_initial_params['turnover'].values[0]), float(df_initial_params['turnover_rate'].values[0])
-
-# Percent of turnover that is paid as dividends
-PERCENT_DIVIDENDS = float(df_initial_params['dividends_percent'].values[0])
-
-# Periods of extra mint and dividends payments
-PERIOD_EXTRA_MINT = int(df_initial_params['extra_mint_period'].values[0])
-PERIOD_DIVIDENDS = int(df_initial_params['dividends_period'].values[0])
-
-# Distribution of the turnover
-TURNOVER_DISTRIBUTION = get_turnover_distribution(turnover=TURNOVER, turnover_rate=TURNOVER_RATE, num_years=NUM_YEARS)
-
-# Currency rates
-RATE_USD_BNB = float(df_initial_params['dollar_bnb_ratio'])
-RATE_BNB_SMARTY = float(df_initial_params['bnb_smarty_ratio'])
-
-# Number of tokens in SbPool
-NUM_SEED_TOKENS_SB_POOL = int(df_initial_params['tokens_seed_num_sb_pool'].values[0])
-NUM_COMMUNITY_TOKENS_SB_POOL = int(df_initial_params['tokens_community_num_sb_pool'].values[0])
-
-# Token parameters for SbPool
-PARAMS_TOKENS_SB_POOL = {
-    'Seed': NUM_SEED_TOKENS_SB_POOL,
-    'Community': NUM_COMMUNITY_TOKENS_SB_POOL
-}
-
-
-# Tokens that we are not modelling now
-# todo: Now we are modelling only Seed tokens (to see the main trend)
-TOKENS_EXCLUDED = ['Community', 'Staking rewards', 'Public sale', 'Private sale']
+# Config with all modelling parameters
+CONFIG = SimulationConfig.from_params_sample(df_initial_params, df_mint_distr, full_population=FULL_POPULATION,
+                                             accrual_dividends=ACCRUAL_DIVIDENDS)
 
+# Seed of the random numbers generator (None for a new random run)
+SEED = None
 
 PATH_RESULTS = '../results/'
 
-"""
-    2. Initialize farms and investors 
-"""
+# Format of results that are written after each month: 'npz', 'csv', 'parquet' or 'feather' (pyarrow is needed)
+RESULTS_FORMAT = 'npz'
 
-# Initialize Sb Pool object with Seed and Community tokens
-sb_pool = Farm(type='SbPool', params_tokens=PARAMS_TOKENS_SB_POOL, days_num=NUM_MONTHS * 30 + 1)
-sb_pool.add_tokens(params_tokens=PARAMS_TOKENS_SB_POOL, day=1, currency_rate=RATE_BNB_SMARTY)
+# Flag if all results should also be saved to Excel file after modelling
+EXPORT_EXCEL = False
 
-# Initialize Div Farm pool object
-div_farm = Farm(type='DivFarm', days_num=NUM_MONTHS * 30 + 1)
+# Save checkpoints after each CHECKPOINT_MONTHS months (None - do not save)
+CHECKPOINT_MONTHS = None
+PATH_CHECKPOINTS = '../checkpoints/'
 
-# Initialize dictionary with Investor objects for all groups
-investors = create_investors(PARAMS_INVESTORS, PARAMS_MODELLING)
+# Flag if days without events are modelled at once (results are the same, see Simulation.step_event)
+SKIP_IDLE_DAYS = False
 
+# Folder for memory-mapped lots of investors, e.g. '../ledger/' for millions of investors (None - lots are in memory)
+PATH_LEDGER = None
 
-"""
-    3. Define extra parameters for keeping statistics
-"""
+# Flag if phases of modelling are timed (report is saved to PATH_RESULTS/profile_report.json)
+PROFILE = False
 
-cols_currency_rate = ['Day', 'BNB / Smarty Rate']
-df_currency_rate = pd.DataFrame(columns=cols_currency_rate)
+# Month that is profiled with cProfile (None - not profiled), stats are saved to PATH_RESULTS/profile_month_XXX.prof
+PROFILE_MONTH = None
 
-cols_turnover = ['Day', 'Shop Turnover, Smarty']
-df_turnover = pd.DataFrame(columns=cols_turnover)
+# Folder of the checkpoint to continue modelling from, e.g. '../checkpoints/month_024' (None - start from day 1)
+RESUME_FROM = None
 
 """
-    4. Run modelling
+    2. Run modelling
 """
 
-for num_month in range(0, NUM_MONTHS):
-
-    log(f'----- Modelling for month = {num_month} started -----')
-
-    # Get tokens that would be released during the current month
-    params_tokens = get_mint_distribution_by_month(mint_distr=df_mint_distr, num_month=num_month)
-
-    # Delete tokens, which are not included in modelling, from the distribution
-    for group in TOKENS_EXCLUDED:
-        del params_tokens[group]
-
-    # In a month = 0, we put some tokens in SbPool
-    if num_month == 0:
-
-        # Take away tokens that are put in SbPool
-        params_tokens['Seed'] -= NUM_SEED_TOKENS_SB_POOL
-
-        # todo: Community tokens are not included now
-        # params_tokens['Community'] -= NUM_COMMUNITY_TOKENS_SB_POOL
-
-    distribution_tokens_days = distribute_tokens_by_days(params_tokens)
-    for day in tqdm(range(1, 30 + 1)):
-
-        # Calculate number of the day
-        num_day = num_month * 30 + day
-
-        # Sell tokens to investors
-        distribution_tokens = get_tokens_distribution_by_day(distribution_tokens_days, day)
-        sell_tokens(investors=investors, params_tokens=distribution_tokens, day=num_day, excluded_tokens=TOKENS_EXCLUDED)
-
-        # Params for calculating dividends
-        sb_pool_rate = 0.5
-        div_farm_rate = 1 - sb_pool_rate
-        turnover, dividends_rate = TURNOVER_DISTRIBUTION[num_day - 1], 0.3 / 100
-
-        # Convert turnover dividends from USD to Smarty
-        bnb_smarty_rate = sb_pool.get_currency_rate(day=num_day)
-        turnover_smarty = turnover / RATE_USD_BNB / bnb_smarty_rate
-
-        df_turnover = df_turnover.append({'Day': day, 'Shop Turnover, Smarty': turnover}, ignore_index=True)
-
-        # Calculate dividends from turnover for each farm
-        div_sb_pool = turnover_smarty * dividends_rate * sb_pool_rate
-        div_div_farm = turnover_smarty * dividends_rate * div_farm_rate
-
-        # Add dividends to both farms
-        div_farm.add_dividends(day=num_day, num_tokens=div_div_farm, type_dividends='Turnover', type_operation='smarty')
-        sb_pool.add_dividends(day=num_day, num_tokens=div_sb_pool, type_dividends='Turnover', type_operation='smarty')
-
-        # Imitate transfer of tokens by investors
-        transfer_investors(sb_pool=sb_pool, div_sb_pool=div_div_farm,
-                           div_farm=div_farm, div_div_farm=div_div_farm,
-                           dict_investors=investors, day=num_day,
-                           freeze_period=10)
-
-        # Mint extra tokens for dividends( if needed)
-        if num_day % PERIOD_EXTRA_MINT == 0:
-
-            # Get current BNB / Smarty rate
-            bnb_smarty_rate = sb_pool.get_currency_rate(day=num_day)
-
-            # Mint Smarty tokens to DivFarm
-            div_farm.add_dividends(day=num_day, index_revenue=MIN_INDEX_REVENUE,
-                                   type_dividends='Minted', type_operation='index_revenue',
-                                   bnb_smarty_rate=bnb_smarty_rate)
-
-            # Mint Smarty tokens to SbPool
-            sb_pool.add_dividends(day=num_day, index_revenue=MIN_INDEX_REVENUE,
-                                  type_dividends='Minted', type_operation='index_revenue',
-                                  bnb_smarty_rate=bnb_smarty_rate)
-
-        # Pay dividends to investors (if needed)
-        if num_day % PERIOD_DIVIDENDS == 0:
-            pay_dividends(dict_investors=investors, farm=div_farm, day=num_day)
-            pay_dividends(dict_investors=investors, farm=sb_pool, day=num_day)
-
-            # Update farms parameters before going to the next day
-            sb_pool.update(day=num_day, clear_dividends=True)
-            div_farm.update(day=num_day, clear_dividends=True)
+profiler = PhaseProfiler(enabled=PROFILE, profile_month=PROFILE_MONTH, profile_path=PATH_RESULTS)
 
-        else:
-            # Update farms parameters before going to the next day
-            sb_pool.update(day=num_day)
-            div_farm.update(day=num_day)
+with get_result_sink(format=RESULTS_FORMAT, folder_path=PATH_RESULTS) as sink:
+    if RESUME_FROM is None:
+        simulation = Simulation(config=CONFIG, rng=np.random.default_rng(SEED), sink=sink,
+                                checkpoint_months=CHECKPOINT_MONTHS, checkpoint_path=PATH_CHECKPOINTS,
+                                skip_idle_days=SKIP_IDLE_DAYS, profiler=profiler, ledger_path=PATH_LEDGER)
+    else:
+        simulation = Simulation.load_checkpoint(RESUME_FROM, config=CONFIG, sink=sink,
+                                                checkpoint_months=CHECKPOINT_MONTHS, checkpoint_path=PATH_CHECKPOINTS,
+                                                skip_idle_days=SKIP_IDLE_DAYS, profiler=profiler)
+    results = simulation.run()
 
-        # Add BNB / Smarty rate stats for a current day
-        dict_currency_rate = {'Day': day, 'BNB / Smarty Rate': bnb_smarty_rate}
-        df_currency_rate = df_currency_rate.append(dict_currency_rate, ignore_index=True)
+log(f'Results are saved to {sink.folder_path}')
 
-    # log modelling completion for current month
-    log(f'Month {num_month} processed')
+if PROFILE:
+    profiler.save_report(PATH_RESULTS + 'profile_report.json')
+    log(f'Profiling report is saved to {PATH_RESULTS}profile_report.json')
 
-log('------ Saving results in Excel file ------')
-save_results(folder_path=PATH_RESULTS, div_farm=div_farm, sb_pool=sb_pool, df_currency_rate=df_currency_rate,
-             df_turnover=df_turnover)
+farms, investors = results['farms'], results['investors']
+df_currency_rate, df_turnover = results['df_currency_rate'], results['df_turnover']
 
+if EXPORT_EXCEL:
+    log('------ Saving results in Excel file ------')
+    save_results(folder_path=PATH_RESULTS, farms=farms, df_currency_rate=df_currency_rate, df_turnover=df_turnover)
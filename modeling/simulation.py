@@ -0,0 +1,815 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+import pandas as pd
+import numpy as np
+from utilities.py_tools import log
+from utilities.turnover_drivers import get_turnover_paths
+from utilities.metrics_recorder import MetricsRecorder
+from utilities.checkpoints import save_object_state, load_object_state, replace_folder
+from utilities.profiling import PhaseProfiler
+from utilities.result_sinks import FARM_TABLES
+from models.farms import Farm, FarmRegistry, FARM_TYPES
+from models.investors import InvestorPool
+from models.emission_schedule import EmissionSchedule, build_emission_schedule
+from utilities.modelling_tools import create_investors, transfer_investors, pay_dividends, get_idle_transfer_days, \
+    TRANSFER_GROUPS
+from tqdm import tqdm
+import warnings
+warnings.filterwarnings('ignore')
+
+
+# Tokens that we are not modelling by default (to see the main trend), see full_population in prepare_modelling_params
+TOKENS_EXCLUDED = ['Community', 'Staking rewards', 'Public sale', 'Private sale']
+
+# Part of the shop turnover that is paid as dividends and part of these dividends that goes to SbPool
+TURNOVER_DIVIDENDS_RATE = 0.3 / 100
+SB_POOL_DIVIDENDS_RATE = 0.5
+
+# Farms of the modelling in order of their ids: name, type, part of turnover dividends and key of statistics series
+# (extra farms of DivFarm type with their own parts of dividends could be added after SbPool and DivFarm)
+FARMS = [
+    {'name': 'SbPool', 'type': 'SbPool', 'dividends_rate': SB_POOL_DIVIDENDS_RATE, 'key': 'sb_pool'},
+    {'name': 'DivFarm', 'type': 'DivFarm', 'dividends_rate': 1 - SB_POOL_DIVIDENDS_RATE, 'key': 'div_farm'}
+]
+
+
+def prepare_modelling_params(df_initial_params: pd.DataFrame, full_population=False) -> dict:
+    """
+    Gets all modelling parameters from DataFrame with constants
+    :param df_initial_params: DataFrame from prepare_initial_params_sample
+    :param full_population: flag if all groups of investors (with Community) get their tokens and transfer them
+        between farms (with staking rewards), by default only Seed investors transfer tokens
+        and tokens of TOKENS_EXCLUDED are not sold
+    :return: dictionary with modelling parameters
+    """
+
+    # Number of months and years to run modelling
+    num_months = int(df_initial_params['months_num'].values[0])
+
+    params = {
+        'num_months': num_months,
+        'num_years': num_months // 12 + 1,
+
+        # Params for risk coefficient distribution
+        'mu': float(df_initial_params['risk_mu'].values[0]),
+        'sigma': float(df_initial_params['risk_std'].values[0]),
+
+        # Number of investors for different types
+        'params_investors': {
+            'Seed': int(df_initial_params['investors_seed_num'].values[0]),
+            'Private sale': int(df_initial_params['investors_private_sale_num'].values[0]),
+            'Public sale': int(df_initial_params['investors_public_sale_num'].values[0]),
+            'Team': int(df_initial_params['investors_team_num'].values[0]),
+        },
+
+        'min_index_revenue': float(df_initial_params['min_revenue_index'].values[0]),
+
+        # Turnover parameters
+        'turnover': float(df_initial_params['turnover'].values[0]),
+        'turnover_rate': float(df_initial_params['turnover_rate'].values[0]),
+
+        # Type of turnover growth, random noise and their parameters (see utilities/turnover_drivers.py)
+        'turnover_growth': 'compound',
+        'turnover_noise': None,
+        'turnover_params': {},
+
+        # Percent of turnover that is paid as dividends
+        'percent_dividends': float(df_initial_params['dividends_percent'].values[0]),
+
+        # Periods of extra mint and dividends payments
+        'period_extra_mint': int(df_initial_params['extra_mint_period'].values[0]),
+        'period_dividends': int(df_initial_params['dividends_period'].values[0]),
+
+        # Currency rates
+        'rate_usd_bnb': float(df_initial_params['dollar_bnb_ratio'].values[0]),
+        'rate_bnb_smarty': float(df_initial_params['bnb_smarty_ratio'].values[0]),
+
+        # Token parameters for SbPool
+        'params_tokens_sb_pool': {
+            'Seed': int(df_initial_params['tokens_seed_num_sb_pool'].values[0]),
+            'Community': int(df_initial_params['tokens_community_num_sb_pool'].values[0])
+        },
+
+        'tokens_excluded': TOKENS_EXCLUDED,
+        'transfer_groups': TRANSFER_GROUPS,
+        'freeze_period': 10,
+        'farms': FARMS,
+
+        # Pay dividends with cumulative dividends per token index instead of paying each investor on payout day
+        'accrual_dividends': False
+    }
+
+    # Community investors and tokens of all groups are included only in full population mode
+    if full_population:
+        params['params_investors']['Community'] = int(df_initial_params['investors_community_num'].values[0])
+        params['tokens_excluded'] = []
+        params['transfer_groups'] = list(params['params_investors'].keys())
+
+    return params
+
+
+class SimulationConfig:
+    """
+    All inputs of the simulation: modelling parameters (see prepare_modelling_params) and mint distribution
+    """
+
+    def __init__(self, df_mint_distr: pd.DataFrame, **kwargs):
+
+        self.df_mint_distr = df_mint_distr
+
+        self.num_months = kwargs.get('num_months', 48)
+        self.num_years = self.num_months // 12 + 1
+
+        # Params for risk coefficient distribution
+        self.mu = kwargs.get('mu', 0.0)
+        self.sigma = kwargs.get('sigma', 1.0)
+
+        # Number of investors for different types
+        self.params_investors = kwargs.get('params_investors', {'Seed': 0})
+
+        self.min_index_revenue = kwargs.get('min_index_revenue', 0.0)
+
+        # Turnover parameters
+        self.turnover = kwargs.get('turnover', 0.0)
+        self.turnover_rate = kwargs.get('turnover_rate', 0.0)
+        self.turnover_growth = kwargs.get('turnover_growth', 'compound')
+        self.turnover_noise = kwargs.get('turnover_noise', None)
+        self.turnover_params = kwargs.get('turnover_params', {})
+
+        # Turnover for each day, if it is set, turnover is not generated (e.g. paths of ensemble are generated at once)
+        self.turnover_path = kwargs.get('turnover_path', None)
+        self.percent_dividends = kwargs.get('percent_dividends', 0.0)
+
+        # Periods of extra mint and dividends payments
+        self.period_extra_mint = kwargs.get('period_extra_mint', 30)
+        self.period_dividends = kwargs.get('period_dividends', 30)
+
+        # Currency rates
+        self.rate_usd_bnb = kwargs.get('rate_usd_bnb', 1.0)
+        self.rate_bnb_smarty = kwargs.get('rate_bnb_smarty', 1.0)
+
+        # Token parameters for SbPool
+        self.params_tokens_sb_pool = kwargs.get('params_tokens_sb_pool', {'Seed': 0, 'Community': 0})
+
+        self.tokens_excluded = kwargs.get('tokens_excluded', TOKENS_EXCLUDED)
+
+        # Groups of investors that transfer tokens between farms
+        self.transfer_groups = kwargs.get('transfer_groups', TRANSFER_GROUPS)
+        self.freeze_period = kwargs.get('freeze_period', 10)
+
+        # Farms that investors choose from (see FARMS)
+        self.farms = kwargs.get('farms', FARMS)
+        if [farm['type'] for farm in self.farms[:2]] != FARM_TYPES or \
+                any(farm['type'] != 'DivFarm' for farm in self.farms[2:]):
+            raise ValueError(f'Farms should be SbPool, DivFarm and extra farms of DivFarm type, '
+                             f'got {[farm["type"] for farm in self.farms]}')
+
+        self.accrual_dividends = kwargs.get('accrual_dividends', False)
+
+    @classmethod
+    def from_params_sample(cls, df_initial_params: pd.DataFrame, df_mint_distr: pd.DataFrame, full_population=False,
+                           **overrides):
+        """
+        Creates config from DataFrame with constants
+        :param df_initial_params: DataFrame from prepare_initial_params_sample
+        :param df_mint_distr: DataFrame with mint distribution
+        :param full_population: flag if all groups of investors are modelled (see prepare_modelling_params)
+        :param overrides: modelling parameters that replace parameters from constants
+        """
+
+        params = prepare_modelling_params(df_initial_params, full_population=full_population)
+        params.update(overrides)
+        return cls(df_mint_distr=df_mint_distr, **params)
+
+    def get_dividends_rates(self) -> list:
+        """
+        Returns parts of turnover dividends for farms in order of their ids
+        """
+        return [farm['dividends_rate'] for farm in self.farms]
+
+    def get_farm_keys(self) -> list:
+        """
+        Returns keys of statistics series for farms in order of their ids (farm_<id> if key is not set)
+        """
+        return [farm.get('key', f'farm_{farm_id}') for farm_id, farm in enumerate(self.farms)]
+
+    def to_params(self) -> dict:
+        """
+        Returns modelling parameters as a dictionary (without mint distribution)
+        """
+
+        params = dict(self.__dict__)
+        del params['df_mint_distr']
+        return params
+
+    def copy(self, **overrides):
+        """
+        Returns copy of the config with overridden modelling parameters
+        """
+
+        params = self.to_params()
+        params.update(overrides)
+        return SimulationConfig(df_mint_distr=self.df_mint_distr, **params)
+
+
+def get_turnover_path(config: SimulationConfig, seed: int) -> np.ndarray:
+    """
+    Gets turnover for each day of modelling
+    :param config: SimulationConfig object
+    :param seed: seed of random noise of the turnover
+    :return: array with turnover for each day
+    """
+
+    if config.turnover_path is not None:
+        return np.asarray(config.turnover_path, dtype=np.float64)
+
+    paths = get_turnover_paths(turnover=config.turnover, turnover_rate=config.turnover_rate,
+                               num_days=config.num_years * 360, growth_type=config.turnover_growth,
+                               noise=config.turnover_noise, rng=np.random.default_rng(seed), **config.turnover_params)
+    return paths[0]
+
+
+class Simulation:
+    """
+    Modelling of farms and investors. Results are kept in memory, saving them is left to the caller.
+
+    Days are processed one by one with step_day, run_month processes 30 days and run processes all
+    remaining months. If sink is passed, statistics of each month are written to it when the month is finished.
+    With skip_idle_days run_month goes from one event to the next one (see step_event): days, on which only
+    turnover dividends are added, are modelled at once with the same results.
+    If enabled profiler is passed, phases of each day and primitives of farms and investors are timed by it.
+
+    Full state could be saved with save_checkpoint (also automatically after months from checkpoint_months)
+    and modelling could be continued from it with load_checkpoint.
+    """
+
+    # Objects that are saved to their own folders in checkpoints
+    CHECKPOINT_OBJECTS = {'farms': FarmRegistry, 'investors': InvestorPool, 'recorder': MetricsRecorder,
+                          'schedule': EmissionSchedule}
+
+    def __init__(self, config: SimulationConfig, rng=None, verbose=True, sink=None, checkpoint_months=None,
+                 checkpoint_path=None, schedule_path=None, skip_idle_days=False, profiler=None, ledger_path=None):
+
+        self.config = config
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.verbose = verbose
+
+        # Flag if days without events are modelled at once (see step_event)
+        self.skip_idle_days = skip_idle_days
+
+        # PhaseProfiler object for timing phases of each day (see utilities/profiling.py), disabled by default
+        self.profiler = PhaseProfiler(enabled=False) if profiler is None else profiler
+
+        # ResultSink object (see utilities/result_sinks.py), it is not closed by Simulation
+        self.sink = sink
+
+        # Checkpoints are saved to checkpoint_path/month_XXX after each checkpoint_months months
+        # (or after months from the list), XXX - number of modelled months
+        self.checkpoint_months = checkpoint_months
+        self.checkpoint_path = checkpoint_path
+        if checkpoint_months is not None and checkpoint_path is None:
+            raise ValueError('checkpoint_path should be specified to save checkpoints')
+
+        # Folder with the state that is shared by forks and the day of this state (see fork)
+        self.fork_path = None
+        self.fork_day = None
+
+        # Number of the last processed day (months start from zero, days start from one)
+        self.num_day = 0
+
+        # Distribution of the turnover, noise has its own seed, so the same runs of different scenarios
+        # get the same noise
+        self.turnover_seed = int(self.rng.integers(2 ** 63))
+        self.turnover_distribution = get_turnover_path(config, seed=self.turnover_seed)
+
+        """
+            1. Initialize farms and investors
+        """
+
+        # Initialize farms, id of the farm is its index in config.farms
+        self.farms = FarmRegistry()
+        for params_farm in config.farms:
+            self.farms.add(Farm(type=params_farm['type'], name=params_farm['name'],
+                                params_tokens=config.params_tokens_sb_pool, days_num=config.num_months * 30 + 1,
+                                accrual=config.accrual_dividends, verbose=verbose))
+
+        # Put Seed and Community tokens in Sb Pool
+        self.sb_pool.add_tokens(params_tokens=config.params_tokens_sb_pool, day=1,
+                                currency_rate=config.rate_bnb_smarty)
+
+        # Initialize pool with Investor objects for all groups, lots of investors are kept in memory-mapped files
+        # in ledger_path (if it is set), so large populations are not limited by memory
+        params_modelling = {'num_months': config.num_months, 'mu': config.mu, 'sigma': config.sigma}
+        self.investors = create_investors(config.params_investors, params_modelling, rng=self.rng,
+                                          storage_path=ledger_path, farm_names=self.farms.names)
+
+        # Distribute all released tokens by days and investors, schedule has its own seed, so it is taken from
+        # the file in schedule_path (if it exists) without changing other random numbers.
+        # Tokens of SbPool are taken from the month 0 of their groups (if these groups are sold)
+        initial_tokens = {group: num_tokens for group, num_tokens in config.params_tokens_sb_pool.items()
+                          if group not in config.tokens_excluded}
+        self.schedule = build_emission_schedule(mint_distr=config.df_mint_distr, investors=self.investors,
+                                                num_months=config.num_months, excluded_tokens=config.tokens_excluded,
+                                                initial_tokens=initial_tokens,
+                                                seed=int(self.rng.integers(2 ** 63)), folder_path=schedule_path,
+                                                verbose=verbose)
+
+        """
+            2. Define series for keeping statistics (one value per day)
+        """
+
+        self.recorder = MetricsRecorder(num_days=self.num_days)
+        self.recorder.register('currency_rate', column='BNB / Smarty Rate')
+        self.recorder.register('turnover', column='Shop Turnover, Smarty')
+        for key, farm in zip(config.get_farm_keys(), self.farms):
+            self.recorder.register(f'{key}_tokens', column=f'{farm.name} Tokens')
+        for key, farm in zip(config.get_farm_keys(), self.farms):
+            self.recorder.register(f'{key}_minted', column=f'{farm.name} Minted', fill_value=0.0)
+
+    @property
+    def sb_pool(self) -> Farm:
+        return self.farms[0]
+
+    @property
+    def div_farm(self) -> Farm:
+        return self.farms[1]
+
+    @property
+    def num_month(self) -> int:
+        """
+        Number of the month of the next day
+        """
+        return self.num_day // 30
+
+    @property
+    def num_days(self) -> int:
+        """
+        Number of days to model
+        """
+        return self.config.num_months * 30
+
+    @property
+    def df_currency_rate(self) -> pd.DataFrame:
+        """
+        DataFrame with BNB / Smarty rate for each modelled day
+        """
+        return self.recorder.to_frame(names=['currency_rate'])
+
+    @property
+    def df_turnover(self) -> pd.DataFrame:
+        """
+        DataFrame with shop turnover for each modelled day
+        """
+        return self.recorder.to_frame(names=['turnover'])
+
+    def start_month(self):
+        """
+        Logs start of the next month (tokens of all months are distributed in the emission schedule)
+        """
+
+        if self.verbose:
+            log(f'----- Modelling for month = {self.num_month} started -----')
+
+    def step_day(self):
+        """
+        Models the next day
+        """
+
+        if self.num_day >= self.num_days:
+            raise ValueError(f'All {self.config.num_months} months are already modelled')
+
+        if self.num_day % 30 == 0:
+            self.start_month()
+
+        # Calculate number of the day
+        num_day = self.num_day + 1
+
+        config, farms, sb_pool, investors, recorder, profiler = self.config, self.farms, self.sb_pool, \
+            self.investors, self.recorder, self.profiler
+        farm_keys = config.get_farm_keys()
+        profiler.count('days')
+
+        # Sell tokens to investors
+        with profiler.phase('sell_tokens'):
+            for group, (investor_ids, num_tokens) in self.schedule.get_day(num_day).items():
+                investors.add_tokens(investor_ids=investor_ids, params_tokens={group: num_tokens}, day=num_day)
+
+        # Params for calculating dividends
+        turnover, dividends_rate = self.turnover_distribution[num_day - 1], TURNOVER_DIVIDENDS_RATE
+
+        with profiler.phase('turnover_dividends'):
+
+            # Convert turnover dividends from USD to Smarty
+            bnb_smarty_rate = sb_pool.get_currency_rate(day=num_day)
+            turnover_smarty = turnover / config.rate_usd_bnb / bnb_smarty_rate
+
+            recorder.record('turnover', day=num_day, value=turnover)
+
+            # Calculate dividends from turnover for each farm and add them to farms
+            dividends = np.array([turnover_smarty * dividends_rate * farm_rate
+                                  for farm_rate in config.get_dividends_rates()])
+            for farm, num_dividends in zip(farms, dividends):
+                farm.add_dividends(day=num_day, num_tokens=num_dividends, type_dividends='Turnover',
+                                   type_operation='smarty')
+
+        # Imitate transfer of tokens by investors
+        with profiler.phase('transfer_investors'):
+            transfer_investors(farms=farms, dict_investors=investors, day=num_day, dividends=dividends,
+                               freeze_period=config.freeze_period, groups=config.transfer_groups)
+
+        # Mint extra tokens for dividends( if needed)
+        if num_day % config.period_extra_mint == 0:
+            profiler.count('mint_days')
+
+            # Get current BNB / Smarty rate
+            bnb_smarty_rate = sb_pool.get_currency_rate(day=num_day)
+
+            # Mint Smarty tokens to each farm
+            with profiler.phase('mint_dividends'):
+                for key, farm in zip(farm_keys, farms):
+                    minted = farm.add_dividends(day=num_day, index_revenue=config.min_index_revenue,
+                                                type_dividends='Minted', type_operation='index_revenue',
+                                                bnb_smarty_rate=bnb_smarty_rate)
+                    recorder.record(f'{key}_minted', day=num_day, value=minted)
+
+        # Pay dividends to investors (if needed)
+        if num_day % config.period_dividends == 0:
+            profiler.count('dividends_days')
+
+            # Staking rewards are added to investors from the last farm to the first one
+            with profiler.phase('pay_dividends'):
+                for farm in list(farms)[::-1]:
+                    pay_dividends(dict_investors=investors, farm=farm, day=num_day)
+
+            # Update farms parameters before going to the next day
+            with profiler.phase('update_farms'):
+                for farm in farms:
+                    farm.update(day=num_day, clear_dividends=True)
+
+        else:
+            # Update farms parameters before going to the next day
+            with profiler.phase('update_farms'):
+                for farm in farms:
+                    farm.update(day=num_day)
+
+        # Add stats for a current day
+        with profiler.phase('statistics'):
+            recorder.record('currency_rate', day=num_day, value=bnb_smarty_rate)
+            for key, farm in zip(farm_keys, farms):
+                recorder.record(f'{key}_tokens', day=num_day, value=farm.get_tokens_amount(day=num_day))
+
+        self.num_day = num_day
+        self.end_day()
+
+    def end_day(self):
+        """
+        Writes statistics and saves checkpoint after the last day of the month
+        """
+
+        num_day = self.num_day
+
+        # Write statistics of the finished month
+        if self.sink is not None and (num_day % 30 == 0 or num_day == self.num_days):
+            with self.profiler.phase('write_results'):
+                self.sink.write(self.get_chunk(first_day=(num_day - 1) // 30 * 30 + 1, last_day=num_day))
+
+        # Save checkpoint after the month (if needed)
+        if num_day % 30 == 0 and self.is_checkpoint_month(num_day // 30):
+            with self.profiler.phase('save_checkpoint'):
+                self.save_checkpoint(os.path.join(self.checkpoint_path, f'month_{num_day // 30:03d}'))
+
+    def get_turnover_dividends(self, first_day: int, last_day: int, bnb_smarty_rate: float) -> np.ndarray:
+        """
+        Gets dividends from turnover for the range of days with constant BNB / Smarty rate
+        (calculated in the same order as in step_day, so values are the same)
+        :return: array (day x farm) with number of Smarty tokens for each farm on each day
+        """
+
+        turnover = self.turnover_distribution[first_day - 1:last_day]
+        turnover_smarty = turnover / self.config.rate_usd_bnb / bnb_smarty_rate
+
+        return np.stack([turnover_smarty * TURNOVER_DIVIDENDS_RATE * farm_rate
+                         for farm_rate in self.config.get_dividends_rates()], axis=1)
+
+    def get_num_idle_days(self) -> int:
+        """
+        Counts days from the next day, on which only turnover dividends are added to farms: no tokens are sold,
+        minted or transferred and no dividends are paid (days up to the end of the month)
+        """
+
+        config = self.config
+        first_day = self.num_day + 1
+        days = np.arange(first_day, min((self.num_month + 1) * 30, self.num_days) + 1)
+
+        # Days with events from the emission schedule and periods of mint and dividends
+        events = self.schedule.has_sales(days) | (days % config.period_extra_mint == 0) | \
+            (days % config.period_dividends == 0)
+        days = days[:np.argmax(events)] if events.any() else days
+        if len(days) == 0:
+            return 0
+
+        # Rate does not change on idle days, so dividends of all days are known
+        bnb_smarty_rate = self.sb_pool.get_currency_rate(day=first_day)
+        dividends = self.get_turnover_dividends(first_day=first_day, last_day=days[-1],
+                                                bnb_smarty_rate=bnb_smarty_rate)
+
+        # Dividends are passed to transfer_investors in the same way as in step_day
+        return get_idle_transfer_days(farms=self.farms, dict_investors=self.investors, first_day=first_day,
+                                      dividends=dividends, freeze_period=config.freeze_period,
+                                      groups=config.transfer_groups)
+
+    def skip_days(self, num_days: int):
+        """
+        Models idle days (see get_num_idle_days) at once: turnover dividends are accumulated and statistics
+        of all days are written, the result is the same as step_day for each day
+        :param num_days: number of days
+        """
+
+        if self.num_day % 30 == 0:
+            self.start_month()
+
+        first_day, last_day = self.num_day + 1, self.num_day + num_days
+        farms, recorder = self.farms, self.recorder
+
+        bnb_smarty_rate = self.sb_pool.get_currency_rate(day=first_day)
+        dividends = self.get_turnover_dividends(first_day=first_day, last_day=last_day,
+                                                bnb_smarty_rate=bnb_smarty_rate)
+
+        for farm in farms:
+            farm.add_idle_days(first_day=first_day, last_day=last_day,
+                               turnover_dividends=dividends[:, farm.farm_id])
+
+        # Add stats for all days, only turnover changes
+        recorder.record_days('turnover', first_day=first_day,
+                             values=self.turnover_distribution[first_day - 1:last_day])
+        recorder.record_days('currency_rate', first_day=first_day, values=np.full(num_days, bnb_smarty_rate))
+        for key, farm in zip(self.config.get_farm_keys(), farms):
+            recorder.record_days(f'{key}_tokens', first_day=first_day,
+                                 values=np.full(num_days, farm.get_tokens_amount(day=last_day)))
+
+        self.num_day = last_day
+        self.end_day()
+
+    def step_event(self) -> int:
+        """
+        Models days up to the next event: idle days are skipped at once, the day with events is modelled by step_day
+        :return: number of modelled days
+        """
+
+        with self.profiler.phase('find_events'):
+            num_days = self.get_num_idle_days()
+
+        if num_days > 0:
+            with self.profiler.phase('skip_days'):
+                self.skip_days(num_days)
+            self.profiler.count('skipped_days', num_days)
+            return num_days
+
+        self.step_day()
+        return 1
+
+    def is_checkpoint_month(self, num_months: int) -> bool:
+        """
+        Checks if checkpoint should be saved after the number of modelled months
+        """
+
+        if self.checkpoint_months is None:
+            return False
+        if isinstance(self.checkpoint_months, int):
+            return num_months % self.checkpoint_months == 0
+        return num_months in self.checkpoint_months
+
+    def save_checkpoint(self, folder_path: str):
+        """
+        Saves full state of modelling: farms, investors, statistics, random numbers generator and config.
+        Arrays are saved to .npy files, so they are memory-mapped on loading
+        :param folder_path: folder of the checkpoint (it is replaced if exists)
+        """
+
+        folder_path_tmp = folder_path.rstrip('/') + '_tmp'
+        for name in self.CHECKPOINT_OBJECTS.keys():
+            save_object_state(getattr(self, name), os.path.join(folder_path_tmp, name))
+
+        state = {
+            'params': self.config.to_params(),
+            'df_mint_distr': self.config.df_mint_distr,
+            'rng': self.rng,
+            'num_day': self.num_day,
+            'turnover_seed': self.turnover_seed,
+            'turnover_distribution': self.turnover_distribution
+        }
+        with open(os.path.join(folder_path_tmp, 'simulation.pkl'), 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Old checkpoint is replaced only after the new one is fully written
+        replace_folder(folder_path_tmp, folder_path)
+
+        if self.verbose:
+            log(f'Checkpoint after day={self.num_day} is saved to {folder_path}')
+
+    @classmethod
+    def load_checkpoint(cls, folder_path: str, config=None, verbose=True, sink=None, mmap_mode='c', **kwargs):
+        """
+        Creates Simulation from the checkpoint, modelling continues from the next day after it
+        :param folder_path: folder of the checkpoint (see save_checkpoint)
+        :param config: SimulationConfig that is used for the remaining days, config of the checkpoint by default
+            (number of months should be the same, investors, emission schedule and initial tokens of SbPool
+            are not created again)
+        :param verbose: flag if progress should be printed
+        :param sink: ResultSink object for statistics of the remaining months
+        :param mmap_mode: mode of memory-mapping of arrays (see numpy.load), None - read arrays to memory
+        :param kwargs: other parameters of Simulation (checkpoint_months, checkpoint_path, skip_idle_days, profiler)
+        :return: Simulation object
+        """
+
+        with open(os.path.join(folder_path, 'simulation.pkl'), 'rb') as file:
+            state = pickle.load(file)
+
+        config_checkpoint = SimulationConfig(df_mint_distr=state['df_mint_distr'], **state['params'])
+        if config is None:
+            config = config_checkpoint
+        elif config.num_months != config_checkpoint.num_months:
+            raise ValueError(f'Number of months should be {config_checkpoint.num_months}, got {config.num_months}')
+
+        simulation = cls.__new__(cls)
+        simulation.config = config
+        simulation.rng = state['rng']
+        simulation.verbose = verbose
+        simulation.sink = sink
+        simulation.checkpoint_months = kwargs.get('checkpoint_months')
+        simulation.checkpoint_path = kwargs.get('checkpoint_path')
+        simulation.skip_idle_days = kwargs.get('skip_idle_days', False)
+        simulation.profiler = kwargs.get('profiler') or PhaseProfiler(enabled=False)
+        simulation.num_day = state['num_day']
+        simulation.fork_path, simulation.fork_day = None, None
+
+        # Turnover depends only on config and its seed, so it is calculated again if config is changed
+        simulation.turnover_seed = state['turnover_seed']
+        if config is config_checkpoint:
+            simulation.turnover_distribution = state['turnover_distribution']
+        else:
+            simulation.turnover_distribution = get_turnover_path(config, seed=simulation.turnover_seed)
+
+        for name, cls_object in cls.CHECKPOINT_OBJECTS.items():
+            setattr(simulation, name, load_object_state(cls_object, os.path.join(folder_path, name),
+                                                        mmap_mode=mmap_mode))
+
+        # Farms could not be changed in the config of the remaining days
+        if [farm['name'] for farm in config.farms] != simulation.farms.names:
+            raise ValueError(f'Farms should be {simulation.farms.names}, got {[farm["name"] for farm in config.farms]}')
+
+        for farm in simulation.farms:
+            farm.verbose = verbose
+
+        if verbose:
+            log(f'Modelling is continued from day={simulation.num_day + 1} (checkpoint {folder_path})')
+
+        return simulation
+
+    def get_chunk(self, first_day: int, last_day: int) -> dict:
+        """
+        Gets statistics for the range of days
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included)
+        :return: dictionary with (table name: DataFrame with 'Day' column and one row per day), see get_result_tables
+        """
+
+        # Tables of each farm are named by its key
+        chunk = {f'{key}_{table}': farm.get_days_frame(first_day=first_day, last_day=last_day, table=table)
+                 for table in FARM_TABLES for key, farm in zip(self.config.get_farm_keys(), self.farms)}
+
+        chunk.update({
+            'currency_rate': self.recorder.to_frame(names=['currency_rate'], first_day=first_day, last_day=last_day),
+            'turnover': self.recorder.to_frame(names=['turnover'], first_day=first_day, last_day=last_day),
+            'metrics': self.recorder.to_frame(first_day=first_day, last_day=last_day)
+        })
+
+        return chunk
+
+    def fork(self, verbose=False, sink=None, **overrides):
+        """
+        Creates a branch of modelling that continues from the current day with overridden parameters.
+        The current state is saved once (for all branches from this day) and the branch memory-maps it
+        copy-on-write, so the history of farms and investors is shared and only the changed pages use new memory.
+        Branches get the same random numbers as the parent, so they differ only because of parameters.
+        :param verbose: flag if progress of the branch should be printed
+        :param sink: ResultSink object for statistics of the branch
+        :param overrides: modelling parameters of the branch (see SimulationConfig), e.g. period_dividends=10
+        :return: Simulation object
+        """
+
+        params = self.config.to_params()
+        for name in overrides.keys():
+            if name not in params:
+                raise ValueError(f'Parameter {name} should be one of: {list(params.keys())}')
+
+        folder_path = self.save_fork_state()
+        return Simulation.load_checkpoint(folder_path, config=self.config.copy(**overrides), verbose=verbose,
+                                          sink=sink, mmap_mode='c', skip_idle_days=self.skip_idle_days)
+
+    def save_fork_state(self) -> str:
+        """
+        Saves the current state for forks (if it was not saved on the current day)
+        :return: folder with the state, it is removed by close_forks
+        """
+
+        if self.fork_day != self.num_day:
+            self.close_forks()
+            self.fork_path = tempfile.mkdtemp(prefix='simulation_fork_')
+            verbose, self.verbose = self.verbose, False
+            self.save_checkpoint(os.path.join(self.fork_path, f'day_{self.num_day:05d}'))
+            self.verbose = verbose
+            self.fork_day = self.num_day
+
+        return os.path.join(self.fork_path, f'day_{self.fork_day:05d}')
+
+    def close_forks(self):
+        """
+        Removes the state that is shared by forks (branches should not be used after that)
+        """
+
+        if self.fork_path is not None:
+            shutil.rmtree(self.fork_path, ignore_errors=True)
+        self.fork_path, self.fork_day = None, None
+
+    def run_month(self):
+        """
+        Models all remaining days of the current month
+        """
+
+        num_month = self.num_month
+        last_day = min((num_month + 1) * 30, self.num_days)
+
+        # Primitives of farms and investors are timed only inside modelling of months
+        with self.profiler.activate(), self.profiler.profile(num_month), \
+                tqdm(total=last_day - self.num_day, disable=not self.verbose) as progress:
+            while self.num_day < last_day:
+                if self.skip_idle_days:
+                    progress.update(self.step_event())
+                else:
+                    self.step_day()
+                    progress.update(1)
+
+        # log modelling completion for current month
+        if self.verbose:
+            log(f'Month {num_month} processed')
+
+    def run(self, num_months=None) -> dict:
+        """
+        Models next months
+        :param num_months: number of months to model, all remaining months by default
+        :return: dictionary with results (see get_results)
+        """
+
+        last_month = self.config.num_months if num_months is None else min(self.num_month + num_months,
+                                                                           self.config.num_months)
+        while self.num_month < last_month:
+            self.run_month()
+
+        if self.num_day == self.num_days:
+            self.finish()
+
+        return self.get_results()
+
+    def finish(self):
+        """
+        Pays dividends that were accrued, but not paid yet (accrual mode)
+        """
+
+        with self.profiler.phase('finish'):
+            for farm in list(self.farms)[::-1]:
+                self.investors.settle_dividends(farm=farm)
+
+    def get_results(self) -> dict:
+        """
+        Returns dictionary with farms, investors and statistics DataFrames
+        """
+
+        return {
+            'recorder': self.recorder,
+            'farms': self.farms,
+            'farm_keys': self.config.get_farm_keys(),
+            'sb_pool': self.sb_pool,
+            'div_farm': self.div_farm,
+            'investors': self.investors,
+            'df_currency_rate': self.df_currency_rate,
+            'df_turnover': self.df_turnover
+        }
+
+
+def run_simulation(params: dict, df_mint_distr: pd.DataFrame, rng=None, verbose=True, sink=None) -> dict:
+    """
+    Runs modelling of farms and investors
+    :param params: dictionary with modelling parameters (see prepare_modelling_params)
+    :param df_mint_distr: DataFrame with mint distribution
+    :param rng: numpy.random.Generator, all random values of the run are taken from it
+    :param verbose: flag if progress should be printed
+    :param sink: ResultSink object, statistics of each month are written to it
+    :return: dictionary with farms, investors and statistics DataFrames
+    """
+
+    config = SimulationConfig(df_mint_distr=df_mint_distr, **params)
+    return Simulation(config=config, rng=rng, verbose=verbose, sink=sink).run()
@@ -0,0 +1,120 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from preprocessing.prepare_config_files import prepare_config_samples
+from modeling.simulation import prepare_modelling_params, run_simulation
+from modeling.ensemble import get_run_statistics
+from utilities.py_tools import log
+
+# Inputs that do not depend on swept parameters, they are sent to each worker once
+SWEEP_INPUTS = {}
+
+
+def get_sweep_grid(grid: dict) -> list:
+    """
+    Gets list of overrides for all combinations of parameters values
+    :param grid: dictionary with (parameter name: list of values), e.g. {'dividends_period': [7, 10, 30]}
+    :return: list of dictionaries with (parameter name: value)
+    """
+
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+def init_sweep_worker(df_initial_params: pd.DataFrame, df_mint_distr: pd.DataFrame):
+    """
+    Keeps shared inputs of the sweep in the worker process
+    """
+
+    SWEEP_INPUTS['df_initial_params'] = df_initial_params
+    SWEEP_INPUTS['df_mint_distr'] = df_mint_distr
+
+
+def run_scenario(overrides: dict, seed_sequence: np.random.SeedSequence) -> pd.DataFrame:
+    """
+    Runs modelling with overridden constants (shared inputs should be set by init_sweep_worker)
+    :param overrides: dictionary with (parameter name: value), names are the renamed columns of constants
+    :param seed_sequence: SeedSequence of the run
+    :return: DataFrame with statistics for each day
+    """
+
+    df_initial_params = SWEEP_INPUTS['df_initial_params'].copy(deep=True)
+    for name, value in overrides.items():
+        df_initial_params[name] = value
+
+    params = prepare_modelling_params(df_initial_params)
+    results = run_simulation(params=params, df_mint_distr=SWEEP_INPUTS['df_mint_distr'],
+                             rng=np.random.default_rng(seed_sequence), verbose=False)
+
+    num_days = params['num_months'] * 30
+    df = pd.DataFrame(get_run_statistics(results, num_days=num_days))
+    df.insert(0, 'Day', np.arange(1, num_days + 1))
+
+    return df
+
+
+def run_sweep(df_initial_params: pd.DataFrame, df_mint_distr: pd.DataFrame, overrides, num_runs=1, seed=None,
+              num_workers=None) -> pd.DataFrame:
+    """
+    Runs modelling for each set of overridden constants on a process pool
+    :param df_initial_params: DataFrame from prepare_initial_params_sample
+    :param df_mint_distr: DataFrame with mint distribution
+    :param overrides: list of dictionaries with (parameter name: value) or grid (see get_sweep_grid)
+    :param num_runs: number of runs for each scenario
+    :param seed: master seed, each scenario uses the same random numbers for the same run
+    :param num_workers: number of processes, number of CPUs by default (1 - run in the current process)
+    :return: tidy DataFrame with columns [swept parameters, 'Run', 'Day', statistics]
+    """
+
+    if isinstance(overrides, dict):
+        overrides = get_sweep_grid(overrides)
+
+    # Check that all parameters exist in constants
+    for scenario in overrides:
+        for name in scenario.keys():
+            if name not in df_initial_params.columns:
+                raise ValueError(f'Parameter {name} should be one of: {list(df_initial_params.columns)}')
+
+    seed_sequence = np.random.SeedSequence(seed)
+    seeds_runs = seed_sequence.spawn(num_runs)
+    tasks = [(scenario, num_run) for scenario in overrides for num_run in range(num_runs)]
+    log(f'Sweep of {len(overrides)} scenarios x {num_runs} runs started, seed entropy = {seed_sequence.entropy}')
+
+    if num_workers == 1:
+        init_sweep_worker(df_initial_params, df_mint_distr)
+        results = [run_scenario(scenario, seeds_runs[num_run]) for scenario, num_run in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_sweep_worker,
+                                 initargs=(df_initial_params, df_mint_distr)) as executor:
+            futures = [executor.submit(run_scenario, scenario, seeds_runs[num_run]) for scenario, num_run in tasks]
+            results = [future.result() for future in futures]
+
+    # Join results of all scenarios in one table
+    for (scenario, num_run), df in zip(tasks, results):
+        df.insert(0, 'Run', num_run)
+        for index, (name, value) in enumerate(scenario.items()):
+            df.insert(index, name, value)
+
+    log('Sweep finished')
+    return pd.concat(results, ignore_index=True)
+
+
+if __name__ == '__main__':
+
+    PATH_CONSTANTS = 'config/constants.xlsx'
+    PATH_RESULTS = '../results/'
+
+    # Values of parameters to check
+    GRID = {
+        'dividends_period': [7, 10, 30],
+        'min_revenue_index': [0.001, 0.005]
+    }
+
+    df_initial_params, df_mint_distr, _ = prepare_config_samples(path_constants=PATH_CONSTANTS)
+    df_sweep = run_sweep(df_initial_params=df_initial_params, df_mint_distr=df_mint_distr, overrides=GRID, seed=0)
+
+    current_time = datetime.now().strftime("%Y%m%d-%H%M%S").replace('-', '_')
+    df_sweep.to_csv(PATH_RESULTS + f'sweep_{current_time}.csv', index=False)
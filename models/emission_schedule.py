@@ -0,0 +1,233 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from models.investors import InvestorPool
+from utilities.py_tools import get_distribution_by_sum, get_source_hash, log
+
+# Number of days in each month of modelling
+NUM_DAYS_MONTH = 30
+
+# Layout of schedule files (files with another layout are not loaded)
+SCHEDULE_LAYOUT = 'month x day x investor'
+
+# Version of generation of schedules, it is a part of the schedule key together with the source code of generation.
+# Increase it when generated values change outside of this code (e.g. after updates of numpy random generators)
+SCHEDULE_VERSION = 1
+
+
+def get_mint_schedule(mint_distr: pd.DataFrame, num_months: int) -> (list, np.ndarray):
+    """
+    Gets number of released tokens of each type for all months
+    :param mint_distr: DataFrame with mint distribution (column 'Token_type' and one column per month)
+    :param num_months: number of months
+    :return: list of token types and array (month x token type), months without data have zero tokens
+    """
+
+    token_types = list(mint_distr['Token_type'])
+    df = mint_distr.drop(columns='Token_type')
+    df.columns = df.columns.astype(int)
+
+    values = df.reindex(columns=range(num_months), fill_value=0).to_numpy(dtype=np.float64).T
+    return token_types, values
+
+
+class EmissionSchedule:
+    """
+    Tokens that are sold to investors on each day of modelling. Tokens of each month are an array (day x investor),
+    investors of all sold groups go one after another (in order of groups).
+    Months are generated one by one when they are needed (only the current month is kept in memory), or all months
+    are kept as one array (month x day x investor) in a memory-mapped .npy file, that could be used again by runs
+    with the same inputs and seed (see build_emission_schedule).
+    """
+
+    def __init__(self, **kwargs):
+
+        # Groups of tokens that are sold and ids of investors of each group
+        self.groups = kwargs.get('groups', [])
+        self.investor_ids = kwargs.get('investor_ids', [])
+
+        # Number of tokens of each group, that are distributed in each month (month x group)
+        self.totals = kwargs.get('totals', np.zeros((0, len(self.groups)), dtype=np.float64))
+
+        # Random numbers generator of months that are not generated yet and type of values
+        self.rng = kwargs.get('rng', np.random.default_rng())
+        self.dtype = kwargs.get('dtype', np.int64)
+
+        # Array (month x day x investor) with all months (None - months are generated one by one)
+        self.values = kwargs.get('values')
+
+        # The last generated month and its array (day x investor)
+        num_investors = sum(len(ids) for ids in self.investor_ids) if self.values is None else 0
+        self.month = -1
+        self.month_values = np.zeros((NUM_DAYS_MONTH, num_investors), dtype=self.dtype)
+
+        # Flags if tokens are sold on each day (month x day) of months, which were already requested
+        self.sale_days = np.zeros((len(self.totals), NUM_DAYS_MONTH), dtype=bool)
+        self.sale_months = np.zeros(len(self.totals), dtype=bool)
+
+    @property
+    def num_months(self) -> int:
+        return len(self.totals)
+
+    def get_month(self, month: int) -> np.ndarray:
+        """
+        Gets tokens that are sold in the month, months are generated in increasing order (months that were skipped
+        are generated too, so the result does not depend on the requested months)
+        :param month: number of the month (starting from zero)
+        :return: array (day x investor)
+        """
+
+        if self.values is not None:
+            values = self.values[month]
+        else:
+            if month < self.month:
+                raise ValueError(f'Emission schedule is generated month by month, month {month} is already dropped '
+                                 f'(the current month is {self.month})')
+            while self.month < month:
+                self.__generate_month()
+            values = self.month_values
+
+        if not self.sale_months[month]:
+            self.sale_days[month] = np.any(values != 0, axis=1)
+            self.sale_months[month] = True
+
+        return values
+
+    def get_day(self, num_day: int) -> dict:
+        """
+        Gets tokens that are sold on the day
+        :param num_day: number of the day (starting from one)
+        :return: dictionary with (group: (ids of investors, array with number of tokens for each investor))
+        """
+
+        month, day = (num_day - 1) // NUM_DAYS_MONTH, (num_day - 1) % NUM_DAYS_MONTH
+        values = self.get_month(month)
+
+        res, start = {}, 0
+        for group, ids in zip(self.groups, self.investor_ids):
+            res[group] = (ids, values[day, start:start + len(ids)])
+            start += len(ids)
+
+        return res
+
+    def has_sales(self, days) -> np.ndarray:
+        """
+        Checks if tokens are sold on the days
+        :param days: array with numbers of days (starting from one)
+        :return: boolean array
+        """
+
+        days = np.asarray(days) - 1
+        for month in np.unique(days // NUM_DAYS_MONTH):
+            if not self.sale_months[month]:
+                self.get_month(month)
+
+        return self.sale_days.ravel()[days]
+
+    def __generate_month(self):
+        """
+        Private method for distributing tokens of the next month by days, then tokens of each day by investors
+        of the group (see get_distribution_by_sum)
+        """
+
+        self.month += 1
+        totals_days = get_distribution_by_sum(sum=self.totals[self.month], size=NUM_DAYS_MONTH, rng=self.rng)
+
+        start = 0
+        for index, ids in enumerate(self.investor_ids):
+            self.month_values[:, start:start + len(ids)] = get_distribution_by_sum(sum=totals_days[index],
+                                                                                    size=len(ids), rng=self.rng)
+            start += len(ids)
+
+
+def get_schedule_key(mint_distr: pd.DataFrame, groups: list, num_investors: list, num_months: int,
+                     initial_tokens: dict, seed: int, dtype) -> str:
+    """
+    Gets hash of all inputs of the schedule and of its generation (used as a name of the file with the schedule)
+    """
+
+    generation_hash = get_source_hash(get_mint_schedule, get_distribution_by_sum, EmissionSchedule)
+
+    hash_sha = hashlib.sha256()
+    hash_sha.update(pd.util.hash_pandas_object(mint_distr.astype(str), index=False).to_numpy().tobytes())
+    hash_sha.update(repr((list(mint_distr.columns), groups, num_investors, num_months, sorted(initial_tokens.items()),
+                          seed, np.dtype(dtype).str, SCHEDULE_LAYOUT, SCHEDULE_VERSION, generation_hash)).encode())
+    return hash_sha.hexdigest()[:16]
+
+
+def build_emission_schedule(mint_distr: pd.DataFrame, investors: InvestorPool, num_months: int, excluded_tokens: list,
+                            initial_tokens=None, seed=None, folder_path=None, dtype=np.int64,
+                            verbose=False) -> EmissionSchedule:
+    """
+    Creates schedule of all released tokens by days and investors.
+    Tokens of the month are distributed by days, tokens of the day - by investors of the group
+    (see get_distribution_by_sum). Months are generated when modelling gets to them, with folder_path
+    all months are generated at once and saved to the file
+    :param mint_distr: DataFrame with mint distribution
+    :param investors: InvestorPool with all investors
+    :param num_months: number of months
+    :param excluded_tokens: groups of tokens that are not sold
+    :param initial_tokens: dictionary with (group: number of tokens) that are taken from the month 0
+        (they are put in SbPool at the start)
+    :param seed: seed of the random numbers generator of the schedule
+    :param folder_path: folder for memory-mapped schedules, schedule is loaded from it if it was built with the same
+        inputs and seed (None - keep schedule in memory)
+    :param dtype: type of values
+    :param verbose: flag if progress should be printed
+    :return: EmissionSchedule object
+    """
+
+    initial_tokens = {} if initial_tokens is None else initial_tokens
+
+    # Only groups that are not excluded and have investors are sold
+    token_types, mint_values = get_mint_schedule(mint_distr, num_months=num_months)
+    groups, investor_ids = [], []
+    for group in token_types:
+        ids = investors.get_ids(group) if group in investors.token_types else np.zeros(0, dtype=np.int64)
+        if group not in excluded_tokens and len(ids) > 0:
+            groups.append(group)
+            investor_ids.append(ids)
+
+    # Tokens of each group in each month, in a month = 0, we put some tokens in SbPool
+    index_types = {token_type: index for index, token_type in enumerate(token_types)}
+    totals = mint_values[:, [index_types[group] for group in groups]]
+    if num_months > 0:
+        totals[0] -= np.array([initial_tokens.get(group, 0) for group in groups])
+        for group, num_tokens in zip(groups, totals[0]):
+            if num_tokens < 0:
+                raise ValueError(f'Tokens of {group} in SbPool ({initial_tokens[group]}) should not be more '
+                                 f'than tokens released in month 0 ({num_tokens + initial_tokens[group]})')
+
+    schedule = EmissionSchedule(groups=groups, investor_ids=investor_ids, totals=totals,
+                                rng=np.random.default_rng(seed), dtype=dtype)
+    if folder_path is None or seed is None:
+        return schedule
+
+    # Schedule, which was built with the same inputs, is loaded from the file
+    num_investors = [len(ids) for ids in investor_ids]
+    key = get_schedule_key(mint_distr, groups=groups, num_investors=num_investors, num_months=num_months,
+                           initial_tokens=initial_tokens, seed=seed, dtype=dtype)
+    file_path = os.path.join(folder_path, f'schedule_{key}.npy')
+
+    if os.path.exists(file_path):
+        if verbose:
+            log(f'Emission schedule is loaded from {file_path}')
+    else:
+
+        # Array is filled month by month, so memory-mapped schedule does not need memory for the whole horizon
+        os.makedirs(folder_path, exist_ok=True)
+        values = np.lib.format.open_memmap(file_path + '.tmp', mode='w+', dtype=dtype,
+                                           shape=(num_months, NUM_DAYS_MONTH, sum(num_investors)))
+        for month in range(num_months):
+            values[month] = schedule.get_month(month)
+
+        values.flush()
+        del values
+        os.replace(file_path + '.tmp', file_path)
+        if verbose:
+            log(f'Emission schedule is saved to {file_path}')
+
+    return EmissionSchedule(groups=groups, investor_ids=investor_ids, totals=totals, dtype=dtype,
+                            values=np.load(file_path, mmap_mode='r'))
@@ -1,43 +1,145 @@
+import numpy as np
 import pandas as pd
-from preprocessing.prepare_config_files import prepare_token_params_sample
-from utilities.py_tools import log
+from preprocessing.prepare_config_files import get_token_types
+from utilities.py_tools import log, is_debug_counters, check_counter
+from utilities.profiling import profiled
+from utilities.farm_history import FarmHistory
 
-df_token_params = prepare_token_params_sample()
-df_token_types = df_token_params['Token_type']
+# Dividends could come from turnover or from minting new tokens
+DIVIDENDS_TYPES = ['Turnover', 'Minted']
+
+# Types of farms: SbPool keeps BNB and initial tokens, DivFarm keeps only Smarty tokens of investors
+FARM_TYPES = ['SbPool', 'DivFarm']
 
 
 class Farm:
+    """
+    Tokens and dividends of the farm on each day.
+
+    Values are kept as histories (see FarmHistory): values of the current day and a log of changes,
+    so memory grows with the number of changes, not with the number of days. Values of any day are taken
+    with get_type_tokens and get_days_frame, full DataFrames (tokens, dividends) are created only on request.
+    """
+
+    # Histories are saved to their own folders in checkpoints, so their arrays are memory-mapped on loading
+    CHECKPOINT_NESTED = ['tokens_history', 'dividends_history', 'totals_history']
+
     def __init__(self, **kwargs):
 
         self.type_farm = kwargs.get('type', 'SbPool')
+        if self.type_farm not in FARM_TYPES:
+            raise ValueError(f'Type of farm should be one of: {FARM_TYPES}, got {self.type_farm}')
+
+        # Name of the farm (farms of the same type differ by names) and its id in investors lots,
+        # farms that are not put in FarmRegistry have id of their type
+        self.name = kwargs.get('name', self.type_farm)
+        self.farm_id = FARM_TYPES.index(self.type_farm)
+
         num_days = kwargs.get('days_num', 60 * 30)
 
-        types_tokens = df_token_types.copy(deep=True)
+        types_tokens = list(get_token_types())
+
+        # Number of Smarty token types (BNB is always kept in the last row)
+        self.num_smarty_types = len(types_tokens)
 
         # In SbPool we also keep number of BNB tokens
         if self.type_farm == 'SbPool':
-            bnb_row = pd.Series(['BNB'])
-            types_tokens = types_tokens.append(bnb_row).reindex()
+            types_tokens.append('BNB')
             self.initial_tokens = kwargs.get('params_tokens', {'Seed': 0})
+            self.initial_amount = sum(list(self.initial_tokens.values()))
+
+        # Fixed mapping (token type -> row of tokens array)
+        self.types_tokens = types_tokens
+        self.index_tokens = {token_type: index for index, token_type in enumerate(types_tokens)}
+
+        # Mapping (dividends type -> row of dividends array)
+        self.types_dividends = DIVIDENDS_TYPES
+        self.index_dividends = {type_dividends: index for index, type_dividends in enumerate(DIVIDENDS_TYPES)}
+
+        # Number of day is used as a column index, so column 0 is never used
+        self.num_cols = num_days + 5
+
+        # Histories of values (token type x day) and (dividends type x day)
+        self.tokens_history = FarmHistory(num_rows=len(types_tokens), num_cols=self.num_cols)
+        self.dividends_history = FarmHistory(num_rows=len(DIVIDENDS_TYPES), num_cols=self.num_cols)
+
+        # Running totals of Smarty tokens for each day (BNB row is a total by itself)
+        self.totals_history = FarmHistory(num_rows=1, num_cols=self.num_cols)
+
+        # In debug mode cached totals are checked against the full recomputation
+        self.debug = kwargs.get('debug', is_debug_counters())
+
+        # Flag if operations should be logged
+        self.verbose = kwargs.get('verbose', True)
+
+        # In accrual mode dividends are not paid to each investor on payout day, Farm only keeps
+        # cumulative dividends per token index and investors are settled later (see InvestorPool.settle_dividends)
+        self.accrual = kwargs.get('accrual', False)
+        self.reward_days = []
+        self.reward_per_token = []
+        self.reward_index = [0.0]
+
+    @property
+    def tokens(self) -> pd.DataFrame:
+        """
+        Tokens DataFrame with 'Token_type' column and one column per day
+        """
+        return self.__to_frame(values=self.tokens_history.to_array(), col_type='Token_type', types=self.types_tokens)
+
+    @property
+    def dividends(self) -> pd.DataFrame:
+        """
+        Dividends DataFrame with 'Dividends_type' column and one column per day
+        """
+        return self.__to_frame(values=self.dividends_history.to_array(), col_type='Dividends_type',
+                               types=self.types_dividends)
+
+    def get_days_frame(self, first_day: int, last_day: int, table='tokens') -> pd.DataFrame:
+        """
+        Gets values for the range of days as a long DataFrame (one row per day), used for writing results by chunks
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included)
+        :param table: one of ('tokens', 'dividends')
+        :return: DataFrame with columns ['Day', type_1, type_2, ...]
+        """
+
+        if table == 'tokens':
+            history, types = self.tokens_history, self.types_tokens
+        elif table == 'dividends':
+            history, types = self.dividends_history, self.types_dividends
+        else:
+            raise ValueError(f'Table should be one of: tokens, dividends, got {table}')
 
-        # Generate list with number of days for modelling
-        cols_days = [i for i in range(1, num_days + 5)]
+        df = pd.DataFrame(history.get_range(first_day, last_day).T, columns=types)
+        df.insert(0, 'Day', np.arange(first_day, last_day + 1))
+        return df
 
-        # Columns for tokens DataFrame
-        cols_tokens = ['Token_type'] + cols_days
+    def __to_frame(self, values: np.ndarray, col_type: str, types: list) -> pd.DataFrame:
+        """
+        Private method for converting array (type x day) to the wide DataFrame
+        :param values: array with values
+        :param col_type: name of the column with types
+        :param types: list with types (one for each row of array)
+        :return: DataFrame with columns [col_type, 1, 2, ..., num_days + 4]
+        """
 
-        # Create tokens DataFrame and fill Nulls
-        self.tokens = pd.DataFrame(columns=cols_tokens)
-        self.tokens['Token_type'] = types_tokens
-        self.tokens.fillna(0, inplace=True)
+        cols_days = [i for i in range(1, self.num_cols)]
+        df = pd.DataFrame(values[:, 1:], columns=cols_days)
+        df.insert(0, col_type, types)
+        return df
+
+    def get_type_tokens(self, token_type: str, day: int) -> float:
+        """
+        Gets number of tokens of the type in Farm
+        :param token_type: type of tokens (or 'BNB' for SbPool)
+        :param day: number of day
+        :return: float, number of tokens
+        """
 
-        # Dividends DataFrame contains only days columns
-        cols_dividends = ['Dividends_type'] + cols_days
-        self.dividends = pd.DataFrame(columns=cols_dividends)
+        if token_type not in self.index_tokens:
+            raise ValueError(f'Token type should be one of: {self.types_tokens}, got {token_type}')
 
-        # Dividends could come from turnover or from minting new tokens
-        self.dividends['Dividends_type'] = pd.Series(['Turnover', 'Minted'])
-        self.dividends.fillna(0, inplace=True)
+        return self.tokens_history.get(self.index_tokens[token_type], day)
 
     def get_tokens_amount(self, day: int, all=False) -> float:
         """
@@ -47,19 +149,44 @@ class Farm:
         :return: int, number of tokens
         """
 
-        # Get sum of all Smarty tokens in farm
-        amount = self.tokens[self.tokens['Token_type'] != 'BNB'][day].sum()
+        # Get running total of all Smarty tokens in farm
+        amount = self.totals_history.get(0, day)
+
+        if self.debug:
+            check_counter(name=f'{self.name} tokens on day={day}', cached=amount,
+                          actual=self.tokens_history.get_day(day)[:self.num_smarty_types].sum())
 
         # In SbPool we do not count tokens that we put here at the start
         if self.type_farm == 'SbPool' and not all:
-            amount -= sum(list(self.initial_tokens.values()))
+            amount -= self.initial_amount
 
         return amount
 
+    def refresh_totals(self):
+        """
+        Recomputes running totals from scratch, should be called if initial_tokens were changed directly
+        """
+
+        totals = self.tokens_history.to_array()[:self.num_smarty_types].sum(axis=0)
+
+        # Totals are written day by day up to the open day of tokens
+        self.totals_history = FarmHistory(num_rows=1, num_cols=self.num_cols)
+        for day in range(self.tokens_history.day):
+            self.totals_history.add(0, day, totals[day])
+            self.totals_history.carry(day, clear=True)
+        if self.tokens_history.day < self.num_cols:
+            self.totals_history.add(0, self.tokens_history.day, totals[self.tokens_history.day])
+
+        if self.type_farm == 'SbPool':
+            self.initial_amount = sum(list(self.initial_tokens.values()))
+
     def get_bnb_amount(self, day: int) -> float:
 
-        # Get sum of all Smarty tokens
-        amount = self.tokens[self.tokens['Token_type'] == 'BNB'][day].sum()
+        # Get number of BNB tokens (only SbPool keeps them)
+        if self.type_farm != 'SbPool':
+            return 0.0
+
+        amount = self.tokens_history.get(self.num_smarty_types, day)
         return amount
 
     def get_currency_rate(self, day: int) -> float:
@@ -74,17 +201,19 @@ class Farm:
 
         return bnb_amount / smarty_amount
 
+    @profiled('farm.add_tokens')
     def add_tokens(self, params_tokens: dict, day: int, currency_rate=None):
         """
         Adds tokens to the Farm
         :param currency_rate: currency rate, could be specified by adding Smarty tokens manually
-        :param params_tokens: dictionary with (token_type: num_tokens)
+        :param params_tokens: dictionary with (token_type: num_tokens), num_tokens could also be an array
+            with number of tokens of each investor (only whole tokens of each investor are added)
         :param day: number of the current day
         """
 
         # Loop through each group of tokens
         for group in params_tokens.keys():
-            num_tokens = int(params_tokens[group])
+            num_tokens = int(np.trunc(params_tokens[group]).sum())
             if num_tokens != 0:
 
                 # If we are adding Smarty to SbPool, we also need to add BNB
@@ -94,11 +223,16 @@ class Farm:
 
                     # Add BNB tokens to the tokens DataFrame according to Smarty rate
                     num_bnb = num_tokens * currency_rate
-                    self.tokens.loc[self.tokens['Token_type'] == 'BNB', [day]] += num_bnb
+                    self.tokens_history.add(self.num_smarty_types, day, num_bnb)
 
-                # Update tokens DataFrame by adding Smarty tokens
-                self.tokens.loc[self.tokens['Token_type'] == group, [day]] += num_tokens
+                # Update tokens array by adding Smarty tokens
+                index = self.index_tokens.get(group)
+                if index is not None:
+                    self.tokens_history.add(index, day, num_tokens)
+                    if index < self.num_smarty_types:
+                        self.totals_history.add(0, day, num_tokens)
 
+    @profiled('farm.remove_tokens')
     def remove_tokens(self, params_tokens: dict, day: int, currency_rate=None):
         """
         Removes tokens from the Farm
@@ -124,9 +258,10 @@ class Farm:
         :return:
         """
 
-        # Updates dividends DataFrame
-        self.dividends.loc[self.dividends['Dividends_type'] == type_dividends, [day]] += num_tokens
+        # Updates dividends history
+        self.dividends_history.add(self.index_dividends[type_dividends], day, num_tokens)
 
+    @profiled('farm.add_dividends')
     def add_dividends(self, day: int, bnb_smarty_rate=None, num_tokens=None, type_operation='bnb',
                       type_dividends='Turnover', index_revenue=None):
         """
@@ -138,11 +273,13 @@ class Farm:
             2) 'smarty' - add a specified number of Smarty tokens
             3) 'index_revenue' - add Smarty tokens to set (dividends / num_tokens) >= min_profit
         :param index_revenue: minimum profit that we want to set
+        :return: number of added Smarty tokens
         """
 
         # If we want to add Smarty tokens
         if type_operation == 'smarty':
             self.__add_smarty_dividends(day=day, num_tokens=num_tokens, type_dividends=type_dividends)
+            return num_tokens
 
         # Add a specified number of BNB tokens
         elif type_operation == 'bnb':
@@ -153,6 +290,7 @@ class Farm:
 
             num_smarty = num_tokens / bnb_smarty_rate
             self.__add_smarty_dividends(day=day, num_tokens=num_smarty, type_dividends=type_dividends)
+            return num_smarty
 
         elif type_operation == 'index_revenue':
 
@@ -160,20 +298,61 @@ class Farm:
 
             # If current revenue index is big enough, we don't add tokens
             if current_index_revenue >= index_revenue:
-                log(f'On day={day} revenue index in {self.type_farm} = {current_index_revenue} > {index_revenue}')
-                return
+                if self.verbose:
+                    log(f'On day={day} revenue index in {self.name} = {current_index_revenue} > {index_revenue}')
+                return 0.0
             else:
                 # Calculate number of tokens and add them to dividends
                 delta_index = index_revenue - current_index_revenue
                 num_smarty = delta_index * self.get_tokens_amount(day=day)
                 self.__add_smarty_dividends(day=day, num_tokens=num_smarty, type_dividends=type_dividends)
+                return num_smarty
+
+    @profiled('farm.accrue_dividends')
+    def accrue_dividends(self, day: int) -> float:
+        """
+        Adds current dividends per token to the cumulative index (used in accrual mode instead of paying each investor)
+        :param day: number of the current day
+        :return: dividends per token
+        """
+
+        num_tokens = self.get_tokens_amount(day=day)
+        num_dividends = self.get_current_dividends(day=day)
+        dividends_per_token = num_dividends / num_tokens
+
+        self.reward_days.append(day)
+        self.reward_per_token.append(dividends_per_token)
+        self.reward_index.append(self.reward_index[-1] + dividends_per_token)
+
+        return dividends_per_token
 
     def get_current_dividends(self, day: int) -> float:
-        return self.dividends[day].sum()
+        return self.dividends_history.get_day(day).sum()
 
     def clear_dividends(self, day: int):
-        self.dividends[day] = 0.0
+        self.dividends_history.clear(day)
+
+    @profiled('farm.add_idle_days')
+    def add_idle_days(self, first_day: int, last_day: int, turnover_dividends: np.ndarray):
+        """
+        Models days when only turnover dividends are added, the result is the same as add_dividends
+        (with type_operation='smarty') and update for each day
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included)
+        :param turnover_dividends: number of Smarty tokens added to dividends on each day
+        """
+
+        # Tokens and other dividends do not change until the day after the last day
+        self.tokens_history.carry_days(first_day, last_day)
+        self.totals_history.carry_days(first_day, last_day)
 
+        # Turnover dividends are added one by one (accumulate keeps the same order of additions)
+        index = self.index_dividends['Turnover']
+        initial = self.dividends_history.get(index, first_day)
+        values = np.add.accumulate(np.concatenate([[initial], turnover_dividends]))[1:]
+        self.dividends_history.carry_days(first_day, last_day, row=index, values=values)
+
+    @profiled('farm.update')
     def update(self, day: int, clear_dividends=False):
         """
         Update Farm before the next day by transferring all data to the next day
@@ -181,10 +360,73 @@ class Farm:
         :param day: number of the current day
         """
 
-        # Copy all data for the current day as initial data of the next day
-        self.tokens[day + 1] = self.tokens[day]
+        # Copy all data for the current day as initial data of the next day (only changes are kept in histories)
+        self.tokens_history.carry(day)
+        self.totals_history.carry(day)
+        self.dividends_history.carry(day, clear=clear_dividends)
 
-        if not clear_dividends:
-            self.dividends[day + 1] = self.dividends[day]
-        else:
-            self.dividends[day + 1] = 0.0
+
+class FarmRegistry:
+    """
+    All farms of the modelling, id of the farm is its index in the registry.
+
+    Ids are used in lots of investors and as rows of per-farm arrays (see InvestorPool), so any number of farms
+    is kept without code for each farm. Registry could be used like a list of farms, farm is also found by name.
+    """
+
+    # Farms are saved to their own folders in checkpoints (see save_object_state)
+    CHECKPOINT_NESTED = ['farms']
+
+    def __init__(self, farms=None):
+
+        self.farms = []
+        self.index_names = {}
+
+        for farm in [] if farms is None else farms:
+            self.add(farm)
+
+    def __len__(self) -> int:
+        return len(self.farms)
+
+    def __iter__(self):
+        return iter(self.farms)
+
+    def __getitem__(self, key) -> Farm:
+        """
+        Returns farm by id or by name
+        """
+
+        if isinstance(key, str):
+            if key not in self.index_names:
+                raise ValueError(f'Farm should be one of: {self.names}, got {key}')
+            key = self.index_names[key]
+
+        return self.farms[key]
+
+    @property
+    def names(self) -> list:
+        return [farm.name for farm in self.farms]
+
+    def add(self, farm: Farm) -> int:
+        """
+        Adds farm to the registry
+        :param farm: Farm object, its name should be unique
+        :return: id of the farm
+        """
+
+        if farm.name in self.index_names:
+            raise ValueError(f'Farm {farm.name} is already added')
+
+        farm.farm_id = len(self.farms)
+        self.index_names[farm.name] = farm.farm_id
+        self.farms.append(farm)
+
+        return farm.farm_id
+
+    def get_tokens_amounts(self, day: int) -> np.ndarray:
+        """
+        Gets amount of Smarty tokens in each farm (without initial tokens of SbPool, see Farm.get_tokens_amount)
+        :param day: number of day
+        :return: array with one value for each farm id
+        """
+        return np.array([farm.get_tokens_amount(day=day) for farm in self.farms], dtype=np.float64)
@@ -1,116 +1,1041 @@
-from random import random
+import os
+import tempfile
 
 import pandas as pd
 import numpy as np
-from preprocessing.prepare_config_files import prepare_token_params_sample
-from models.farms import Farm
-from utilities.py_tools import get_month_by_day
+from preprocessing.prepare_config_files import get_token_types
+from models.farms import Farm, FARM_TYPES
+from utilities.py_tools import get_month_by_day, is_debug_counters, check_counter
+from utilities.profiling import profiled
 
-df_token_params = prepare_token_params_sample()
-token_types = df_token_params['Token_type'].values
 INF = 1e7
 
+# Farm id of lots that are not put in any farm
+NO_FARM = -1
+
+# Lots columns: (name, type, value of unused rows)
+LOT_COLUMNS = [('lot_investor', np.int64, 0), ('lot_type', np.int64, 0), ('lot_day', np.int64, 0),
+               ('lot_num', np.float64, 0.0), ('lot_farm', np.int64, NO_FARM), ('lot_freeze', np.int64, int(-INF))]
+
+# Number of investors (or lots) that are processed at once by add_tokens and full scans of lots
+CHUNK_SIZE = 2 ** 17
+
+# Initial capacity of the list of active lots of one investor in one farm (capacity is doubled when it is full)
+LIST_CAPACITY = 4
+
+
+def get_farm_id(farm: Farm) -> int:
+    """
+    Returns id of the farm that is used in investors lots (see FarmRegistry)
+    :param farm: Farm object
+    """
+    return farm.farm_id
+
+
+def get_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Returns concatenated ranges [start, start + count) without a Python loop
+    :param starts: array with the first values of ranges
+    :param counts: array with lengths of ranges
+    """
+
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(offsets[-1] + counts[-1] if len(counts) else 0)
+
+
+class InvestorPool:
+    """
+    Keeps all investors and their tokens in shared NumPy columns.
+
+    Each investor has an id (index in investors columns). Tokens of investors are kept as lots,
+    one lot for each (investor, token type, day of purchase) with a non-zero number of tokens.
+    Pool could be used like a dictionary (group -> list of Investor objects).
+
+    Positions of investors in farms are kept by farm id (lots columns and per-farm arrays farm x investor),
+    pool is created for farm_names (names of farms in FarmRegistry, one for each farm id).
+
+    With storage_path lots columns are memory-mapped .npy files in this folder, so only the touched pages
+    are kept in memory (files are not removed after modelling, see remove_storage). Large operations
+    process investors in chunks of chunk_size, so their temporary arrays do not grow with the population.
+    """
 
-class Investor:
     def __init__(self, **kwargs):
 
-        # Risk coefficient of the investor
-        self.risk_coefficient = kwargs.get('risk_coefficient', None)
-        self.activity_coefficient = random()
-        self.group = kwargs.get('group', 'Seed')
+        self.num_months = kwargs.get('num_months', 48)
 
-        if self.group not in token_types:
-            raise ValueError(f'Group type of investor should be one of: {token_types}')
+        # Names of farms in order of their ids (farms of FARM_TYPES by default)
+        farm_names = kwargs.get('farm_names')
+        self.farm_names = list(FARM_TYPES if farm_names is None else farm_names)
+        num_farms = len(self.farm_names)
 
-        num_months = kwargs.get('num_months', 48)
+        capacity = kwargs.get('capacity', 1024)
 
-        # Create DataFrame with parameters of tokens
-        cols_tokens = ['Token_type', 'Num', 'Initial_price', 'SbPool_flag', 'DivFarm_flag', 'Day_of_freeze']
-        self.df_tokens = pd.DataFrame(columns=cols_tokens)
-        self.df_tokens['Token_type'] = pd.Series([self.group, 'Staking rewards'])
+        # Mapping (token type -> code of the type in lots columns)
+        self.token_types = get_token_types()
+        self.index_types = {token_type: index for index, token_type in enumerate(self.token_types)}
 
-        # Add number of month to tokens DataFrame
-        days_data = {'Day_of_purchase': [i for i in range(1, (num_months + 1) * 30)]}
-        df_months = pd.DataFrame(data=days_data)
-        self.df_tokens = pd.merge(self.df_tokens, df_months, how='cross')
+        # Investors columns
+        self.groups = np.zeros(0, dtype=np.int64)
+        self.risk_coefficients = np.zeros(0, dtype=np.float64)
+        self.activity_coefficients = np.zeros(0, dtype=np.float64)
 
-        # Fill null values
-        self.df_tokens['DivFarm_flag'].fillna(False, inplace=True)
-        self.df_tokens['SbPool_flag'].fillna(False, inplace=True)
-        self.df_tokens['Num'].fillna(0, inplace=True)
-        self.df_tokens['Day_of_freeze'] = int(-INF)
+        # Folder for memory-mapped lots columns (None - columns are kept in memory), files of the columns
+        # and number of investors (or lots) that are processed at once
+        self.storage_path = kwargs.get('storage_path')
+        self.storage_files = {}
+        self.chunk_size = kwargs.get('chunk_size', CHUNK_SIZE)
 
-    def add_tokens(self, params_tokens: dict, day: int):
+        # Lots columns (see LOT_COLUMNS), only first self.num_lots rows are used
+        self.num_lots = 0
+        for name, dtype, fill_value in LOT_COLUMNS:
+            values = self.__allocate_column(name, dtype=dtype, fill_value=fill_value, capacity=capacity)
+            setattr(self, name, values)
+            self.storage_files[name] = getattr(values, 'filename', None)
 
-        groups_tokens = params_tokens.keys()
+        # Index of lots rows by (token type, day of purchase): list of ranges (first row, last row + 1),
+        # one for each group of appended lots, so the index does not grow with the number of lots
+        self.lots_by_day = {}
 
-        # Go though all groups of tokens
-        for group in groups_tokens:
+        # Index of lots rows by freeze: rows of frozen lots are kept in frozen_rows in order of the day of freeze
+        # (only rows from frozen_head to frozen_tail are used), frozen_days keeps ranges (first row, last row + 1)
+        # of frozen_rows for each day of freeze (days go in increasing order)
+        self.frozen_rows = self.__allocate_column('frozen_rows', dtype=np.int64, fill_value=0, capacity=capacity)
+        self.storage_files['frozen_rows'] = getattr(self.frozen_rows, 'filename', None)
+        self.frozen_head = 0
+        self.frozen_tail = 0
+        self.frozen_days = {}
 
-            # Get number of tokens for the group and add them to the investor
-            num_tokens = params_tokens[group]
-            if num_tokens != 0:
-                self.df_tokens.loc[(self.df_tokens['Day_of_purchase'] == day) & (self.df_tokens['Token_type'] == group),
-                                   ['Num']] += num_tokens
+        # Lots whose freeze is over, one list for each (farm, investor), lists of farm id are in slot farm id + 1
+        # (slot 0 - lots that are not put in any farm). Rows of each list are kept in a part of active_rows:
+        # active_start, active_size and active_capacity (slot x investor), only first active_used rows are used
+        self.active_rows = self.__allocate_column('active_rows', dtype=np.int64, fill_value=0, capacity=capacity)
+        self.storage_files['active_rows'] = getattr(self.active_rows, 'filename', None)
+        self.active_used = 0
+        self.active_start = np.zeros((num_farms + 1, 0), dtype=np.int64)
+        self.active_size = np.zeros((num_farms + 1, 0), dtype=np.int64)
+        self.active_capacity = np.zeros((num_farms + 1, 0), dtype=np.int64)
 
-    def get_tokens_amount(self, farm: Farm, day: int) -> float:
+        # Running totals of active tokens of each investor in each slot by token type (slot x investor x type),
+        # they change only when lots become active, get tokens or are transferred
+        self.active_tokens = np.zeros((num_farms + 1, 0, len(self.token_types)), dtype=np.float64)
+
+        # Freeze period and the last day of the index (None - index should be built again)
+        self.index_freeze_period = None
+        self.index_day = int(-INF)
+
+        # Number of settled dividends payouts of each farm for each investor (see Farm accrual mode)
+        self.reward_checkpoints = np.zeros((num_farms, 0), dtype=np.int64)
+
+        # Running totals of tokens (and number of lots) of each investor in each farm
+        self.farm_tokens = np.zeros((num_farms, 0), dtype=np.float64)
+        self.farm_lots_count = np.zeros((num_farms, 0), dtype=np.int64)
+
+        # Maximum day of purchase of lots put in farms, totals are valid for all days after it
+        self.max_farm_lot_day = int(-INF)
+
+        # In debug mode cached totals are checked against the full recomputation
+        self.debug = kwargs.get('debug', is_debug_counters())
+
+        # Cached order of investors by activity coefficients
+        self.activity_order = None
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, group) -> bool:
+        return group in self.keys()
+
+    def __getitem__(self, group: str) -> list:
+        return [Investor(pool=self, index=index) for index in self.get_ids(group)]
+
+    @property
+    def num_farms(self) -> int:
+        return len(self.farm_names)
+
+    def keys(self) -> list:
         """
-        Returns number of tokens that investor has in farm
+        Returns groups of investors in the order they were added to the pool
+        """
+        _, first_indexes = np.unique(self.groups, return_index=True)
+        return [self.token_types[self.groups[index]] for index in sorted(first_indexes)]
+
+    def get_ids(self, group=None) -> np.ndarray:
+        """
+        Returns ids of investors
+        :param group: group of investors, if None all ids are returned
+        """
+        if group is None:
+            return np.arange(len(self), dtype=np.int64)
+
+        return np.flatnonzero(self.groups == self.__get_type_code(group))
+
+    def add_investors(self, group: str, risk_coefficients, activity_coefficients=None, rng=None) -> np.ndarray:
+        """
+        Adds investors of the group to the pool
+        :param group: group of investors
+        :param risk_coefficients: array with risk coefficients (one for each investor)
+        :param activity_coefficients: array with activity coefficients, random by default
+        :param rng: numpy.random.Generator for random activity coefficients, new Generator by default
+        :return: ids of new investors
+        """
+
+        if group not in self.index_types:
+            raise ValueError(f'Group type of investor should be one of: {self.token_types}')
+
+        risk_coefficients = np.asarray(risk_coefficients, dtype=np.float64)
+        num_investors = len(risk_coefficients)
+
+        if activity_coefficients is None:
+            rng = np.random.default_rng() if rng is None else rng
+            activity_coefficients = rng.random(num_investors)
+
+        ids = np.arange(len(self), len(self) + num_investors, dtype=np.int64)
+        self.activity_order = None
+
+        # Extend investors columns
+        self.groups = np.concatenate([self.groups, np.full(num_investors, self.index_types[group])])
+        self.risk_coefficients = np.concatenate([self.risk_coefficients, risk_coefficients])
+        self.activity_coefficients = np.concatenate([self.activity_coefficients,
+                                                     np.asarray(activity_coefficients, dtype=np.float64)])
+        self.reward_checkpoints = np.concatenate([self.reward_checkpoints,
+                                                  np.zeros((self.num_farms, num_investors), dtype=np.int64)], axis=1)
+        self.farm_tokens = np.concatenate([self.farm_tokens,
+                                           np.zeros((self.num_farms, num_investors), dtype=np.float64)], axis=1)
+        self.farm_lots_count = np.concatenate([self.farm_lots_count,
+                                               np.zeros((self.num_farms, num_investors), dtype=np.int64)], axis=1)
+
+        # Active lots lists of new investors are empty
+        for name in ['active_start', 'active_size', 'active_capacity', 'active_tokens']:
+            values = getattr(self, name)
+            shape = (values.shape[0], num_investors, *values.shape[2:])
+            setattr(self, name, np.concatenate([values, np.zeros(shape, dtype=values.dtype)], axis=1))
+
+        return ids
+
+    @profiled('investors.add_tokens')
+    def add_tokens(self, investor_ids, params_tokens: dict, day: int):
+        """
+        Adds tokens to investors
+        :param investor_ids: ids of investors
+        :param params_tokens: dictionary with (token_type: array with number of tokens for each investor)
+        :param day: number of the current day
+        """
+
+        investor_ids = np.asarray(investor_ids, dtype=np.int64)
+
+        for group in params_tokens.keys():
+            type_code = self.__get_type_code(group)
+            num_tokens = np.broadcast_to(np.asarray(params_tokens[group], dtype=np.float64), investor_ids.shape)
+
+            # Skip investors without tokens and join repeated ids
+            mask_tokens = num_tokens != 0
+            if not mask_tokens.any():
+                continue
+
+            ids, inverse = np.unique(investor_ids[mask_tokens], return_inverse=True)
+            num_tokens = np.bincount(inverse, weights=num_tokens[mask_tokens])
+
+            # Investors are processed in chunks (in order of ids, so lots are the same as without chunks)
+            for start in range(0, len(ids), self.chunk_size):
+                chunk = slice(start, start + self.chunk_size)
+                self.__add_lots_tokens(ids=ids[chunk], type_code=type_code, day=day, num_tokens=num_tokens[chunk])
+
+    def get_tokens_amount(self, farm: Farm, day: int, investor_ids=None) -> np.ndarray:
+        """
+        Returns number of tokens that investors have in farm
         :param farm: Farm object
         :param day: number of the day
-        :return: number of tokens
+        :param investor_ids: ids of investors, all investors by default
+        :return: array with number of tokens for each investor
         """
 
-        flag_farm = 'DivFarm_flag' if farm.type_farm == 'DivFarm' else 'SbPool_flag'
-        num_tokens = self.df_tokens[self.df_tokens[flag_farm] & (self.df_tokens['Day_of_purchase'] <= day)]['Num'].sum()
-        return num_tokens
+        farm_id = get_farm_id(farm)
+        investor_ids = self.get_ids() if investor_ids is None else np.asarray(investor_ids, dtype=np.int64)
+
+        # Running totals include all lots in farm, so they could be used only after the last lot's day
+        if day >= self.max_farm_lot_day:
+            num_tokens = self.farm_tokens[farm_id, investor_ids]
+            if self.debug:
+                check_counter(name=f'tokens of investors in {farm.name} on day={day}', cached=num_tokens,
+                              actual=self.__count_tokens_amount(farm_id=farm_id, day=day)[investor_ids])
+            return num_tokens
+
+        return self.__count_tokens_amount(farm_id=farm_id, day=day)[investor_ids]
 
-    def transfer_active_tokens(self, farm: Farm, opposite_farm: Farm, day: int, freeze_period: int):
+    @profiled('investors.transfer_active_tokens')
+    def transfer_active_tokens(self, investor_ids, farm: Farm, other_farms, day: int, freeze_period: int):
         """
-        Transfers investor's active tokens to the farm
+        Transfers active tokens of investors to the farm
+        :param investor_ids: ids of investors
         :param farm: Farm to transfer tokens to
-        :param opposite_farm: opposite farm (investor could have tokens here)
+        :param other_farms: Farm or list with all other farms (investors could have tokens there)
         :param day: number of the day
         :param freeze_period: number of days for tokens freeze
         """
 
-        # Name of column for needed Farm
-        flag_farm = 'SbPool_flag' if farm.type_farm == 'SbPool' else 'DivFarm_flag'
-        flag_opposite_farm = 'DivFarm_flag' if flag_farm == 'SbPool_flag' else 'SbPool_flag'
+        other_farms = [other_farms] if isinstance(other_farms, Farm) else list(other_farms)
+        investor_ids = np.asarray(investor_ids, dtype=np.int64)
+
+        # Dividends should be paid before investors change their tokens in farms
+        self.settle_dividends(farm=farm, investor_ids=investor_ids)
+        for other_farm in other_farms:
+            self.settle_dividends(farm=other_farm, investor_ids=investor_ids)
 
-        # Get DataFrame with active tokens
-        df_active_tokens = self.df_tokens[(self.df_tokens['Day_of_freeze'] <= day - freeze_period)
-                                          & (self.df_tokens[flag_farm] == False) &
-                                          (self.df_tokens['Day_of_purchase'] <= day) &
-                                          (self.df_tokens['Num'] > 0)]
+        self.__update_freeze_index(day=day, freeze_period=freeze_period)
 
-        # Get active tokens that currently are put in different farm
-        df_active_tokens_opposite_farm = df_active_tokens.copy(deep=True)
-        df_active_tokens_opposite_farm = df_active_tokens_opposite_farm[
-            df_active_tokens_opposite_farm[flag_opposite_farm]]
+        # Active lots of investors could be only in slots of other farms and out of farms
+        slots_other = [get_farm_id(other_farm) + 1 for other_farm in other_farms]
+        for slot in set(range(self.num_farms + 1)) - {0, get_farm_id(farm) + 1, *slots_other}:
+            if self.active_size[slot, investor_ids].any():
+                raise ValueError(f'Investors have tokens in farms that are not passed to transfer to {farm.name}')
 
-        # Mark tokens as transferred to the needed Farm
-        df_active_tokens[flag_opposite_farm] = False
-        df_active_tokens[flag_farm] = True
-        df_active_tokens['Day_of_freeze'] = day
+        # Lots of investors are moved in chunks of investors, tokens of each investor are added to farms at once
+        params_active_tokens, params_active_tokens_other_farms = {}, [{} for _ in other_farms]
+        for start in range(0, len(investor_ids), self.chunk_size):
 
-        # Change initial Data Frame with investors tokens
-        self.df_tokens[(self.df_tokens['Day_of_freeze'] <= day - freeze_period)
-                       & (self.df_tokens[flag_farm] == False) &
-                       (self.df_tokens['Day_of_purchase'] <= day) &
-                       (self.df_tokens['Num'] > 0)] = df_active_tokens
+            # Get active tokens and active tokens that currently are put in each of other farms
+            rows_active = self.__pop_active_lots(investor_ids=investor_ids[start:start + self.chunk_size],
+                                                 slots=[0, *slots_other], day=day)
+            farms_active = self.lot_farm[rows_active]
 
-        # Fill dictionary with active tokens parameters
-        params_active_tokens = {}
-        params_active_tokens_opposite_farm = {}
+            # Fill dictionaries with active tokens parameters (before marking tokens as transferred)
+            self.__sum_lots_by_investors(rows_active, params_tokens=params_active_tokens)
+            for other_farm, params_tokens in zip(other_farms, params_active_tokens_other_farms):
+                self.__sum_lots_by_investors(rows_active[farms_active == get_farm_id(other_farm)],
+                                             params_tokens=params_tokens)
 
-        for group in token_types:
-            params_active_tokens[group] = df_active_tokens[df_active_tokens['Token_type'] == group]['Num'].sum()
-            params_active_tokens_opposite_farm[group] = df_active_tokens_opposite_farm[
-                df_active_tokens_opposite_farm['Token_type'] == group]['Num'].sum()
+            # Mark tokens as transferred to the needed Farm
+            self.__move_lots_totals(rows=rows_active, farm_id=get_farm_id(farm))
+            self.__freeze_lots(rows=rows_active, day=day)
+            self.lot_farm[rows_active] = get_farm_id(farm)
+            self.lot_freeze[rows_active] = day
 
         # Add all active tokens to the Farm
-        farm.add_tokens(params_tokens=params_active_tokens, day=day)
+        farm.add_tokens(params_tokens=self.__join_params(params_active_tokens), day=day)
+
+        # Remove parts of tokens that used to be in other farms
+        for other_farm, params_tokens in zip(other_farms, params_active_tokens_other_farms):
+            other_farm.remove_tokens(params_tokens=self.__join_params(params_tokens), day=day)
+
+    def refresh_tokens_amounts(self):
+        """
+        Recomputes running totals of tokens in farms from scratch (freeze index is built again on the next transfer),
+        should be called if lots columns were changed directly
+        """
+
+        self.index_freeze_period = None
+        self.max_farm_lot_day = int(-INF)
+        self.farm_lots_count[:] = 0
+
+        for rows in self.__get_chunks():
+            farms = self.lot_farm[rows]
+            mask_in_farm = farms != NO_FARM
+            if mask_in_farm.any():
+                self.max_farm_lot_day = max(self.max_farm_lot_day, int(self.lot_day[rows][mask_in_farm].max()))
+
+            for farm_id in range(self.num_farms):
+                self.farm_lots_count[farm_id] += np.bincount(self.lot_investor[rows][farms == farm_id],
+                                                             minlength=len(self))
+
+        for farm_id in range(self.num_farms):
+            self.farm_tokens[farm_id] = self.__count_tokens_amount(farm_id=farm_id, day=int(INF))
+
+    @profiled('investors.get_transfer_amounts')
+    def get_transfer_amounts(self, investor_ids, farms: list, day: int, freeze_period: int) -> tuple:
+        """
+        Returns numbers of tokens that would be booked by farms if investors transfer their active tokens
+        :param investor_ids: ids of investors
+        :param farms: list with all farms in order of their ids (see FarmRegistry)
+        :param day: number of the day
+        :param freeze_period: number of days for tokens freeze
+        :return: tuple of arrays (investor x farm): tokens added to the farm if investor transfers tokens to it,
+            tokens removed from the farm if investor transfers tokens to another farm
+        """
+
+        investor_ids = np.asarray(investor_ids, dtype=np.int64)
+
+        # Staking rewards that were not paid yet could be transferred too (farms are settled in the same order
+        # as dividends are paid, from the last farm)
+        for farm in farms[::-1]:
+            self.settle_dividends(farm=farm, investor_ids=investor_ids)
+
+        self.__update_freeze_index(day=day, freeze_period=freeze_period)
+
+        # Active tokens of investors by type in each slot (running totals, lots are not scanned)
+        active_tokens = self.active_tokens[:, investor_ids]
+        if self.debug:
+            check_counter(name=f'active tokens of investors on day={day}', cached=active_tokens,
+                          actual=self.__count_active_tokens(investor_ids=investor_ids))
+
+        # Farm truncates number of tokens of each type for each investor, each farm takes tokens of other slots
+        num_added = np.zeros((len(investor_ids), len(farms)), dtype=np.float64)
+        num_removed = np.zeros((len(investor_ids), len(farms)), dtype=np.float64)
+        for farm in farms:
+            slot = get_farm_id(farm) + 1
+            num_tokens_other = np.zeros(active_tokens.shape[1:], dtype=np.float64)
+            for other_slot in range(len(active_tokens)):
+                if other_slot != slot:
+                    num_tokens_other += active_tokens[other_slot]
+            num_added[:, slot - 1] = np.trunc(num_tokens_other).sum(axis=1)
+            num_removed[:, slot - 1] = np.trunc(active_tokens[slot]).sum(axis=1)
+
+        return num_added, num_removed
+
+    @profiled('investors.settle_dividends')
+    def settle_dividends(self, farm: Farm, investor_ids=None):
+        """
+        Pays dividends that were accrued by farm in accrual mode, but were not paid to investors yet.
+        Staking rewards are added on the days of payouts, so the result is the same as in pay_dividends
+        :param farm: Farm object
+        :param investor_ids: ids of investors, all investors by default
+        """
+
+        if not farm.accrual:
+            return
+
+        farm_id = get_farm_id(farm)
+        num_payouts = len(farm.reward_days)
+        investor_ids = self.get_ids() if investor_ids is None else np.asarray(investor_ids, dtype=np.int64)
+
+        # Investors which have not received some payouts
+        checkpoints = self.reward_checkpoints[farm_id, investor_ids]
+        mask_pending = checkpoints < num_payouts
+        if not mask_pending.any():
+            return
+
+        investor_ids, checkpoints = investor_ids[mask_pending], checkpoints[mask_pending]
+
+        # Tokens in farm did not change since the first not paid payout (investors were not touched)
+        num_tokens = self.get_tokens_amount(farm=farm, day=farm.reward_days[-1], investor_ids=investor_ids)
+
+        for payout in range(checkpoints.min(), num_payouts):
+            mask_payout = checkpoints <= payout
+            num_dividends_investors = num_tokens[mask_payout] * farm.reward_per_token[payout]
+            self.add_tokens(investor_ids=investor_ids[mask_payout],
+                            params_tokens={'Staking rewards': num_dividends_investors},
+                            day=farm.reward_days[payout])
+
+        self.reward_checkpoints[farm_id, investor_ids] = num_payouts
+
+    def has_pending_dividends(self, farm: Farm, investor_ids=None) -> bool:
+        """
+        Checks if some investors have payouts of farm, which were not settled yet (accrual mode)
+        """
+
+        if not farm.accrual:
+            return False
+
+        investor_ids = self.get_ids() if investor_ids is None else np.asarray(investor_ids, dtype=np.int64)
+        return bool((self.reward_checkpoints[get_farm_id(farm), investor_ids] < len(farm.reward_days)).any())
+
+    def get_next_transfer_day(self, investor_ids, farm: Farm, day: int, freeze_period: int) -> int:
+        """
+        Returns the first day (starting from day), when investors have active lots that could be transferred to the farm
+        (if no new lots are added)
+        :param investor_ids: ids of investors
+        :param farm: Farm to transfer tokens to
+        :param day: number of the day
+        :param freeze_period: number of days for tokens freeze
+        :return: number of the day, INF if investors have no such lots
+        """
+
+        self.__update_freeze_index(day=day, freeze_period=freeze_period)
+
+        investor_ids = np.asarray(investor_ids, dtype=np.int64)
+        farm_id = get_farm_id(farm)
+
+        # Active tokens that are not in farm could be transferred on the day
+        slots_other = [slot for slot in range(self.num_farms + 1) if slot != farm_id + 1]
+        if (self.active_tokens[np.ix_(slots_other, investor_ids)] > 0).any():
+            return day
+
+        mask_investors = np.zeros(len(self), dtype=bool)
+        mask_investors[investor_ids] = True
+
+        # Frozen lots become active after freeze period (days of freeze are in increasing order)
+        for freeze_day, (first_row, last_row) in self.frozen_days.items():
+            for start in range(first_row, last_row, self.chunk_size):
+                rows = self.frozen_rows[start:min(start + self.chunk_size, last_row)]
+                mask = mask_investors[self.lot_investor[rows]] & (self.lot_farm[rows] != farm_id) & \
+                    (self.lot_num[rows] > 0)
+                if mask.any():
+                    return max(day, freeze_day + freeze_period)
+
+        return int(INF)
+
+    def get_pending_dividends(self, farm: Farm, investor_ids=None) -> np.ndarray:
+        """
+        Returns dividends that were accrued by farm in accrual mode, but were not paid to investors yet
+        :param farm: Farm object
+        :param investor_ids: ids of investors, all investors by default
+        :return: array with number of tokens for each investor
+        """
+
+        investor_ids = self.get_ids() if investor_ids is None else np.asarray(investor_ids, dtype=np.int64)
+        if not farm.accrual or len(farm.reward_days) == 0:
+            return np.zeros(len(investor_ids))
+
+        # Difference between the current index and index at the last settlement of investor
+        checkpoints = self.reward_checkpoints[get_farm_id(farm), investor_ids]
+        reward_index = np.asarray(farm.reward_index)
+        num_tokens = self.get_tokens_amount(farm=farm, day=farm.reward_days[-1], investor_ids=investor_ids)
+
+        return num_tokens * (reward_index[-1] - reward_index[checkpoints])
+
+    def get_activity_order(self, investor_ids) -> np.ndarray:
+        """
+        Returns ids of investors sorted in descending order by their coefficients of activity
+        :param investor_ids: ids of investors
+        """
+
+        # Activity coefficients never change, so the order of all investors is computed once
+        if self.activity_order is None or len(self.activity_order) != len(self):
+            self.activity_order = np.argsort(-self.activity_coefficients, kind='stable')
+
+        mask_investors = np.zeros(len(self), dtype=bool)
+        mask_investors[np.asarray(investor_ids, dtype=np.int64)] = True
+        return self.activity_order[mask_investors[self.activity_order]]
+
+    def get_tokens_frame(self, investor_id: int) -> pd.DataFrame:
+        """
+        Returns tokens of the investor in the same format as it used to be kept in Investor.df_tokens
+        :param investor_id: id of the investor
+        :return: DataFrame with one row for each (token type, day of purchase)
+        """
+
+        group = self.token_types[self.groups[investor_id]]
+        days = np.arange(1, (self.num_months + 1) * 30, dtype=np.int64)
+
+        # One flag column for each farm (in order of farm ids)
+        df = pd.DataFrame({
+            'Token_type': np.repeat([group, 'Staking rewards'], len(days)),
+            'Num': 0.0,
+            'Initial_price': np.nan,
+            **{f'{name}_flag': False for name in self.farm_names},
+            'Day_of_freeze': int(-INF),
+            'Day_of_purchase': np.tile(days, 2)
+        })
+
+        # Put lots of the investor in rows of DataFrame
+        for row in np.flatnonzero(self.lot_investor[:self.num_lots] == investor_id):
+            token_type = self.token_types[self.lot_type[row]]
+            mask = (df['Token_type'] == token_type) & (df['Day_of_purchase'] == self.lot_day[row])
+            df.loc[mask, 'Num'] = self.lot_num[row]
+            df.loc[mask, 'Day_of_freeze'] = self.lot_freeze[row]
+            if self.lot_farm[row] != NO_FARM:
+                df.loc[mask, f'{self.farm_names[self.lot_farm[row]]}_flag'] = True
+
+        return df
+
+    def remove_storage(self):
+        """
+        Removes files of memory-mapped lots columns (pool could not be used after it)
+        """
+
+        for name in [*[name for name, _, _ in LOT_COLUMNS], 'active_rows', 'frozen_rows']:
+            values = getattr(self, name)
+            setattr(self, name, None)
+            self.__remove_column_file(values, name=name)
+        self.storage_files = {}
+
+    def __get_type_code(self, token_type: str) -> int:
+        if token_type not in self.index_types:
+            raise ValueError(f'Token type should be one of: {self.token_types}')
+        return self.index_types[token_type]
+
+    def __pop_active_lots(self, investor_ids: np.ndarray, slots: list, day: int) -> np.ndarray:
+        """
+        Private method for taking active lots of investors out of the lists of slots (lots that could be transferred)
+        :param investor_ids: ids of investors
+        :param slots: slots of farms (farm id + 1, 0 - lots out of farms)
+        :param day: number of the day
+        :return: array with sorted rows of active lots
+        """
+
+        investors = np.tile(investor_ids, len(slots))
+        slots = np.repeat(np.asarray(slots, dtype=np.int64), len(investor_ids))
+
+        # Lists of investors are emptied (their parts of active_rows are freed, see __reserve_active_rows)
+        sizes = self.active_size[slots, investors]
+        rows = self.active_rows[get_ranges(self.active_start[slots, investors], sizes)]
+        self.active_size[slots, investors] = 0
+        self.active_capacity[slots, investors] = 0
+        self.active_tokens[slots, investors] = 0.0
+
+        # Rows are sorted, so sums over lots are the same as with a full scan
+        rows = np.sort(rows)
+
+        # Lots of the future days and empty lots are not transferred, they are put back
+        mask_active = (self.lot_day[rows] <= day) & (self.lot_num[rows] > 0)
+        self.__push_active_lots(rows[~mask_active])
+
+        return rows[mask_active]
+
+    def __push_active_lots(self, rows: np.ndarray):
+        """
+        Private method for adding lots to the lists of their (farm, investor) and to active tokens
+        """
+
+        if len(rows) == 0:
+            return
+
+        slots, investors = self.lot_farm[rows] + 1, self.lot_investor[rows]
+        np.add.at(self.active_tokens, (slots, investors, self.lot_type[rows]), self.lot_num[rows])
+
+        # Lots are grouped by lists
+        keys = slots * len(self) + investors
+        order = np.argsort(keys, kind='stable')
+        keys, first_indexes, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        slots, investors = np.divmod(keys, len(self))
+
+        # Lists that are full get new parts of active_rows (with doubled capacity), their rows are copied there
+        sizes = self.active_size[slots, investors]
+        mask_full = sizes + counts > self.active_capacity[slots, investors]
+        if mask_full.any():
+            slots_full, investors_full = slots[mask_full], investors[mask_full]
+            capacities = np.maximum(2 * (sizes + counts)[mask_full], LIST_CAPACITY)
+            starts = self.__reserve_active_rows(capacities)
+
+            rows_old = get_ranges(self.active_start[slots_full, investors_full], sizes[mask_full])
+            self.active_rows[get_ranges(starts, sizes[mask_full])] = self.active_rows[rows_old]
+            self.active_start[slots_full, investors_full] = starts
+            self.active_capacity[slots_full, investors_full] = capacities
+
+        # New rows are put after the current rows of lists
+        self.active_rows[get_ranges(self.active_start[slots, investors] + sizes, counts)] = rows[order]
+        self.active_size[slots, investors] += counts
+
+    def __reserve_active_rows(self, capacities: np.ndarray) -> np.ndarray:
+        """
+        Private method for getting new parts of active_rows for lists.
+        If active_rows is full, lists are moved to a new array one after another (parts of emptied lists are freed)
+        :param capacities: array with capacities of the parts
+        :return: array with the first rows of the parts
+        """
+
+        num_new = int(capacities.sum())
+        if self.active_used + num_new > len(self.active_rows):
+            slots, investors = np.nonzero(self.active_capacity)
+            capacities_old = self.active_capacity[slots, investors]
+            num_used = int(capacities_old.sum())
+
+            # Capacity is at least doubled, so lists are moved not more often than they get new rows
+            values = self.active_rows
+            self.active_rows = self.__allocate_column('active_rows', dtype=np.int64, fill_value=0,
+                                                      capacity=2 * (num_used + num_new))
+            starts = np.cumsum(capacities_old) - capacities_old
+            sizes = self.active_size[slots, investors]
+            self.active_rows[get_ranges(starts, sizes)] = values[get_ranges(self.active_start[slots, investors], sizes)]
+            self.active_start[slots, investors] = starts
+            self.active_used = num_used
+
+            self.__remove_column_file(values, name='active_rows')
+            self.storage_files['active_rows'] = getattr(self.active_rows, 'filename', None)
+
+        starts = self.active_used + np.cumsum(capacities) - capacities
+        self.active_used += num_new
+        return starts
+
+    def __is_active(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Private method for checking if lots are in the lists of active lots
+        """
+
+        if self.index_freeze_period is None:
+            return np.zeros(len(rows), dtype=bool)
+        return self.lot_freeze[rows] <= self.index_day - self.index_freeze_period
+
+    def __count_active_tokens(self, investor_ids: np.ndarray) -> np.ndarray:
+        """
+        Private method for counting active tokens of investors from scratch (see active_tokens)
+        """
+
+        positions = np.full(len(self), -1, dtype=np.int64)
+        positions[investor_ids] = np.arange(len(investor_ids))
+
+        num_tokens = np.zeros((self.num_farms + 1, len(investor_ids), len(self.token_types)), dtype=np.float64)
+        for rows in self.__get_chunks():
+            rows = np.arange(rows.start, rows.stop)
+            rows = rows[(positions[self.lot_investor[rows]] >= 0) & self.__is_active(rows)]
+            np.add.at(num_tokens, (self.lot_farm[rows] + 1, positions[self.lot_investor[rows]], self.lot_type[rows]),
+                      self.lot_num[rows])
+
+        return num_tokens
+
+    def __build_freeze_index(self):
+        """
+        Private method for building freeze index from lots columns
+        """
+
+        self.active_used = 0
+        for name in ['active_start', 'active_size', 'active_capacity', 'active_tokens']:
+            getattr(self, name)[:] = 0
+
+        # Lots that were never transferred are not frozen, frozen lots are counted by the day of freeze
+        counts_days = {}
+        for rows in self.__get_chunks():
+            rows = np.arange(rows.start, rows.stop)
+            mask_frozen = self.lot_freeze[rows] > int(-INF)
+            self.__push_active_lots(rows[~mask_frozen])
+
+            days, counts = np.unique(self.lot_freeze[rows[mask_frozen]], return_counts=True)
+            for freeze_day, count in zip(days.tolist(), counts.tolist()):
+                counts_days[freeze_day] = counts_days.get(freeze_day, 0) + count
+
+        # Each day of freeze gets its range of frozen_rows
+        self.frozen_head, self.frozen_tail, self.frozen_days = 0, 0, {}
+        self.__reserve_frozen_rows(sum(counts_days.values()))
+        positions = {}
+        for freeze_day in sorted(counts_days):
+            positions[freeze_day] = self.frozen_tail
+            self.frozen_tail += counts_days[freeze_day]
+            self.frozen_days[freeze_day] = (positions[freeze_day], self.frozen_tail)
+
+        # Rows of frozen lots are put in their ranges
+        for rows in self.__get_chunks():
+            rows = np.arange(rows.start, rows.stop)
+            rows_frozen = rows[self.lot_freeze[rows] > int(-INF)]
+            rows_frozen = rows_frozen[np.argsort(self.lot_freeze[rows_frozen], kind='stable')]
+            days, first_rows = np.unique(self.lot_freeze[rows_frozen], return_index=True)
+            for freeze_day, rows_day in zip(days.tolist(), np.split(rows_frozen, first_rows[1:])):
+                self.frozen_rows[positions[freeze_day]:positions[freeze_day] + len(rows_day)] = rows_day
+                positions[freeze_day] += len(rows_day)
+
+    def __update_freeze_index(self, day: int, freeze_period: int):
+        """
+        Private method for moving lots, whose freeze is over on the day, to active lots
+        """
+
+        # Index is built again if freeze period is changed or days go back
+        if freeze_period != self.index_freeze_period or day < self.index_day:
+            self.index_freeze_period = None
+            self.__build_freeze_index()
+            self.index_freeze_period = freeze_period
+        self.index_day = day
+
+        # Days of freeze go in increasing order, so released lots are in the beginning of frozen_rows
+        last_row = self.frozen_head
+        while self.frozen_days:
+            freeze_day = next(iter(self.frozen_days))
+            if freeze_day > day - freeze_period:
+                break
+            _, last_row = self.frozen_days.pop(freeze_day)
+
+        for start in range(self.frozen_head, last_row, self.chunk_size):
+            self.__push_active_lots(np.array(self.frozen_rows[start:min(start + self.chunk_size, last_row)]))
+        self.frozen_head = last_row
+        if self.frozen_head == self.frozen_tail:
+            self.frozen_head, self.frozen_tail = 0, 0
+
+    def __freeze_lots(self, rows: np.ndarray, day: int):
+        """
+        Private method for moving active lots (already taken out of active lists) to frozen lots of the day
+        """
+
+        if len(rows) == 0:
+            return
+
+        # Lots are frozen on the last day of the index, so the day is the last one in frozen_days
+        self.__reserve_frozen_rows(len(rows))
+        first_row, _ = self.frozen_days.get(day, (self.frozen_tail, None))
+        self.frozen_rows[self.frozen_tail:self.frozen_tail + len(rows)] = rows
+        self.frozen_tail += len(rows)
+        self.frozen_days[day] = (first_row, self.frozen_tail)
+
+    def __reserve_frozen_rows(self, num_new: int):
+        """
+        Private method for getting space for new rows in the end of frozen_rows.
+        If frozen_rows is full, used rows are moved to the beginning of a new array
+        """
+
+        if self.frozen_tail + num_new <= len(self.frozen_rows):
+            return
+
+        # Capacity is at least doubled, so rows are moved not more often than they are added
+        num_used = self.frozen_tail - self.frozen_head
+        values = self.frozen_rows
+        self.frozen_rows = self.__allocate_column('frozen_rows', dtype=np.int64, fill_value=0,
+                                                  capacity=2 * (num_used + num_new))
+        for start in range(0, num_used, self.chunk_size):
+            stop = min(start + self.chunk_size, num_used)
+            self.frozen_rows[start:stop] = values[self.frozen_head + start:self.frozen_head + stop]
+        self.frozen_days = {freeze_day: (first_row - self.frozen_head, last_row - self.frozen_head)
+                            for freeze_day, (first_row, last_row) in self.frozen_days.items()}
+        self.frozen_head, self.frozen_tail = 0, num_used
+
+        self.__remove_column_file(values, name='frozen_rows')
+        self.storage_files['frozen_rows'] = getattr(self.frozen_rows, 'filename', None)
+
+    def __count_tokens_amount(self, farm_id: int, day: int) -> np.ndarray:
+        """
+        Private method for counting tokens of all investors in farm from scratch
+        """
+
+        num_tokens = np.zeros(len(self), dtype=np.float64)
+        for rows in self.__get_chunks():
+            mask = (self.lot_farm[rows] == farm_id) & (self.lot_day[rows] <= day)
+
+            # Tokens are added one by one in order of lots, so the sum is the same as one bincount of all lots
+            np.add.at(num_tokens, self.lot_investor[rows][mask], self.lot_num[rows][mask])
+
+        return num_tokens
+
+    def __move_lots_totals(self, rows: np.ndarray, farm_id: int):
+        """
+        Private method for updating running totals when lots are moved to the farm
+        :param rows: rows of lots
+        :param farm_id: id of the farm which gets lots
+        """
+
+        if len(rows) == 0:
+            return
+
+        investors, num_tokens, farms = self.lot_investor[rows], self.lot_num[rows], self.lot_farm[rows]
+
+        # Remove lots from farms where they used to be
+        mask_in_farm = farms != NO_FARM
+        np.subtract.at(self.farm_tokens, (farms[mask_in_farm], investors[mask_in_farm]), num_tokens[mask_in_farm])
+        np.subtract.at(self.farm_lots_count, (farms[mask_in_farm], investors[mask_in_farm]), 1)
+
+        # Add lots to the farm
+        np.add.at(self.farm_tokens[farm_id], investors, num_tokens)
+        np.add.at(self.farm_lots_count[farm_id], investors, 1)
+
+        # Investors without lots in farm have exactly zero tokens (no rounding errors are left)
+        investors = np.unique(investors)
+        farm_tokens = self.farm_tokens[:, investors]
+        farm_tokens[self.farm_lots_count[:, investors] == 0] = 0.0
+        self.farm_tokens[:, investors] = farm_tokens
+
+        self.max_farm_lot_day = max(self.max_farm_lot_day, int(self.lot_day[rows].max()))
+
+    def __add_lots_tokens(self, ids: np.ndarray, type_code: int, day: int, num_tokens: np.ndarray):
+        """
+        Private method for adding tokens of one type to lots of investors (ids are unique)
+        """
+
+        # Find lots which already exist for the day
+        rows = self.__find_lots(ids=ids, type_code=type_code, day=day)
+        mask_existing = rows >= 0
+        self.lot_num[rows[mask_existing]] += num_tokens[mask_existing]
+
+        # Tokens added to lots that are already put in farms change running totals
+        farms_existing = self.lot_farm[rows[mask_existing]]
+        mask_in_farm = farms_existing != NO_FARM
+        np.add.at(self.farm_tokens, (farms_existing[mask_in_farm], ids[mask_existing][mask_in_farm]),
+                  num_tokens[mask_existing][mask_in_farm])
+
+        # Tokens added to active lots change active tokens
+        mask_active = self.__is_active(rows[mask_existing])
+        np.add.at(self.active_tokens, (farms_existing[mask_active] + 1, ids[mask_existing][mask_active], type_code),
+                  num_tokens[mask_existing][mask_active])
+
+        # Create new lots for other investors
+        self.__append_lots(ids=ids[~mask_existing], type_code=type_code, day=day,
+                           num_tokens=num_tokens[~mask_existing])
+
+    def __find_lots(self, ids: np.ndarray, type_code: int, day: int) -> np.ndarray:
+        """
+        Private method for finding lots of investors for (token type, day)
+        :return: array with lot rows (-1 if investor has no lot)
+        """
+
+        # We only need to look at the lots of the token type and the day
+        ranges = np.array(self.lots_by_day.get((type_code, day), []), dtype=np.int64).reshape(-1, 2)
+        candidates = get_ranges(ranges[:, 0], ranges[:, 1] - ranges[:, 0])
+
+        rows_by_investor = np.full(len(self), -1, dtype=np.int64)
+        rows_by_investor[self.lot_investor[candidates]] = candidates
+        return rows_by_investor[ids]
+
+    def __append_lots(self, ids: np.ndarray, type_code: int, day: int, num_tokens: np.ndarray):
+        """
+        Private method for adding new lots in the end of lots columns
+        """
+
+        num_new = len(ids)
+        if num_new == 0:
+            return
+
+        self.__reserve(num_new)
+
+        rows = slice(self.num_lots, self.num_lots + num_new)
+        self.lots_by_day.setdefault((type_code, day), []).append((rows.start, rows.stop))
+
+        self.lot_investor[rows] = ids
+        self.lot_type[rows] = type_code
+        self.lot_day[rows] = day
+        self.lot_num[rows] = num_tokens
+        self.lot_farm[rows] = NO_FARM
+        self.lot_freeze[rows] = int(-INF)
+        self.num_lots += num_new
+
+        # New lots are not frozen (lists are filled when freeze index is built)
+        if self.index_freeze_period is not None:
+            self.__push_active_lots(np.arange(rows.start, rows.stop))
+
+    def __reserve(self, num_new: int):
+        """
+        Private method for growing lots columns (capacity is doubled)
+        """
+
+        capacity = len(self.lot_num)
+        if self.num_lots + num_new <= capacity:
+            return
+
+        new_capacity = max(2 * capacity, self.num_lots + num_new)
+        for name, dtype, fill_value in LOT_COLUMNS:
+            values = getattr(self, name)
+            new_values = self.__allocate_column(name, dtype=dtype, fill_value=fill_value, capacity=new_capacity)
+            for rows in self.__get_chunks():
+                new_values[rows] = values[rows]
+            setattr(self, name, new_values)
+
+            # File of the old column is removed if it was created by this pool (not by a loaded checkpoint)
+            self.__remove_column_file(values, name=name)
+            self.storage_files[name] = getattr(new_values, 'filename', None)
+
+    def __allocate_column(self, name: str, dtype, fill_value, capacity: int) -> np.ndarray:
+        """
+        Private method for creating lots column (in memory or in a new file in storage_path)
+        """
+
+        if self.storage_path is None:
+            return np.full(capacity, fill_value, dtype=dtype)
+
+        os.makedirs(self.storage_path, exist_ok=True)
+        file_descriptor, file_path = tempfile.mkstemp(prefix=f'{name}_', suffix='.npy', dir=self.storage_path)
+        os.close(file_descriptor)
+
+        values = np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=(capacity,))
+        if fill_value != 0:
+            for start in range(0, capacity, self.chunk_size):
+                values[start:start + self.chunk_size] = fill_value
+
+        return values
+
+    def __remove_column_file(self, values: np.ndarray, name: str):
+        """
+        Private method for removing file of the memory-mapped column, which is not used anymore
+        """
+
+        file_path = getattr(values, 'filename', None)
+        if file_path is None or file_path != self.storage_files.get(name):
+            return
+
+        # On Windows file could not be removed while it is still mapped
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    def __get_chunks(self):
+        """
+        Private method for iterating over used lots rows in chunks
+        :return: generator of slices
+        """
+
+        for start in range(0, self.num_lots, self.chunk_size):
+            yield slice(start, min(start + self.chunk_size, self.num_lots))
+
+    def __join_params(self, params_tokens: dict) -> dict:
+        """
+        Private method for joining parts of tokens params (see __sum_lots_by_investors), types go in order of codes
+        """
+
+        return {token_type: np.concatenate(params_tokens[token_type]) for token_type in self.token_types
+                if token_type in params_tokens}
+
+    def __sum_lots_by_investors(self, rows: np.ndarray, params_tokens: dict):
+        """
+        Private method for getting number of tokens in lots for each investor
+        :param rows: rows of lots
+        :param params_tokens: dictionary with (token_type: list of arrays with number of tokens for each investor),
+            arrays of these rows are appended to it
+        """
+
+        num_types = len(self.token_types)
+
+        # Tokens are summed for all types at once (lots of each investor are added in order of rows)
+        investors, inverse = np.unique(self.lot_investor[rows], return_inverse=True)
+        num_tokens = np.bincount(inverse * num_types + self.lot_type[rows], weights=self.lot_num[rows],
+                                 minlength=len(investors) * num_types).reshape(-1, num_types)
+
+        for type_code in np.unique(self.lot_type[rows]):
+            params_tokens.setdefault(self.token_types[type_code], []).append(num_tokens[:, type_code])
+
+
+class Investor:
+    """
+    View of one investor in InvestorPool.
+
+    Could be created as before with Investor(group=..., risk_coefficient=..., num_months=...),
+    in this case a separate pool with one investor is created (activity coefficient is taken from rng,
+    numpy.random.Generator, if it is passed).
+    """
+
+    def __init__(self, pool=None, index=None, **kwargs):
+
+        if pool is None:
+            pool = InvestorPool(num_months=kwargs.get('num_months', 48), capacity=64)
+            risk_coefficient = kwargs.get('risk_coefficient', None)
+            risk_coefficient = np.nan if risk_coefficient is None else risk_coefficient
+            index = pool.add_investors(group=kwargs.get('group', 'Seed'), risk_coefficients=[risk_coefficient],
+                                       rng=kwargs.get('rng'))[0]
+
+        self.pool = pool
+        self.index = int(index)
+
+    @property
+    def group(self) -> str:
+        return self.pool.token_types[self.pool.groups[self.index]]
+
+    @property
+    def risk_coefficient(self) -> float:
+        return self.pool.risk_coefficients[self.index]
+
+    @property
+    def activity_coefficient(self) -> float:
+        return self.pool.activity_coefficients[self.index]
+
+    @property
+    def df_tokens(self) -> pd.DataFrame:
+        return self.pool.get_tokens_frame(self.index)
+
+    def add_tokens(self, params_tokens: dict, day: int):
+
+        # Each token type gets an array with one value for the investor
+        params_tokens = {group: [num_tokens] for group, num_tokens in params_tokens.items()}
+        self.pool.add_tokens(investor_ids=[self.index], params_tokens=params_tokens, day=day)
+
+    def get_tokens_amount(self, farm: Farm, day: int) -> float:
+        """
+        Returns number of tokens that investor has in farm
+        :param farm: Farm object
+        :param day: number of the day
+        :return: number of tokens
+        """
+
+        return self.pool.get_tokens_amount(farm=farm, day=day, investor_ids=[self.index])[0]
+
+    def transfer_active_tokens(self, farm: Farm, other_farms=None, day: int = None, freeze_period: int = None,
+                               opposite_farm: Farm = None):
+        """
+        Transfers investor's active tokens to the farm
+        :param farm: Farm to transfer tokens to
+        :param other_farms: Farm or list with all other farms (investor could have tokens there)
+        :param day: number of the day
+        :param freeze_period: number of days for tokens freeze
+        :param opposite_farm: the other farm of two farms modelling (could be passed instead of other_farms)
+        """
+
+        if opposite_farm is not None:
+            other_farms = [opposite_farm]
+        if other_farms is None:
+            raise ValueError(f'Farms with tokens of investor should be passed to transfer to {farm.name}')
 
-        # Remove part of tokens that used to be in the opposite farm
-        opposite_farm.remove_tokens(params_tokens=params_active_tokens_opposite_farm, day=day)
+        self.pool.transfer_active_tokens(investor_ids=[self.index], farm=farm, other_farms=other_farms,
+                                         day=day, freeze_period=freeze_period)
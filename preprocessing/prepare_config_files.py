@@ -1,15 +1,145 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
 import pandas as pd
 import logging
-from utilities.py_tools import read_file, save_file, get_root
+from utilities.py_tools import read_file, save_file, get_root, get_source_hash, log
 
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s - [%(levelname)s] (%(filename)s).%(funcName)s(%(lineno)d) - %(message)s")
 
 
-def prepare_mint_sample():
+# Folder for compiled config files (parsed DataFrames, file name contains hash of the source file and of parsing)
+PATH_COMPILED = 'config/compiled/'
+
+# Version of parsing of config files, it is a part of the names of compiled config files together with the source
+# code of the read function. Increase it when parsing changes outside of this code (e.g. after updates of pandas)
+PARSER_VERSION = 1
+
+# Config files that were already loaded in the current process (sample_path -> DataFrame)
+loaded_samples = {}
+
+
+def get_file_hash(file_path: str) -> str:
+    """
+    Returns SHA-256 hash of the file content
+    :param file_path: path of the file from the root of the project
+    """
+
+    with open(get_root() + file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_compiled_sample(sample_path: str, read_function, *args) -> pd.DataFrame:
+    """
+    Loads config file once per process. Parsed DataFrame is saved in compiled form (pickle) keyed by hash
+    of the file content and of parsing (PARSER_VERSION, code of the read function and its arguments),
+    so the next processes do not parse Excel files again
+    :param sample_path: path of the config file
+    :param read_function: function which parses the config file, read_function(sample_path, *args)
+    :return: copy of the parsed DataFrame, None if config file is not found
+    """
+
+    if sample_path in loaded_samples:
+        return loaded_samples[sample_path].copy(deep=True)
+
+    try:
+        file_hash = get_file_hash(sample_path)
+    except (FileNotFoundError, FileExistsError):
+        logging.critical(f"Config file in path={sample_path} is not found")
+        return
+
+    # Compiled config file is not used if the file or its parsing has changed
+    hash_sha = hashlib.sha256(file_hash.encode())
+    hash_sha.update(repr((PARSER_VERSION, get_source_hash(read_function, read_file), args)).encode())
+
+    file_name = os.path.splitext(os.path.basename(sample_path))[0]
+    compiled_path = get_root() + PATH_COMPILED + f'{file_name}_{hash_sha.hexdigest()[:16]}.pkl'
+
+    # Load compiled config file if the source file has not changed
+    if os.path.exists(compiled_path):
+        with open(compiled_path, 'rb') as f:
+            df = pickle.load(f)
+
+    else:
+        df = read_function(sample_path, *args)
+        if df is None:
+            return
+
+        # Save compiled config file (modelling still works if it could not be saved). File is written
+        # to a temporary file first and then replaced, so other threads and processes never read a part of it
+        try:
+            os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+            file_descriptor, path_tmp = tempfile.mkstemp(prefix=f'{file_name}_', suffix='.tmp',
+                                                         dir=os.path.dirname(compiled_path))
+            try:
+                with os.fdopen(file_descriptor, 'wb') as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path_tmp, compiled_path)
+            finally:
+                if os.path.exists(path_tmp):
+                    os.remove(path_tmp)
+        except OSError:
+            logging.warning(f"Compiled config file in path={compiled_path} could not be saved")
+
+    loaded_samples[sample_path] = df
+    return df.copy(deep=True)
+
+
+def register_sample(sample_path: str, df: pd.DataFrame):
+    """
+    Puts DataFrame in loaded config files, so it is used instead of the file (e.g. synthetic configs of benchmarks)
+    :param sample_path: path of the config file
+    :param df: DataFrame in the same format as the parsed file
+    """
+
+    loaded_samples[sample_path] = df.copy(deep=True)
+
+
+def get_token_types():
+    """
+    Returns array with all token types from tokens params (config is loaded on the first call)
+    """
+
+    return prepare_token_params_sample()['Token_type'].values
+
+
+def prepare_mint_sample(sample_path='config/token_mint_distr.xlsx'):
+    return load_compiled_sample(sample_path, read_mint_sample)
+
+
+def prepare_token_params_sample(sample_path='config/tokens_params.xlsx'):
+    return load_compiled_sample(sample_path, read_token_params_sample)
+
+
+def prepare_initial_params_sample(sample_path):
+    """
+    Reads config file with all constants
+    :return: DataFrame with constants
+    """
+    return load_compiled_sample(sample_path, read_initial_params_sample)
+
+
+def prepare_config_samples(path_constants='config/constants.xlsx', path_mint='config/token_mint_distr.xlsx',
+                           path_token_params='config/tokens_params.xlsx') -> tuple:
+    """
+    Loads all config files concurrently on a thread pool
+    :return: tuple of DataFrames (initial params, mint distribution, token params)
+    """
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        future_initial_params = executor.submit(prepare_initial_params_sample, path_constants)
+        future_mint = executor.submit(prepare_mint_sample, path_mint)
+        future_token_params = executor.submit(prepare_token_params_sample, path_token_params)
 
-    # Paths for config files
-    sample_path = 'config/token_mint_distr.xlsx'
+        return future_initial_params.result(), future_mint.result(), future_token_params.result()
+
+
+def read_mint_sample(sample_path):
 
     # Read and clean Data Frame
     try:
@@ -26,9 +156,7 @@ def prepare_mint_sample():
     return df
 
 
-def prepare_token_params_sample():
-    # Paths for config files
-    sample_path = 'config/tokens_params.xlsx'
+def read_token_params_sample(sample_path):
 
     # Read config Excel file
     try:
@@ -42,7 +170,7 @@ def prepare_token_params_sample():
     return df
 
 
-def prepare_initial_params_sample(sample_path):
+def read_initial_params_sample(sample_path):
     """
     Reads config file with all constants
     :return: DataFrame with constants
@@ -51,21 +179,17 @@ def prepare_initial_params_sample(sample_path):
     # Read all Data Frames with constants
     try:
 
-        # Read modelling constants
-        df_modelling_constants = read_file(sample_path, encoding='utf8', sheetname='Modelling_Constants')
-        df_modelling_constants.drop(df_modelling_constants.filter(regex="Unname"), axis=1, inplace=True)
+        # Read all sheets with constants in one pass
+        sheets = ['Modelling_Constants', 'Dividends_Constants', 'Investors_Constants', 'Sb_Pool_Constants']
+        dfs_constants = read_file(sample_path, encoding='utf8', sheetname=sheets)
+        for df_constants in dfs_constants.values():
+            df_constants.drop(df_constants.filter(regex="Unname"), axis=1, inplace=True)
 
-        # Read dividends constants
-        df_dividends_constants = read_file(sample_path, encoding='utf8', sheetname='Dividends_Constants')
-        df_dividends_constants.drop(df_dividends_constants.filter(regex="Unname"), axis=1, inplace=True)
-
-        # Read investors constants
-        df_investors_constants = read_file(sample_path, encoding='utf8', sheetname='Investors_Constants')
-        df_investors_constants.drop(df_investors_constants.filter(regex="Unname"), axis=1, inplace=True)
-
-        # Read SbPool constants
-        df_sb_pool_constants = read_file(sample_path, encoding='utf8', sheetname='Sb_Pool_Constants')
-        df_sb_pool_constants.drop(df_sb_pool_constants.filter(regex="Unname"), axis=1, inplace=True)
+        # Modelling, dividends, investors and SbPool constants
+        df_modelling_constants = dfs_constants['Modelling_Constants']
+        df_dividends_constants = dfs_constants['Dividends_Constants']
+        df_investors_constants = dfs_constants['Investors_Constants']
+        df_sb_pool_constants = dfs_constants['Sb_Pool_Constants']
 
         # Join all Data Frames with constants
         data_frames = [df_modelling_constants, df_sb_pool_constants, df_investors_constants, df_dividends_constants]
@@ -111,6 +235,20 @@ def prepare_initial_params_sample(sample_path):
 
 
 if __name__ == '__main__':
-    df_mint_distr = prepare_mint_sample()
-    df_token_params = prepare_token_params_sample()
-    df_initial_params = prepare_initial_params_sample()
+
+    # Compare time of parsing config files with time of loading compiled config files
+    for read_function, path in [(read_mint_sample, 'config/token_mint_distr.xlsx'),
+                                (read_token_params_sample, 'config/tokens_params.xlsx'),
+                                (read_initial_params_sample, 'config/constants.xlsx')]:
+        start_time = time()
+        read_function(path)
+        time_parse = time() - start_time
+
+        load_compiled_sample(path, read_function)
+        loaded_samples.clear()
+
+        start_time = time()
+        load_compiled_sample(path, read_function)
+        time_compiled = time() - start_time
+
+        log(f'{path}: parsing = {time_parse:.3f} s, loading compiled = {time_compiled:.3f} s')
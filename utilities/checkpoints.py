@@ -0,0 +1,96 @@
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+# File with attributes that are not arrays
+STATE_FILE = 'state.pkl'
+
+
+class NestedObjects:
+    """
+    Placeholder of nested objects in the pickle file of the object state, objects are saved to their own folders
+    (attribute name for one object, attribute name / index of the object for list), see save_object_state
+    """
+
+    def __init__(self, classes: list, is_list: bool):
+        self.classes = classes
+        self.is_list = is_list
+
+
+def save_object_state(obj, folder_path: str):
+    """
+    Saves attributes of the object: arrays to .npy files (could be memory-mapped on loading),
+    objects from CHECKPOINT_NESTED of the class (object or list of objects) to their own folders in the same way,
+    all other attributes to one pickle file
+    :param obj: object to save
+    :param folder_path: folder for the object files (is created if needed)
+    """
+
+    os.makedirs(folder_path, exist_ok=True)
+    nested_names = getattr(obj, 'CHECKPOINT_NESTED', [])
+
+    state = {}
+    for name, value in obj.__dict__.items():
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            np.save(os.path.join(folder_path, name + '.npy'), value)
+        elif name in nested_names:
+            objects = value if isinstance(value, list) else [value]
+            state[name] = NestedObjects(classes=[type(nested_obj) for nested_obj in objects],
+                                        is_list=isinstance(value, list))
+            for nested_obj, nested_path in zip(objects, get_nested_paths(folder_path, name, state[name])):
+                save_object_state(nested_obj, nested_path)
+        else:
+            state[name] = value
+
+    with open(os.path.join(folder_path, STATE_FILE), 'wb') as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_object_state(cls, folder_path: str, mmap_mode='c'):
+    """
+    Creates object of the class from the saved attributes (__init__ is not called)
+    :param cls: class of the object
+    :param folder_path: folder with the object files (see save_object_state)
+    :param mmap_mode: mode of memory-mapping of arrays (see numpy.load), by default arrays are copied on write,
+        so the files are not changed; None - read arrays to memory
+    :return: object of the class
+    """
+
+    with open(os.path.join(folder_path, STATE_FILE), 'rb') as file:
+        state = pickle.load(file)
+
+    for file_name in os.listdir(folder_path):
+        if file_name.endswith('.npy'):
+            state[file_name[:-len('.npy')]] = np.load(os.path.join(folder_path, file_name), mmap_mode=mmap_mode)
+
+    for name, value in state.items():
+        if isinstance(value, NestedObjects):
+            objects = [load_object_state(cls_nested, nested_path, mmap_mode=mmap_mode)
+                       for cls_nested, nested_path in zip(value.classes, get_nested_paths(folder_path, name, value))]
+            state[name] = objects if value.is_list else objects[0]
+
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    return obj
+
+
+def get_nested_paths(folder_path: str, name: str, nested: NestedObjects) -> list:
+    """
+    Returns folders of nested objects of the attribute (see NestedObjects)
+    """
+
+    if not nested.is_list:
+        return [os.path.join(folder_path, name)]
+    return [os.path.join(folder_path, name, str(index)) for index in range(len(nested.classes))]
+
+
+def replace_folder(folder_path_tmp: str, folder_path: str):
+    """
+    Replaces folder by the fully written temporary folder, so that a failed save does not break the old checkpoint
+    """
+
+    if os.path.exists(folder_path):
+        shutil.rmtree(folder_path)
+    os.replace(folder_path_tmp, folder_path)
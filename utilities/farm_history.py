@@ -0,0 +1,304 @@
+import numpy as np
+
+# Values of all rows are saved as a snapshot after each SNAPSHOT_PERIOD days (point queries start from it)
+SNAPSHOT_PERIOD = 30
+
+# Initial number of changes in the log (it is doubled when it is full)
+LOG_CAPACITY = 256
+
+
+class FarmHistory:
+    """
+    Daily values of Farm (type x day) kept as values of the current (open) day and a log of changes.
+
+    Values are changed only on the open day, the day is closed when the next day is opened (see carry),
+    then only cells that differ from the previous day are written to the log. Values of all rows are also saved
+    after each snapshot_period days, so a value of any day is found from the nearest snapshot before it.
+    Days after the open day were not opened yet and have zero values (as columns of a preallocated array).
+    Memory grows with the number of changes, the full array (type x day) is created only on request (see to_array).
+    Log and snapshots are kept in arrays, so they are saved to .npy files in checkpoints (see save_object_state).
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, snapshot_period=SNAPSHOT_PERIOD):
+
+        self.num_rows = num_rows
+
+        # Number of days including day 0 (day is used as a column index of the full array)
+        self.num_cols = num_cols
+        self.snapshot_period = snapshot_period
+
+        # Open day and its values
+        self.day = 0
+        self.values = np.zeros(num_rows, dtype=np.float64)
+
+        # Values of the last closed day (the day before the open day), the array is replaced, not changed
+        self.closed_values = np.zeros(num_rows, dtype=np.float64)
+
+        # Log of changes sorted by day: row log_rows[i] has value log_values[i] from day log_days[i]
+        self.num_changes = 0
+        self.log_days = np.zeros(LOG_CAPACITY, dtype=np.int64)
+        self.log_rows = np.zeros(LOG_CAPACITY, dtype=np.int64)
+        self.log_values = np.zeros(LOG_CAPACITY, dtype=np.float64)
+
+        # Snapshots: days, values of all rows on them and number of changes in the log up to them (included),
+        # there is a snapshot on each day divisible by snapshot_period, only first num_snapshots are used
+        max_snapshots = (num_cols - 1) // snapshot_period + 1
+        self.num_snapshots = 0
+        self.snapshot_days = np.zeros(max_snapshots, dtype=np.int64)
+        self.snapshot_values = np.zeros((max_snapshots, num_rows), dtype=np.float64)
+        self.snapshot_changes = np.zeros(max_snapshots, dtype=np.int64)
+
+    def get(self, row: int, day: int) -> float:
+        """
+        Gets value of the row on the day
+        :param row: index of the row
+        :param day: number of the day
+        :return: float, value
+        """
+
+        self.__check_day(day)
+
+        if day == self.day:
+            return self.values[row]
+        elif day > self.day:
+            return np.float64(0.0)
+
+        value, start = self.__get_snapshot(day, row=row)
+        stop = self.__get_position(day, start=start)
+
+        # The last change of the row up to the day (log is sorted by day)
+        changes = np.flatnonzero(self.log_rows[start:stop] == row)
+        if len(changes):
+            value = self.log_values[start + changes[-1]]
+
+        return value
+
+    def get_day(self, day: int) -> np.ndarray:
+        """
+        Gets values of all rows on the day
+        :param day: number of the day
+        :return: array with value of each row (copy)
+        """
+
+        self.__check_day(day)
+
+        if day == self.day:
+            return self.values.copy()
+        elif day > self.day:
+            return np.zeros(self.num_rows, dtype=np.float64)
+
+        values, start = self.__get_snapshot(day)
+        values = values.copy()
+        self.__apply_changes(values, start, self.__get_position(day, start=start))
+
+        return values
+
+    def get_range(self, first_day: int, last_day: int) -> np.ndarray:
+        """
+        Gets values of all rows for the range of days
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included)
+        :return: array (row x day)
+        """
+
+        self.__check_day(first_day)
+        self.__check_day(last_day)
+
+        result = np.zeros((self.num_rows, last_day - first_day + 1), dtype=np.float64)
+
+        # Closed days are restored from the log: values of the first day are filled forward until the next change
+        last_closed = min(last_day, self.day - 1)
+        if first_day <= last_closed:
+            values = self.get_day(first_day)
+            start = self.__get_position(first_day)
+            stop = self.__get_position(last_closed, start=start)
+
+            # Number of the last change of each cell (starting from one, zero - no changes since the first day)
+            index = np.zeros((self.num_rows, last_closed - first_day + 1), dtype=np.int64)
+            index[self.log_rows[start:stop], self.log_days[start:stop] - first_day] = np.arange(start, stop) + 1
+            index = np.maximum.accumulate(index, axis=1)
+
+            result[:, :index.shape[1]] = np.where(index > 0, self.log_values[index - 1], values[:, None])
+
+        if first_day <= self.day <= last_day:
+            result[:, self.day - first_day] = self.values
+
+        return result
+
+    def to_array(self) -> np.ndarray:
+        """
+        Gets values of all days as array (row x day), column 0 is day 0
+        """
+        return self.get_range(0, self.num_cols - 1)
+
+    def add(self, row: int, day: int, value: float):
+        """
+        Adds value to the row on the day (the day is opened if it is after the open day)
+        :param row: index of the row
+        :param day: number of the day
+        :param value: value to add
+        """
+
+        if day != self.day:
+            self.__open(day)
+        self.values[row] += value
+
+    def clear(self, day: int):
+        """
+        Sets values of all rows on the day to zero
+        """
+
+        self.__open(day)
+        self.values[:] = 0.0
+
+    def carry(self, day: int, clear=False):
+        """
+        Closes the day and opens the next day with the same values
+        :param day: number of the day
+        :param clear: flag if the next day starts from zero values
+        """
+
+        if day != self.day:
+            self.__open(day)
+        self.__close(day)
+
+        if clear:
+            self.values[:] = 0.0
+
+    def carry_days(self, first_day: int, last_day: int, row=None, values=None):
+        """
+        Closes days from the first to the last one and opens the next day, values are the same on all days
+        (as after carry for each day), except the row, that has the given value on each day
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included)
+        :param row: index of the row with changing values
+        :param values: array with value of the row on each day
+        """
+
+        self.__open(first_day)
+
+        if row is None:
+            self.__close(last_day)
+            return
+
+        self.values[row] = values[0]
+        self.__close(first_day)
+        if last_day == first_day:
+            return
+
+        # Changes of the row on the next days
+        days = np.arange(first_day + 1, last_day + 1)
+        changed = values[1:] != values[:-1]
+        self.__append_changes(days=days[changed], rows=np.full(changed.sum(), row), values=values[1:][changed])
+
+        # Snapshots on the days inside the range
+        for day in range(first_day + 1, last_day + 1):
+            if day % self.snapshot_period == 0:
+                snapshot = self.closed_values.copy()
+                snapshot[row] = values[day - first_day]
+                self.__add_snapshot(day, snapshot, self.__get_position(day))
+
+        self.closed_values = self.values.copy()
+        self.closed_values[row] = values[-1]
+        self.values[row] = values[-1]
+        self.day = last_day + 1
+
+    def __open(self, day: int):
+        """
+        Private method for opening the day, days between the open day and it are closed
+        (the open day keeps its values, other days have zero values)
+        """
+
+        if day == self.day:
+            return
+
+        self.__check_day(day)
+        if day < self.day:
+            raise ValueError(f'Day {day} is closed, values could be changed only from day {self.day}')
+
+        self.__close(self.day)
+        self.values[:] = 0.0
+        if day > self.day:
+            self.__close(day - 1)
+
+    def __close(self, last_day: int):
+        """
+        Private method for closing days from the open day to the last day with values of the open day,
+        the day after the last day becomes open
+        """
+
+        # Values of the closed day are replaced only if they are changed
+        changed = np.flatnonzero(self.values != self.closed_values)
+        if len(changed):
+            self.__append_changes(days=np.full(len(changed), self.day), rows=changed, values=self.values[changed])
+            self.closed_values = self.values.copy()
+
+        first_snapshot = -(-self.day // self.snapshot_period) * self.snapshot_period
+        if first_snapshot <= last_day:
+            for day in range(first_snapshot, last_day + 1, self.snapshot_period):
+                self.__add_snapshot(day, self.closed_values, self.num_changes)
+
+        self.day = last_day + 1
+
+    def __append_changes(self, days: np.ndarray, rows: np.ndarray, values: np.ndarray):
+        """
+        Private method for appending changes to the log (days should not be before the last change)
+        """
+
+        num_new = len(days)
+        if num_new == 0:
+            return
+
+        # Log is doubled if there is no place for new changes
+        if self.num_changes + num_new > len(self.log_days):
+            capacity = max(2 * len(self.log_days), self.num_changes + num_new)
+            for name in ('log_days', 'log_rows', 'log_values'):
+                column = getattr(self, name)
+                new_column = np.zeros(capacity, dtype=column.dtype)
+                new_column[:self.num_changes] = column[:self.num_changes]
+                setattr(self, name, new_column)
+
+        changes = slice(self.num_changes, self.num_changes + num_new)
+        self.log_days[changes] = days
+        self.log_rows[changes] = rows
+        self.log_values[changes] = values
+        self.num_changes += num_new
+
+    def __add_snapshot(self, day: int, values: np.ndarray, num_changes: int):
+        self.snapshot_days[self.num_snapshots] = day
+        self.snapshot_values[self.num_snapshots] = values
+        self.snapshot_changes[self.num_snapshots] = num_changes
+        self.num_snapshots += 1
+
+    def __get_snapshot(self, day: int, row=None):
+        """
+        Private method for getting the last snapshot up to the day
+        :return: tuple (values of all rows or of the row, position of the first change after the snapshot)
+        """
+
+        index = int(np.searchsorted(self.snapshot_days[:self.num_snapshots], day, side='right')) - 1
+        if index < 0:
+            values = np.zeros(self.num_rows, dtype=np.float64)
+            return (values if row is None else values[row]), 0
+
+        values = self.snapshot_values[index]
+        return (values if row is None else values[row]), int(self.snapshot_changes[index])
+
+    def __get_position(self, day: int, start=0) -> int:
+        """
+        Private method for getting position of the first change after the day (searched from start)
+        """
+        return start + int(np.searchsorted(self.log_days[start:self.num_changes], day, side='right'))
+
+    def __apply_changes(self, values: np.ndarray, start: int, stop: int):
+        """
+        Private method for applying changes from the log to values of all rows (the last change of each row is used)
+        """
+
+        rows = self.log_rows[start:stop][::-1]
+        rows, index = np.unique(rows, return_index=True)
+        values[rows] = self.log_values[stop - 1 - index]
+
+    def __check_day(self, day: int):
+        if not 0 <= day < self.num_cols:
+            raise ValueError(f'Day should be from 0 to {self.num_cols - 1}, got {day}')
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+class MetricsRecorder:
+    """
+    Keeps statistics of modelling (one value per day) in preallocated arrays.
+    Series are registered by name, each value is written by the number of the day (starting from one),
+    DataFrames are created only when they are requested.
+    """
+
+    def __init__(self, num_days: int):
+
+        self.num_days = num_days
+
+        # Mapping (series name -> array with value for each day), index of the value = day - 1
+        self.series = {}
+
+        # Mapping (series name -> column name in DataFrames)
+        self.columns = {}
+
+        # The last day with recorded values
+        self.last_day = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.series
+
+    def register(self, name: str, column=None, dtype=np.float64, fill_value=np.nan):
+        """
+        Adds new series
+        :param name: name of the series
+        :param column: name of the column in DataFrames, name of the series by default
+        :param dtype: type of values
+        :param fill_value: value for days that are not recorded
+        """
+
+        if name in self.series:
+            raise ValueError(f'Series {name} is already registered')
+
+        self.series[name] = np.full(self.num_days, fill_value, dtype=dtype)
+        self.columns[name] = name if column is None else column
+
+    def record(self, name: str, day: int, value):
+        """
+        Writes value of the series for the day
+        :param name: name of the series
+        :param day: number of the day (starting from one)
+        :param value: value of the series
+        """
+
+        self.series[name][day - 1] = value
+        if day > self.last_day:
+            self.last_day = day
+
+    def record_days(self, name: str, first_day: int, values):
+        """
+        Writes values of the series for the range of days
+        :param name: name of the series
+        :param first_day: number of the first day
+        :param values: array with value for each day
+        """
+
+        values = np.asarray(values)
+        last_day = first_day + (len(values) if values.ndim else 1) - 1
+        self.series[name][first_day - 1:last_day] = values
+        if last_day > self.last_day:
+            self.last_day = last_day
+
+    def get_series(self, name: str, first_day=1, last_day=None) -> np.ndarray:
+        """
+        Gets values of the series for the range of days
+        :param name: name of the series
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included), the last recorded day by default
+        :return: array (view of the recorder buffer)
+        """
+
+        last_day = self.last_day if last_day is None else last_day
+        return self.series[name][first_day - 1:last_day]
+
+    def to_array(self, names=None, first_day=1, last_day=None) -> np.ndarray:
+        """
+        Gets values of several series as array (day x series)
+        """
+
+        names = list(self.series.keys()) if names is None else names
+        return np.column_stack([self.get_series(name, first_day=first_day, last_day=last_day) for name in names])
+
+    def to_frame(self, names=None, first_day=1, last_day=None) -> pd.DataFrame:
+        """
+        Gets values of series as DataFrame
+        :param names: list of series names, all series by default
+        :param first_day: number of the first day
+        :param last_day: number of the last day (included), the last recorded day by default
+        :return: DataFrame with columns ['Day', column of each series]
+        """
+
+        names = list(self.series.keys()) if names is None else names
+        last_day = self.last_day if last_day is None else last_day
+
+        df = pd.DataFrame({self.columns[name]: self.get_series(name, first_day=first_day, last_day=last_day).copy()
+                           for name in names})
+        df.insert(0, 'Day', np.arange(first_day, last_day + 1))
+        return df
@@ -2,99 +2,82 @@ import pandas as pd
 import numpy as np
 
 from utilities.py_tools import get_distribution_by_sum, get_month_by_day, log
-from models.investors import Investor
-from models.farms import Farm
-import itertools
+from models.investors import Investor, InvestorPool
+from models.farms import Farm, FarmRegistry
+from models.emission_schedule import get_mint_schedule
 
+# Groups of investors that transfer tokens between farms by default (all groups transfer in full population mode,
+# see SimulationConfig transfer_groups)
+TRANSFER_GROUPS = ['Seed']
 
-def create_investors(params_investors: dict, params_modelling: dict) -> dict:
+
+def create_investors(params_investors: dict, params_modelling: dict, rng=None, storage_path=None,
+                     farm_names=None) -> InvestorPool:
     """
-    Creates dictionary with lists of Investors objects for each type of investor
+    Creates pool with all investors, pool could be used as a dictionary with lists of Investor objects
+    for each type of investor
     :param params_investors: Params of investors
     :param params_modelling: Modelling params for investors
-    :return: dictionary with Investor objects
+    :param rng: numpy.random.Generator, new Generator by default
+    :param storage_path: folder for memory-mapped lots of investors (None - lots are kept in memory)
+    :param farm_names: names of farms in order of their ids (see FarmRegistry), SbPool and DivFarm by default
+    :return: InvestorPool object
     """
 
-    # Dictionary for the results
-    investors = {}
+    rng = np.random.default_rng() if rng is None else rng
 
     # Risk coefficient
     mu, sigma = params_modelling['mu'], params_modelling['sigma']
     num_months = params_modelling['num_months']
 
+    investors = InvestorPool(num_months=num_months, storage_path=storage_path, farm_names=farm_names)
+
     # Create investors for all groups
     for group in params_investors.keys():
-        investors[group] = []
         num_investors = params_investors[group]
-        for i in range(num_investors):
-            risk_coeff = np.random.normal(mu, sigma, 1)[0]
-            investor = Investor(group=group, risk_coefficient=risk_coeff, num_months=num_months)
-            investors[group].append(investor)
+        risk_coeffs = rng.normal(mu, sigma, num_investors)
+        activity_coeffs = rng.random(num_investors)
+        investors.add_investors(group=group, risk_coefficients=risk_coeffs, activity_coefficients=activity_coeffs,
+                                rng=rng)
 
     return investors
 
 
-def sell_tokens(investors: dict, params_tokens: dict, day: int, excluded_tokens: list):
+def sell_tokens(investors: InvestorPool, params_tokens: dict, day: int, excluded_tokens: list, rng=None):
 
     # Loop through all groups of investors
     for group in params_tokens.keys():
 
         # Sell tokens for all groups of investors
         if group not in excluded_tokens:
-            investors_group = investors[group]
+            ids_group = investors.get_ids(group)
             num_tokens = params_tokens[group]
-            num_investors = len(investors_group)
+            num_investors = len(ids_group)
 
             # Get distribution of tokens between investors
-            distr_tokens = get_distribution_by_sum(sum=num_tokens, size=num_investors)
+            distr_tokens = get_distribution_by_sum(sum=num_tokens, size=num_investors, rng=rng)
 
             # Give tokens to investors
-            for index, investor in enumerate(investors_group):
-                n_tokens = distr_tokens[index]
-                dict_tokens = {group: n_tokens}
-                investor.add_tokens(day=day, params_tokens=dict_tokens)
+            investors.add_tokens(investor_ids=ids_group, params_tokens={group: distr_tokens}, day=day)
 
 
 def get_mint_distribution_by_month(mint_distr: pd.DataFrame, num_month: int) -> dict:
 
-    # Create zeroes dictionary with all tokens types
-    types = mint_distr['Token_type'].unique()
-    res_distr = {}
-    for t in types:
-        res_distr[t] = 0
-
-    # Get all numbers of months from mint distribution
-    cols_months = mint_distr.columns[1:].astype(int)
-
-    # If current month > maximum month in mint distribution
-    if cols_months.max() < num_month:
-        return res_distr
-
-    for t in types:
-        df = mint_distr[['Token_type', num_month]].copy(deep=True).to_dict()
-
-        # Get token types and token amounts from DataFrame
-        token_types = df['Token_type']
-        token_nums = df[num_month]
-
-        # Fill dictionary with values
-        for index in token_types.keys():
-            token_type, token_num = token_types[index], token_nums[index]
-            res_distr[token_type] = token_num
+    # Get number of tokens of each type for all months up to the current one (zeros after the last month)
+    token_types, mint_values = get_mint_schedule(mint_distr=mint_distr, num_months=num_month + 1)
 
-        return res_distr
+    res_distr = {token_type: mint_values[num_month, index] for index, token_type in enumerate(token_types)}
+    return res_distr
 
 
-def distribute_tokens_by_days(mint_distr: dict, num_days=30) -> dict:
+def distribute_tokens_by_days(mint_distr: dict, num_days=30, rng=None) -> dict:
     # Get all groups of tokens
-    groups_tokens = mint_distr.keys()
+    groups_tokens = list(mint_distr.keys())
 
-    # Empty dictionary for the result
-    res = {}
+    # Distribute tokens of all groups by days with one call (row for each group)
+    distr = get_distribution_by_sum(sum=[mint_distr[group] for group in groups_tokens], size=num_days, rng=rng)
 
-    for group in groups_tokens:
-        num_tokens = mint_distr[group]
-        res[group] = get_distribution_by_sum(sum=num_tokens, size=num_days)
+    res = {group: distr[index] for index, group in enumerate(groups_tokens)}
 
     return res
 
@@ -110,67 +93,204 @@ def get_tokens_distribution_by_day(distribution_tokens_days: dict, day: int) ->
     return res
 
 
-def investors_sorter(investor: Investor):
-    return investor.activity_coefficient
+def get_best_farms(num_tokens: np.ndarray, dividends: np.ndarray, empty_first: np.ndarray) -> np.ndarray:
+    """
+    Chooses the most profitable farm with one argmax over the matrix of yields (dividends per token)
+    :param num_tokens: number of tokens in each farm, array (row x farm)
+    :param dividends: number of dividends of each farm, array (row x farm) or (farm,)
+    :param empty_first: flags of farms that are chosen first if they have no tokens
+    :return: array with id of the chosen farm for each row
+    """
+
+    yields = dividends / num_tokens
+
+    # Farm without tokens and dividends is not worse than others, ties go to the farm with a lower id
+    yields[np.isnan(yields)] = np.inf
+    decisions = yields.argmax(axis=1)
+
+    # If we have no tokens in some farms (from empty_first), investor chooses the first of them
+    mask_empty = (num_tokens == 0) & empty_first
+    if mask_empty.any():
+        rows_empty = np.flatnonzero(mask_empty.any(axis=1))
+        decisions[rows_empty] = mask_empty[rows_empty].argmax(axis=1)
 
+    return decisions
 
-def transfer_investors(sb_pool: Farm, div_farm: Farm, dict_investors: dict,
-                       day: int, div_sb_pool: float, div_div_farm: float,
-                       freeze_period: int):
 
+def get_transfer_decisions(num_tokens: np.ndarray, dividends: np.ndarray, added: np.ndarray, removed: np.ndarray,
+                           empty_first: np.ndarray, window=64, return_tokens=False):
     """
-    Transfers tokens of investors in a more profitable farm
-    :param freeze_period: number of days when token is frozen
-    :param sb_pool: SbPool object
-    :param div_farm: DivFarm object
-    :param dict_investors: dict with all types of investors
+    Chooses the most profitable farm for each investor when investors transfer tokens one by one.
+    Investors that choose the same farm in a row are resolved at once: running totals of tokens in farms
+    are taken as if all investors in the window choose the farm of the first one, and farms of all investors
+    are checked with one argmax over (investor x farm) matrix of yields (see get_best_farms)
+    :param num_tokens: number of tokens in each farm before the first investor
+    :param dividends: number of dividends of each farm
+    :param added: tokens added to the farm if investor chooses it, array (investor x farm)
+    :param removed: tokens removed from the farm if investor chooses another farm, array (investor x farm)
+    :param empty_first: flags of farms that are chosen first if they have no tokens
+    :param window: initial number of investors that are checked at once
+    :param return_tokens: flag if number of tokens in each farm after the last investor is returned too
+        (investors could be passed in parts, each part starts from tokens of the previous one)
+    :return: array with id of the chosen farm for each investor (and array with tokens in farms)
+    """
+
+    num_investors = len(added)
+    decisions = np.zeros(num_investors, dtype=np.int64)
+
+    num_tokens = np.asarray(num_tokens, dtype=np.float64)[None, :]
+    dividends = np.asarray(dividends, dtype=np.float64)
+    zeros = np.zeros_like(num_tokens)
+
+    position, size = 0, window
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        # Decision of the first investor
+        decision = get_best_farms(num_tokens, dividends, empty_first)[0]
+
+        while position < num_investors:
+            end = min(num_investors, position + size)
+
+            # Changes of tokens in farms and running totals if all investors in the window make the same decision
+            delta = -removed[position:end]
+            delta[:, decision] = added[position:end, decision]
+            totals = num_tokens + np.concatenate([zeros, np.cumsum(delta, axis=0)])
+
+            # Decisions of investors in the window and of the next investor
+            decisions_window = get_best_farms(totals, dividends, empty_first)
+
+            # Investors make the same decision until the first investor that changes it
+            changed = np.flatnonzero(decisions_window[:-1] != decision)
+            num_same = changed[0] if len(changed) else end - position
+
+            decisions[position:position + num_same] = decision
+            num_tokens = totals[num_same:num_same + 1]
+            decision = decisions_window[num_same]
+            position += num_same
+
+            # Check more investors at once while decisions do not change
+            size = 2 * size if not len(changed) else window
+
+    if return_tokens:
+        return decisions, num_tokens[0]
+
+    return decisions
+
+
+def get_empty_first(farms: FarmRegistry) -> np.ndarray:
+    """
+    Returns flags of farms that are chosen first if they have no tokens (all farms except SbPool,
+    that always keeps initial tokens)
+    """
+    return np.array([farm.type_farm != 'SbPool' for farm in farms], dtype=bool)
+
+
+def transfer_investors(farms: FarmRegistry, dict_investors: InvestorPool, day: int, dividends: np.ndarray,
+                       freeze_period: int, groups=None):
+
+    """
+    Transfers tokens of investors in the most profitable farm
+    :param farms: FarmRegistry with all farms
+    :param dict_investors: pool with all types of investors
     :param day: number of the current day
-    :param div_sb_pool: number of dividends for SbPool
-    :param div_div_farm: number of dividends for DivFarm
+    :param dividends: number of dividends of each farm (in order of farm ids)
+    :param freeze_period: number of days when token is frozen
+    :param groups: groups of investors that transfer tokens, TRANSFER_GROUPS by default
     """
 
-    # todo: Now only Seed investors included (to save performance)
-    dict_investors = {'Seed': dict_investors['Seed']}
-    investors = list(itertools.chain.from_iterable(dict_investors.values()))
+    investor_ids = get_transfer_ids(dict_investors, groups=groups)
+
+    # Investors go in descending order by their coefficients of activity
+    investor_ids = dict_investors.get_activity_order(investor_ids)
+
+    # Investors are processed in chunks (in the same order), each chunk continues from tokens in farms
+    # after the previous one, so decisions are the same as for all investors at once
+    num_tokens, empty_first = farms.get_tokens_amounts(day=day), get_empty_first(farms)
+    decisions = np.zeros(len(investor_ids), dtype=np.int64)
+    for start in range(0, len(investor_ids), dict_investors.chunk_size):
+        chunk = slice(start, start + dict_investors.chunk_size)
+
+        # Tokens that farms would book for each investor and each decision
+        added, removed = dict_investors.get_transfer_amounts(investor_ids=investor_ids[chunk], farms=list(farms),
+                                                             day=day, freeze_period=freeze_period)
+
+        # Choose the most profitable farm for each investor
+        decisions[chunk], num_tokens = get_transfer_decisions(num_tokens=num_tokens, dividends=dividends,
+                                                              added=added, removed=removed, empty_first=empty_first,
+                                                              return_tokens=True)
+
+    # Transfer all active tokens of investors to the chosen farms (from the last farm, as dividends are paid)
+    for farm in list(farms)[::-1]:
+        other_farms = [other_farm for other_farm in farms if other_farm is not farm]
+        dict_investors.transfer_active_tokens(investor_ids=investor_ids[decisions == farm.farm_id], farm=farm,
+                                              other_farms=other_farms, day=day, freeze_period=freeze_period)
+
+
+def get_transfer_ids(dict_investors: InvestorPool, groups=None) -> np.ndarray:
+    """
+    Returns ids of investors that transfer tokens between farms
+    :param dict_investors: pool with all types of investors
+    :param groups: groups of investors, TRANSFER_GROUPS by default
+    """
+
+    groups = TRANSFER_GROUPS if groups is None else groups
+    return np.concatenate([np.zeros(0, dtype=np.int64), *[dict_investors.get_ids(group) for group in groups]])
+
+
+def get_idle_transfer_days(farms: FarmRegistry, dict_investors: InvestorPool, first_day: int, dividends: np.ndarray,
+                           freeze_period: int, groups=None) -> int:
+    """
+    Counts days starting from first_day, on which transfer_investors would not change anything
+    (if no tokens are added to investors and farms on these days)
+    :param farms: FarmRegistry with all farms
+    :param dict_investors: pool with all types of investors
+    :param first_day: number of the first day
+    :param dividends: number of dividends of each farm on each day (as passed to transfer_investors), array (day x farm)
+    :param freeze_period: number of days when token is frozen
+    :param groups: groups of investors that transfer tokens, TRANSFER_GROUPS by default
+    :return: number of days
+    """
+
+    investor_ids = get_transfer_ids(dict_investors, groups=groups)
+
+    # Not settled dividends are added to investors on the first transfer
+    if any(dict_investors.has_pending_dividends(farm=farm, investor_ids=investor_ids) for farm in farms):
+        return 0
 
-    # Sort investors in descending order by their coefficients of activity
-    investors_sorted = sorted(investors, key=investors_sorter, reverse=True)
+    # While tokens in farms do not change, all investors make the same decision (see get_transfer_decisions)
+    num_tokens = np.broadcast_to(farms.get_tokens_amounts(day=first_day), dividends.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        decisions = get_best_farms(num_tokens, dividends, get_empty_first(farms))
 
-    for index, investor in enumerate(investors_sorted):
-        num_tokens_sb_pool = sb_pool.get_tokens_amount(day=day)
-        num_tokens_div_farm = div_farm.get_tokens_amount(day=day)
+    changed = np.flatnonzero(decisions != decisions[0])
+    num_days = changed[0] if len(changed) else len(decisions)
 
-        # If we have no tokens in Div Farm (day = 1 case)
-        if num_tokens_div_farm == 0:
-            investor.transfer_active_tokens(farm=div_farm, opposite_farm=sb_pool, day=day, freeze_period=freeze_period)
-            continue
+    # Nothing is transferred until some lots outside the chosen farm become active
+    next_day = dict_investors.get_next_transfer_day(investor_ids=investor_ids, farm=farms[int(decisions[0])],
+                                                    day=first_day, freeze_period=freeze_period)
 
-        # Count dividends / (number of tokens) for both farms
-        ratio_div_farm = div_div_farm / num_tokens_div_farm
-        ratio_sb_pool = div_sb_pool / num_tokens_sb_pool
+    return int(min(num_days, next_day - first_day))
 
-        # Transfer all active tokens of investor to a more profitable farm
-        if ratio_div_farm > ratio_sb_pool:
-            investor.transfer_active_tokens(farm=div_farm, opposite_farm=sb_pool, day=day,  freeze_period=freeze_period)
-            continue
-        else:
-            investor.transfer_active_tokens(farm=sb_pool, opposite_farm=div_farm, day=day, freeze_period=freeze_period)
-            continue
 
+def pay_dividends(dict_investors: InvestorPool, farm: Farm, day: int):
 
-def pay_dividends(dict_investors: dict, farm: Farm, day: int):
+    # In accrual mode Farm only updates dividends per token index, investors are settled later
+    if farm.accrual:
+        farm.accrue_dividends(day=day)
+        return
 
     # Calculate dividends per token
     num_tokens = farm.get_tokens_amount(day=day)
     num_dividends = farm.get_current_dividends(day=day)
     dividends_per_token = num_dividends / num_tokens
 
-    for group in dict_investors:
-        investors = dict_investors[group]
-        for investor in investors:
-            num_dividends_investor = investor.get_tokens_amount(farm=farm, day=day) * dividends_per_token
-            params_dividends_tokens = {'Staking rewards': num_dividends_investor}
-            investor.add_tokens(params_tokens=params_dividends_tokens, day=day)
+    # Pay dividends to investors in chunks of ids (tokens of investors in farm are taken once for all of them)
+    num_dividends_investors = dict_investors.get_tokens_amount(farm=farm, day=day) * dividends_per_token
+    for start in range(0, len(dict_investors), dict_investors.chunk_size):
+        chunk = slice(start, start + dict_investors.chunk_size)
+        params_dividends_tokens = {'Staking rewards': num_dividends_investors[chunk]}
+        dict_investors.add_tokens(investor_ids=dict_investors.get_ids()[chunk], params_tokens=params_dividends_tokens,
+                                  day=day)
 
 
 
@@ -4,12 +4,46 @@ import pandas as pd
 import numpy as np
 from preprocessing.prepare_config_files import prepare_token_params_sample, prepare_initial_params_sample, prepare_mint_sample
 from utilities.py_tools import save_file
-from models.farms import Farm
 from tqdm import tqdm
 
+# Sheet names of the default farms (SbPool and DivFarm have ids 0 and 1), other farms get sheets by their names
+DEFAULT_FARM_SHEETS = ['Sb_Pool', 'Div_Farm']
 
-def save_results(folder_path: str, div_farm: Farm, sb_pool: Farm, df_currency_rate: pd.DataFrame,
-                 df_turnover: pd.DataFrame):
+# Maximum length of sheet names in Excel
+EXCEL_SHEET_NAME_LENGTH = 31
+
+
+def get_farm_sheet_names(farms) -> list:
+    """
+    Gets names of Excel sheets with tokens and dividends of farms: default farms keep their sheets (Sb_Pool,
+    Dividends_Sb_Pool, Div_Farm, Dividends_Div_Farm), names of other farms are cut to the length of Excel sheet names
+    :param farms: FarmRegistry or list of Farm objects
+    :return: list with (sheet of tokens, sheet of dividends) of each farm
+    """
+
+    sheet_names = []
+    for farm_id, farm in enumerate(farms):
+        name = DEFAULT_FARM_SHEETS[farm_id] if farm_id < len(DEFAULT_FARM_SHEETS) else farm.name
+        sheet_names.append((name[:EXCEL_SHEET_NAME_LENGTH], f'Dividends_{name}'[:EXCEL_SHEET_NAME_LENGTH]))
+
+    # Cut names of different farms could be the same, Excel does not allow sheets with the same name
+    all_names = [name.lower() for names in sheet_names for name in names] + ['currency_rate', 'shop_turnover']
+    if len(set(all_names)) < len(all_names):
+        raise ValueError(f'Excel sheet names of farms should be unique within {EXCEL_SHEET_NAME_LENGTH} characters, '
+                         f'got {sheet_names}')
+
+    return sheet_names
+
+
+def save_results(folder_path: str, farms, df_currency_rate: pd.DataFrame, df_turnover: pd.DataFrame):
+    """
+    Saves all results to Excel file after modelling (results are also written by months, see utilities/result_sinks.py)
+    :param folder_path: folder of the file
+    :param farms: FarmRegistry or list of Farm objects, each farm gets sheets with its tokens and dividends
+        (see get_farm_sheet_names)
+    :param df_currency_rate: DataFrame with currency rate
+    :param df_turnover: DataFrame with shop turnover
+    """
 
     # Initialize Excel Writer
     current_time = datetime.now().strftime("%Y%m%d-%H%M%S").replace('-', '_')
@@ -17,27 +51,24 @@ def save_results(folder_path: str, div_farm: Farm, sb_pool: Farm, df_currency_ra
     file_path = folder_path + file_name
     writer = pd.ExcelWriter(file_path)
 
-    """
-        Step 1. Get all statistics
-    """
-    # Get tokens statistics
-    div_farm_tokens = div_farm.tokens.copy(deep=True).transpose()
-    sb_pool_tokens = sb_pool.tokens.copy(deep=True).transpose()
+    for farm, (sheet_tokens, sheet_dividends) in zip(farms, get_farm_sheet_names(farms)):
+        """
+            Step 1. Get all statistics of the farm
+        """
+        # Get tokens statistics
+        farm_tokens = farm.tokens.copy(deep=True).transpose()
 
-    # Get dividends statistic
-    div_farm_dividends = div_farm.dividends.copy(deep=True).transpose()
-    sb_pool_dividends = sb_pool.dividends.copy(deep=True).transpose()
+        # Get dividends statistic
+        farm_dividends = farm.dividends.copy(deep=True).transpose()
 
-    """
-        Step 2. Save tables in Excel sheets
-    """
-    # Save tokens stats to Excel
-    div_farm_tokens.to_excel(writer, sheet_name='Div_Farm')
-    sb_pool_tokens.to_excel(writer, sheet_name='Sb_Pool')
+        """
+            Step 2. Save tables in Excel sheets
+        """
+        # Save tokens stats to Excel
+        farm_tokens.to_excel(writer, sheet_name=sheet_tokens)
 
-    # Save dividends stats to Excel
-    div_farm_dividends.to_excel(writer, sheet_name='Dividends_Div_Farm')
-    sb_pool_dividends.to_excel(writer, sheet_name='Dividends_Sb_Pool')
+        # Save dividends stats to Excel
+        farm_dividends.to_excel(writer, sheet_name=sheet_dividends)
 
     df_currency_rate.to_excel(writer, sheet_name='Currency_Rate')
     df_turnover.to_excel(writer, sheet_name='Shop_Turnover')
@@ -0,0 +1,309 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Peak RSS is taken from resource module, it is not available on Windows (RSS is not reported there)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Current RSS is read from /proc/self/statm on Linux and from psutil on other systems (if it is installed)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+STATM_PATH = '/proc/self/statm'
+
+# Profiler that is used by decorated primitives of farms and investors (see profiled)
+_active_profiler = None
+
+
+def open_statm_file():
+    """
+    Opens STATM_PATH without buffering (None if it is not available). The file is kept open and read again
+    from the start on each measurement, so timed primitives do not open it on every call
+    """
+
+    try:
+        return open(STATM_PATH, 'rb', buffering=0)
+    except OSError:
+        return None
+
+
+def reopen_statm_file():
+    """
+    Opens STATM_PATH again in the child process after fork (the inherited file shows memory of the parent)
+    """
+
+    global _statm_file
+    if _statm_file is not None:
+        _statm_file.close()
+    _statm_file = open_statm_file()
+
+
+# Opened STATM_PATH and size of its pages in MB
+_statm_file = open_statm_file()
+STATM_PAGE_MB = os.sysconf('SC_PAGE_SIZE') / 2 ** 20 if _statm_file is not None else None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reopen_statm_file)
+
+
+def get_peak_rss_mb():
+    """
+    Returns peak resident memory of the process in MB (None if it is not available)
+    """
+
+    if resource is None:
+        return None
+
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 2 ** 20 if sys.platform == 'darwin' else peak_rss / 2 ** 10
+
+
+def get_current_rss_mb():
+    """
+    Returns current resident memory of the process in MB (None if it is not available)
+    """
+
+    if _statm_file is not None:
+        _statm_file.seek(0)
+        return int(_statm_file.read().split()[1]) * STATM_PAGE_MB
+
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+
+    return None
+
+
+class NullPhase:
+    """
+    Phase of disabled profiler, does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase:
+    """
+    Timer of one call of the phase (see PhaseProfiler.phase)
+    """
+
+    def __init__(self, stats: list):
+        self.stats = stats
+        self.start_time = None
+        self.start_rss = None
+
+    def __enter__(self):
+        self.start_rss = get_current_rss_mb()
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats[0] += time.perf_counter() - self.start_time
+        self.stats[1] += 1
+
+        # Memory that the call kept (current RSS on exit minus RSS on entry) and current RSS on both ends of the call
+        rss = get_current_rss_mb()
+        if rss is not None:
+            self.stats[2] = max(self.stats[2], rss - self.start_rss)
+            self.stats[3] = max(self.stats[3], self.start_rss, rss)
+
+        return False
+
+
+class PhaseProfiler:
+    """
+    Named timers and counters for phases of modelling.
+
+    Each phase is timed with `with profiler.phase(name):`, time of nested phases is included in outer phases.
+    Disabled profiler returns one shared empty context, so hooks could stay in the daily loop.
+    Primitives of farms and investors are timed by the decorator profiled while the profiler is active
+    (see activate). One month could also be profiled with cProfile (profile_month).
+    """
+
+    def __init__(self, **kwargs):
+
+        self.enabled = kwargs.get('enabled', True)
+
+        # Mapping (phase name -> [wall time in seconds, number of calls, maximum RSS growth of one call in MB,
+        # maximum current RSS on entry or exit of calls in MB])
+        self.phases = {}
+
+        # RSS could not be measured on some systems (see get_current_rss_mb)
+        self.has_rss = get_current_rss_mb() is not None
+
+        # Mapping (counter name -> value)
+        self.counters = {}
+
+        # Month that is profiled with cProfile (None - not profiled, it does not depend on enabled)
+        # and folder for its stats (file profile_month_XXX.prof, the current folder by default)
+        self.profile_month = kwargs.get('profile_month')
+        self.profile_path = kwargs.get('profile_path', '')
+
+        self.start_time = time.perf_counter()
+
+    def phase(self, name: str):
+        """
+        Returns context that adds time of the code inside to the phase
+        :param name: name of the phase
+        """
+
+        if not self.enabled:
+            return NULL_PHASE
+
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = [0.0, 0, 0.0, 0.0]
+
+        return Phase(stats)
+
+    def count(self, name: str, value=1):
+        """
+        Adds value to the counter
+        :param name: name of the counter
+        :param value: value to add
+        """
+
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def activate(self):
+        """
+        Returns context, inside which decorated primitives of farms and investors are timed by this profiler
+        """
+        return ActiveProfiler(self)
+
+    def profile(self, num_month: int):
+        """
+        Returns context that profiles the code inside with cProfile if num_month is the profiled month
+        :param num_month: number of the month
+        """
+
+        if self.profile_month is None or num_month != self.profile_month:
+            return NULL_PHASE
+
+        return MonthProfile(os.path.join(self.profile_path, f'profile_month_{num_month:03d}.prof'))
+
+    def get_report(self) -> dict:
+        """
+        Returns report of the run: wall time, peak RSS of the process, stats of each phase (sorted by time)
+        and counters. RSS of phases is the current RSS at entry and exit of calls (not the process peak):
+        rss_growth_mb - maximum growth of RSS during one call, max_rss_mb - maximum RSS at entry or exit
+        """
+
+        wall_time = time.perf_counter() - self.start_time
+
+        phases = {}
+        for name, (phase_time, num_calls, rss_growth, max_rss) in sorted(self.phases.items(),
+                                                                         key=lambda item: -item[1][0]):
+            phases[name] = {
+                'time': phase_time,
+                'calls': num_calls,
+                'mean_time': phase_time / num_calls if num_calls else 0.0,
+                'share': phase_time / wall_time if wall_time > 0 else 0.0,
+                'rss_growth_mb': rss_growth if self.has_rss else None,
+                'max_rss_mb': max_rss if self.has_rss else None
+            }
+
+        return {
+            'wall_time': wall_time,
+            'peak_rss_mb': get_peak_rss_mb(),
+            'phases': phases,
+            'counters': self.counters
+        }
+
+    def save_report(self, file_path: str):
+        """
+        Saves report (see get_report) to JSON file
+        :param file_path: path of the file
+        """
+
+        folder_path = os.path.dirname(file_path)
+        if folder_path:
+            os.makedirs(folder_path, exist_ok=True)
+
+        # Counters could be NumPy numbers
+        with open(file_path, 'w') as file:
+            json.dump(self.get_report(), file, indent=4, default=lambda value: np.asarray(value).tolist())
+
+
+class ActiveProfiler:
+    """
+    Context, inside which primitives are timed by the profiler (previous active profiler is restored on exit)
+    """
+
+    def __init__(self, profiler: PhaseProfiler):
+        self.profiler = profiler
+        self.previous = None
+
+    def __enter__(self):
+        global _active_profiler
+        self.previous, _active_profiler = _active_profiler, (self.profiler if self.profiler.enabled else None)
+        return self.profiler
+
+    def __exit__(self, *args):
+        global _active_profiler
+        _active_profiler = self.previous
+        return False
+
+
+class MonthProfile:
+    """
+    Context that profiles the code inside with cProfile and saves stats to the file (see pstats)
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self.profile
+
+    def __exit__(self, *args):
+        self.profile.disable()
+
+        folder_path = os.path.dirname(self.file_path)
+        if folder_path:
+            os.makedirs(folder_path, exist_ok=True)
+        self.profile.dump_stats(self.file_path)
+
+        return False
+
+
+def profiled(name: str):
+    """
+    Decorator that times the function as a phase of the active profiler (see PhaseProfiler.activate),
+    without active profiler the function is called directly
+    :param name: name of the phase
+    """
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profiler is None:
+                return func(*args, **kwargs)
+
+            with _active_profiler.phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,7 @@
 import pickle
 import gc
+import hashlib
+import inspect
 from datetime import datetime
 import json
 import logging
@@ -15,6 +17,7 @@ from pathlib import Path
 import os
 import utilities
 from dotenv import load_dotenv
+from utilities.turnover_drivers import get_turnover_trend
 
 sys.modules['utilities'] = utilities
 load_dotenv()
@@ -58,6 +61,19 @@ def read_file(file_name, root=get_root(), encoding='cp1251', usecols=None, dtype
     elif file_name.endswith(".xlsx") | file_name.endswith(".xls"):
         df = pd.read_excel(root + file_name, dtype=dtype, header=header, nrows=nrows, index_col=index_col,
                            sheet_name=sheetname, skiprows=skiprows, engine='openpyxl')
+
+        # If a list of sheets is passed, all sheets are read in one pass and dict (sheet -> df) is returned
+        if isinstance(df, dict):
+            for sheet in df.keys():
+                if names is not None:
+                    df[sheet].dropna(how='all', axis=1, inplace=True)
+                    df[sheet].columns = names
+                if usecols is not None:
+                    df[sheet] = df[sheet][usecols]
+            if verbose:
+                log('Loaded ' + file_name)
+            return df
+
         if names is not None:
             df.dropna(how='all', axis=1, inplace=True)
             df.columns = names
@@ -112,51 +128,83 @@ def save_file(file_name, data, root=get_root(), encoding='cp1251', sep=',', shee
             log('Loaded ' + file_name)
 
 
-def get_turnover_distribution(turnover, turnover_rate, num_years, growth_type='linear'):
+def get_turnover_distribution(turnover, turnover_rate, num_years, growth_type='compound', **kwargs):
     """
 
     :param turnover: Initial turnover
     :param turnover_rate: Annual rate of turnover growth
     :param num_years: Number of years to get distribution for
-    :param growth_type: Type of distribution
+    :param growth_type: Type of distribution (see utilities/turnover_drivers.py)
+    :return: array with turnover for each day
     """
 
-    # Distribution of the turnover
-    turnover_distr = []
-
-    # Number of days to distribute turnover
-    num_days = num_years * 360
-    for year in range(1, num_years + 1):
-        # Distribute turnover over the days
-        turnover_year = turnover * (1 + turnover_rate) ** year
+    return get_turnover_trend(turnover=turnover, turnover_rate=turnover_rate, num_days=num_years * 360,
+                              growth_type=growth_type, **kwargs)
 
-        for day in range(360):
-            turnover_distr.append(turnover_year // 360)
 
-    return turnover_distr
+def get_distribution_by_sum(sum, size: int, rng=None) -> np.ndarray:
+    """
+    Randomly distributes integer sum between size elements. Shares are drawn from Dirichlet distribution
+    and rounded by the largest remainder, so the sum of elements is always equal to sum
+    :param sum: number to distribute or array of numbers (each of them is distributed separately)
+    :param size: number of elements
+    :param rng: numpy.random.Generator, new Generator by default
+    :return: integer array (size,) or (*sum.shape, size) if sum is an array
+    """
 
+    rng = np.random.default_rng() if rng is None else rng
 
-def get_distribution_by_sum(sum: int, size: int):
+    sums = np.round(np.asarray(sum, dtype=np.float64)).astype(np.int64)
+    if size == 0:
+        return np.zeros(sums.shape + (0,), dtype=np.int64)
 
-    # Generate random distribution with .sum() ~= sum
-    l = numpy.ones(size)
-    distr = np.random.dirichlet(l)
-    distr *= sum
-    distr = np.round(distr, 0)
-    distr = distr.astype(int)
+    # Generate random shares and take integer part of each element
+    shares = rng.dirichlet(np.ones(size), size=sums.shape if sums.ndim else None)
+    values = shares * sums[..., np.newaxis]
+    distr = np.floor(values).astype(np.int64)
 
-    # Add +1 or -1 to the elements to get needed sum
-    delta = abs(sum - distr.sum())
-    indexes = numpy.random.randint(size, size=delta)
+    # Add +1 to the elements with the largest fractional parts to get needed sum (remainder is in [0, size))
+    remainders = sums - distr.sum(axis=-1)
+    order = np.argsort(distr - values, axis=-1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(size), axis=-1)
+    distr += ranks < remainders[..., np.newaxis]
 
-    for index in indexes:
-        if distr.sum() < sum:
-            distr[index] += 1
-        elif distr.sum() < sum:
-            distr[index] -= 1
     return distr
 
 
+@functools.lru_cache(maxsize=None)
+def get_source_hash(*objects) -> str:
+    """
+    Returns SHA-256 hash of the source code of functions or classes. It is a part of the keys of files
+    that are built by this code, so the files are built again when the code changes
+    :param objects: functions or classes
+    """
+
+    hash_sha = hashlib.sha256()
+    for obj in objects:
+        hash_sha.update(inspect.getsource(obj).encode())
+    return hash_sha.hexdigest()
+
+
+def is_debug_counters() -> bool:
+    """
+    Checks if cached counters should be cross-checked with full recomputation (DEBUG_COUNTERS in .env)
+    """
+    return bool(int(os.getenv('DEBUG_COUNTERS', 0)))
+
+
+def check_counter(name: str, cached, actual, rtol=1e-9, atol=1e-6):
+    """
+    Compares cached value of the counter with the value recomputed from scratch
+    :param name: name of the counter
+    :param cached: cached value (number or array)
+    :param actual: recomputed value (number or array)
+    """
+    if not np.allclose(cached, actual, rtol=rtol, atol=atol):
+        raise AssertionError(f'Cached {name} = {cached} differs from recomputed value = {actual}')
+
+
 def get_month_by_day(day: int) -> int:
     """
     Gets month number by a day number, months start from zero
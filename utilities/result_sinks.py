@@ -0,0 +1,264 @@
+import os
+import queue
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from utilities.py_tools import log
+
+# Tables of each farm (named by keys of farms, e.g. sb_pool_tokens) and common tables, that Simulation writes
+# to the sink (one chunk of each table per month)
+FARM_TABLES = ['tokens', 'dividends']
+COMMON_TABLES = ['currency_rate', 'turnover', 'metrics']
+
+
+def get_result_tables(farm_keys: list) -> list:
+    """
+    Gets names of tables that Simulation writes to the sink
+    :param farm_keys: keys of farms in order of their ids (see SimulationConfig.get_farm_keys)
+    :return: list with names of tables
+    """
+    return [f'{key}_{table}' for table in FARM_TABLES for key in farm_keys] + COMMON_TABLES
+
+
+class ResultSink:
+    """
+    Base class of the results writer. Chunks (dictionary with (table name: DataFrame)) are put in a bounded queue
+    and written by a background thread, so modelling waits only if the writer is behind by max_chunks chunks.
+
+    Subclasses implement write_table (write one table of one chunk), read_table and close_tables.
+    Could be used as a context manager, close should be called in the end to flush all chunks.
+    """
+
+    # Extension of the result files
+    extension = ''
+
+    def __init__(self, folder_path: str, **kwargs):
+
+        # Each run writes to its own folder
+        current_time = datetime.now().strftime("%Y%m%d-%H%M%S").replace('-', '_')
+        self.folder_path = os.path.join(folder_path, kwargs.get('name', f'results_{current_time}'))
+        os.makedirs(self.folder_path, exist_ok=True)
+
+        self.verbose = kwargs.get('verbose', False)
+        self.num_chunks = 0
+
+        # Exception from the writer thread, it is raised in the main thread on the next write or close
+        self.error = None
+
+        self.queue = queue.Queue(maxsize=kwargs.get('max_chunks', 4))
+        self.thread = threading.Thread(target=self.__run_writer, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __run_writer(self):
+        """
+        Private method with the loop of the writer thread (None in the queue stops it)
+        """
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            # After an error chunks are only taken from the queue, so that modelling is not blocked
+            if self.error is not None:
+                continue
+
+            num_chunk, chunk = item
+            try:
+                for name, df in chunk.items():
+                    self.write_table(name=name, df=df, num_chunk=num_chunk)
+                if self.verbose:
+                    log(f'Chunk {num_chunk} is written to {self.folder_path}')
+            except Exception as error:
+                self.error = error
+
+    def __raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f'Writing results to {self.folder_path} failed') from self.error
+
+    def write(self, chunk: dict):
+        """
+        Puts chunk in the queue (waits if the queue is full)
+        :param chunk: dictionary with (table name: DataFrame), DataFrames should not be changed after that
+        """
+
+        self.__raise_error()
+        if not self.thread.is_alive():
+            raise ValueError(f'Sink {self.folder_path} is already closed')
+
+        self.queue.put((self.num_chunks, chunk))
+        self.num_chunks += 1
+
+    def close(self):
+        """
+        Waits until all chunks are written and closes files
+        """
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+            self.close_tables()
+
+        self.__raise_error()
+
+    def get_path(self, name: str, num_chunk=None) -> str:
+        """
+        Gets path of the file of the table (or of one chunk of the table)
+        """
+
+        file_name = name if num_chunk is None else f'{name}_{num_chunk:05d}'
+        return os.path.join(self.folder_path, file_name + self.extension)
+
+    def get_chunk_paths(self, name: str) -> list:
+        """
+        Gets sorted paths of all chunk files of the table
+        """
+
+        prefix = name + '_'
+        files = []
+        for file in os.listdir(self.folder_path):
+            if file.startswith(prefix) and file.endswith(self.extension):
+                if file[len(prefix):-len(self.extension)].isdigit():
+                    files.append(file)
+
+        return [os.path.join(self.folder_path, file) for file in sorted(files)]
+
+    def write_table(self, name: str, df: pd.DataFrame, num_chunk: int):
+        raise NotImplementedError
+
+    def read_table(self, name: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def close_tables(self):
+        pass
+
+
+class CsvSink(ResultSink):
+    """
+    Appends chunks to one CSV file per table
+    """
+
+    extension = '.csv'
+
+    def write_table(self, name: str, df: pd.DataFrame, num_chunk: int):
+        path = self.get_path(name)
+        df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+    def read_table(self, name: str) -> pd.DataFrame:
+        return pd.read_csv(self.get_path(name))
+
+
+class NpzSink(ResultSink):
+    """
+    Writes each chunk of the table to compressed .npz file with 'columns' and 'values' (day x column) arrays
+    """
+
+    extension = '.npz'
+
+    def write_table(self, name: str, df: pd.DataFrame, num_chunk: int):
+        np.savez_compressed(self.get_path(name, num_chunk), columns=np.array(df.columns, dtype=str),
+                            values=df.to_numpy(dtype=np.float64))
+
+    def read_table(self, name: str) -> pd.DataFrame:
+
+        frames = []
+        for path in self.get_chunk_paths(name):
+            with np.load(path) as data:
+                frames.append(pd.DataFrame(data['values'], columns=list(data['columns'])))
+
+        df = pd.concat(frames, ignore_index=True)
+        df['Day'] = df['Day'].astype(np.int64)
+        return df
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes one Parquet file per table, each chunk is a row group (pyarrow is required)
+    """
+
+    extension = '.parquet'
+
+    def __init__(self, folder_path: str, **kwargs):
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('pyarrow is required for Parquet results, use NpzSink or CsvSink without it')
+
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.compression = kwargs.get('compression', 'snappy')
+        self.writers = {}
+
+        super().__init__(folder_path, **kwargs)
+
+    def write_table(self, name: str, df: pd.DataFrame, num_chunk: int):
+
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if name not in self.writers:
+            self.writers[name] = self.pq.ParquetWriter(self.get_path(name), table.schema, compression=self.compression)
+        self.writers[name].write_table(table)
+
+    def close_tables(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+    def read_table(self, name: str) -> pd.DataFrame:
+        return pd.read_parquet(self.get_path(name))
+
+
+class FeatherSink(ResultSink):
+    """
+    Writes each chunk of the table to Feather file (pyarrow is required)
+    """
+
+    extension = '.feather'
+
+    def __init__(self, folder_path: str, **kwargs):
+
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('pyarrow is required for Feather results, use NpzSink or CsvSink without it')
+
+        super().__init__(folder_path, **kwargs)
+
+    def write_table(self, name: str, df: pd.DataFrame, num_chunk: int):
+        df.reset_index(drop=True).to_feather(self.get_path(name, num_chunk))
+
+    def read_table(self, name: str) -> pd.DataFrame:
+        frames = [pd.read_feather(path) for path in self.get_chunk_paths(name)]
+        return pd.concat(frames, ignore_index=True)
+
+
+# Mapping (format -> sink class)
+SINK_FORMATS = {
+    'csv': CsvSink,
+    'npz': NpzSink,
+    'parquet': ParquetSink,
+    'feather': FeatherSink
+}
+
+
+def get_result_sink(format: str, folder_path: str, **kwargs) -> ResultSink:
+    """
+    Creates sink for writing results
+    :param format: one of ('csv', 'npz', 'parquet', 'feather')
+    :param folder_path: folder, where the folder of the run is created
+    :param kwargs: parameters of the sink: name (folder of the run), max_chunks (size of the queue), verbose
+    :return: ResultSink object
+    """
+
+    if format not in SINK_FORMATS:
+        raise ValueError(f'Format should be one of: {list(SINK_FORMATS.keys())}, got {format}')
+
+    return SINK_FORMATS[format](folder_path, **kwargs)
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Number of days in a year of modelling
+NUM_DAYS_YEAR = 360
+
+# Types of the turnover growth:
+#   'linear' - turnover grows by turnover_rate of the initial turnover each year (constant during the year)
+#   'compound' - turnover grows by turnover_rate each year (constant during the year)
+#   'smooth' - compound growth that changes every day
+#   'seasonal' - smooth growth multiplied by sine wave (params: amplitude, period, phase)
+GROWTH_TYPES = ['linear', 'compound', 'smooth', 'seasonal']
+
+# Types of the random noise of the turnover:
+#   'lognormal' - each day is multiplied by lognormal noise with mean 1 (params: sigma)
+#   'regime' - turnover is multiplied by the level of the current regime, regimes are changed one after another
+#       with probability regime_prob each day (params: regime_levels, regime_prob)
+NOISE_TYPES = ['lognormal', 'regime']
+
+
+def get_turnover_trend(turnover: float, turnover_rate: float, num_days: int, growth_type='compound',
+                       **kwargs) -> np.ndarray:
+    """
+    Gets deterministic turnover for each day
+    :param turnover: initial annual turnover
+    :param turnover_rate: annual rate of turnover growth
+    :param num_days: number of days
+    :param growth_type: type of growth, one of GROWTH_TYPES
+    :param kwargs: parameters of seasonal growth: amplitude (0.1 by default), period (in days, 360 by default)
+        and phase (in days, 0 by default)
+    :return: array with turnover for each day
+    """
+
+    days = np.arange(num_days)
+
+    # Years start from one, so turnover of the first year is already increased
+    years = days // NUM_DAYS_YEAR + 1
+    num_years = -(-num_days // NUM_DAYS_YEAR)
+
+    # Turnover of each year is calculated with Python floats, so that rounding is the same as in the old yearly loop
+    if growth_type in ('linear', 'compound'):
+        if growth_type == 'linear':
+            turnover_years = [turnover * (1 + turnover_rate * year) for year in range(1, num_years + 1)]
+        else:
+            turnover_years = [turnover * (1 + turnover_rate) ** year for year in range(1, num_years + 1)]
+
+        return np.array(turnover_years, dtype=np.float64)[years - 1] // NUM_DAYS_YEAR
+
+    elif growth_type in ('smooth', 'seasonal'):
+        trend = turnover * (1 + turnover_rate) ** (1 + days / NUM_DAYS_YEAR) / NUM_DAYS_YEAR
+
+        if growth_type == 'seasonal':
+            amplitude = kwargs.get('amplitude', 0.1)
+            period = kwargs.get('period', NUM_DAYS_YEAR)
+            phase = kwargs.get('phase', 0)
+            trend *= 1 + amplitude * np.sin(2 * np.pi * (days - phase) / period)
+
+        return trend
+
+    raise ValueError(f'Growth type should be one of: {GROWTH_TYPES}, got {growth_type}')
+
+
+def get_turnover_paths(turnover: float, turnover_rate: float, num_days: int, growth_type='compound', noise=None,
+                       num_paths=1, rng=None, **kwargs) -> np.ndarray:
+    """
+    Gets turnover paths for each day, all paths are generated at once
+    :param turnover: initial annual turnover
+    :param turnover_rate: annual rate of turnover growth
+    :param num_days: number of days
+    :param growth_type: type of growth, one of GROWTH_TYPES
+    :param noise: type of noise (one of NOISE_TYPES) or list of types, None - all paths are equal to the trend
+    :param num_paths: number of paths
+    :param rng: numpy.random.Generator, new Generator by default. With the same noise types random numbers are
+        drawn in the same order, so paths with the same Generator state differ only because of parameters
+    :param kwargs: parameters of growth and noise (see GROWTH_TYPES and NOISE_TYPES)
+    :return: array (path x day)
+    """
+
+    trend = get_turnover_trend(turnover=turnover, turnover_rate=turnover_rate, num_days=num_days,
+                               growth_type=growth_type, **kwargs)
+    paths = np.tile(trend, (num_paths, 1))
+
+    noise = [] if noise is None else [noise] if isinstance(noise, str) else list(noise)
+    for noise_type in noise:
+        if noise_type not in NOISE_TYPES:
+            raise ValueError(f'Noise type should be one of: {NOISE_TYPES}, got {noise_type}')
+
+    rng = np.random.default_rng() if rng is None else rng
+
+    if 'lognormal' in noise:
+        sigma = kwargs.get('sigma', 0.1)
+        paths *= np.exp(sigma * rng.standard_normal((num_paths, num_days)) - sigma ** 2 / 2)
+
+    if 'regime' in noise:
+        levels = np.asarray(kwargs.get('regime_levels', [1.0, 0.5]), dtype=np.float64)
+        prob = kwargs.get('regime_prob', 1 / 180)
+
+        # Number of the regime is the number of changes before the day (regimes are repeated in a cycle)
+        changes = np.cumsum(rng.random((num_paths, num_days)) < prob, axis=1)
+        paths *= levels[changes % len(levels)]
+
+    return paths